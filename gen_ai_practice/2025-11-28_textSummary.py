@@ -2,12 +2,12 @@ import os
 from fastapi import FastAPI, UploadFile, File, HTTPException
 from dotenv import load_dotenv
 from langchain_google_genai import GoogleGenerativeAI
-from langchain_core.prompts import PromptTemplate
-from langchain_classic.chains.summarize import load_summarize_chain
-from langchain_core.documents import Document
+from langchain_core.output_parsers import StrOutputParser
 from pypdf import PdfReader
 from io import BytesIO
 
+from prompt_registry import registry
+
 app = FastAPI()
 load_dotenv()
 
@@ -17,6 +17,8 @@ llm = GoogleGenerativeAI(
     api_key=os.getenv("GEMINI_API_KEY")
 )
 
+summary_chain = registry.compile("pdf-summary", llm, parser=StrOutputParser())
+
 def read_pdf_file(file_contents: BytesIO):
     try:
         pdf_reader = PdfReader(file_contents)
@@ -40,28 +42,8 @@ async def summarize_pdf(file: UploadFile = File(...)):
         file_contents = BytesIO(contents)
         text = read_pdf_file(file_contents)
 
-        doc = [Document(page_content=text)]
-
-        prompt = """
-        Write a concise summary of the following:
-        "{text}"
-
-        CONCISE SUMMARY:
-        """
-
-        prompt_template = PromptTemplate(
-            template=prompt,
-            input_variables=["text"]
-        )
-
-        summary_chain = load_summarize_chain(
-            llm=llm,
-            chain_type="stuff",
-            prompt=prompt_template
-        )
-
-        output = summary_chain.invoke(doc)
-        return {"summary": output["output_text"]}
+        summary = await summary_chain.ainvoke({"text": text})
+        return {"summary": summary}
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing file: {str(e)}")
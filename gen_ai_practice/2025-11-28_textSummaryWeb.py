@@ -1,5 +1,6 @@
 import os
 from enum import Enum
+from pathlib import Path
 
 import google.ai.generativelanguage_v1beta as genai
 
@@ -20,10 +21,18 @@ from fastapi import FastAPI, HTTPException, Query
 from langchain_community.document_loaders import WebBaseLoader
 from langchain_google_genai import GoogleGenerativeAI
 
-from langchain_core.prompts import PromptTemplate
-from langchain_core.prompts.base import format_document
 from langchain_core.output_parsers import StrOutputParser
 
+from incremental_summary import (
+    PageState,
+    SummaryStore,
+    diff_sections,
+    render_changes,
+    split_sections,
+)
+from prompt_registry import registry
+from web_extract import Block, extract_blocks, render_blocks
+
 
 load_dotenv()
 
@@ -33,33 +42,30 @@ if not API_KEY:
 
 DEFAULT_WEB_PAGE = "https://blog.google/technology/ai/google-gemini-ai"
 
+# Pages whose changed sections cover at most this share of the text are patched
+# incrementally; anything bigger gets a full re-summarization.
+INCREMENTAL_THRESHOLD = float(os.getenv("WEB_SUMMARY_INCREMENTAL_THRESHOLD", "0.3"))
+MAX_INCREMENTAL_UPDATES = int(os.getenv("WEB_SUMMARY_MAX_INCREMENTAL_UPDATES", "5"))
+SUMMARY_STORE = SummaryStore(
+    Path(os.getenv("WEB_SUMMARY_CACHE_DIR", Path(__file__).resolve().parent.parent / ".cache" / "web_summaries"))
+)
+
 llm = GoogleGenerativeAI(
     model="gemini-2.0-flash",
     temperature=0.0,
     google_api_key=API_KEY,
 )
 
-doc_prompt = PromptTemplate.from_template("{page_content}")
-llm_prompt = PromptTemplate.from_template(
-    """Write a concise summary of the following:
+summary_chain = registry.compile("web-summary", llm, parser=StrOutputParser())
+update_chain = registry.compile("web-summary-update", llm, parser=StrOutputParser())
 
-{text}
-
-CONCISE SUMMARY:"""
-)
+app = FastAPI()
 
-stuff_chain = (
-    {
-        "text": lambda docs: "\n\n".join(
-            format_document(doc, doc_prompt) for doc in docs
-        )
-    }
-    | llm_prompt
-    | llm
-    | StrOutputParser()
-)
 
-app = FastAPI()
+def load_main_content(url: str) -> list[Block]:
+    """Fetch `url` and keep only its main content, dropping navigation, footers and banners."""
+    loader = WebBaseLoader(url)
+    return extract_blocks(loader.scrape(parser="lxml"))
 
 
 @app.get("/summaries/web")
@@ -72,20 +78,48 @@ def summarize_web(
     """Load a web document, summarize it via the Gemini chain, and return the text."""
 
     try:
-        loader = WebBaseLoader(url)
-        docs = loader.load()
+        blocks = load_main_content(url)
     except Exception as exc:
         raise HTTPException(status_code=502, detail=f"Cannot load URL: {exc}")
 
-    if not docs:
-        raise HTTPException(status_code=404, detail="No documents were retrieved.")
-
-    if not docs[0].page_content.strip():
+    sections = split_sections(blocks)
+    if not sections:
         raise HTTPException(status_code=422, detail="Document contains no text.")
 
+    previous = SUMMARY_STORE.load(url)
+    if previous is not None and previous.prompt_version != summary_chain.version:
+        # The summary prompt changed since this page was stored; start from scratch.
+        previous = None
+    diff = diff_sections(previous.sections, sections) if previous else None
+
     try:
-        summary = stuff_chain.invoke(docs)
+        if diff is not None and diff.is_empty:
+            summary, mode = previous.summary, "unchanged"
+        elif (
+            diff is not None
+            and diff.ratio <= INCREMENTAL_THRESHOLD
+            and previous.incremental_updates < MAX_INCREMENTAL_UPDATES
+        ):
+            summary = update_chain.invoke(
+                {"summary": previous.summary, "changes": render_changes(diff)}
+            )
+            mode = "incremental"
+        else:
+            summary = summary_chain.invoke({"text": render_blocks(blocks)})
+            mode = "full"
     except Exception as exc:
         raise HTTPException(status_code=500, detail=f"LLM chain failed: {exc}")
 
-    return {"url": url, "summary": summary}
+    if mode != "unchanged":
+        updates = previous.incremental_updates + 1 if mode == "incremental" else 0
+        SUMMARY_STORE.save(
+            PageState(
+                url,
+                sections,
+                summary,
+                prompt_version=summary_chain.version,
+                incremental_updates=updates,
+            )
+        )
+
+    return {"url": url, "summary": summary, "mode": mode}
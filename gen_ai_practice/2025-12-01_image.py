@@ -1,11 +1,21 @@
-import os, base64
-from fastapi import FastAPI, File, UploadFile, HTTPException
+import asyncio
+import json
+import os
+from pathlib import Path
+from fastapi import FastAPI, File, UploadFile, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.prompts import ChatPromptTemplate
 from dotenv import load_dotenv
+from PIL import UnidentifiedImageError
 from typing import Dict
 
+from image_cache import PerceptualCache, dhash_bytes
+from image_preprocess import ImageTooLargeError, PreparedImage, preprocess_image
+from multipart_stream import MultipartRequestError, UploadedFile, iter_uploaded_files
+from prompt_registry import registry
+
 load_dotenv()
 
 llm = ChatGoogleGenerativeAI(
@@ -13,6 +23,23 @@ llm = ChatGoogleGenerativeAI(
     api_key=os.getenv("GEMINI_API_KEY")
 )
 
+nutrition_chain = registry.compile("nutrition-image", llm)
+
+# Near-duplicate photos (resized, recompressed, re-uploaded) reuse an earlier analysis.
+# Entries belong to one prompt version; editing the prompt starts a fresh cache.
+analysis_cache = PerceptualCache(
+    Path(os.getenv("IMAGE_CACHE_PATH", Path(__file__).resolve().parent.parent / ".cache" / "image_analysis.json")),
+    max_entries=int(os.getenv("IMAGE_CACHE_MAX_ENTRIES", "2048")),
+    max_distance=int(os.getenv("IMAGE_CACHE_MAX_DISTANCE", "6")),
+    namespace=nutrition_chain.version,
+)
+
+ALLOWED_CONTENT_TYPES = ("image/jpeg", "image/png")
+MAX_UPLOAD_BYTES = 10_000_000
+MAX_BATCH_FILES = int(os.getenv("IMAGE_BATCH_MAX_FILES", "20"))
+# Shared by every request so a burst of batch uploads can't flood the Gemini quota.
+llm_slots = asyncio.Semaphore(int(os.getenv("IMAGE_LLM_CONCURRENCY", "4")))
+
 app = FastAPI()
 app.add_middleware(
     CORSMiddleware,
@@ -21,49 +48,119 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-def encode_image(image_content: bytes) -> str:
-    return base64.b64encode(image_content).decode()
+def prepare_image(contents: bytes) -> tuple[PreparedImage, int]:
+    """Downscale the upload and compute its perceptual hash from the downscaled copy."""
+    image = preprocess_image(contents)
+    return image, dhash_bytes(image.data)
+
+
+async def read_limited(file: UploadFile, limit: int) -> bytes:
+    """Read an upload in chunks, failing as soon as it passes `limit` bytes."""
+    contents = bytearray()
+    while chunk := await file.read(1 << 20):
+        contents.extend(chunk)
+        if len(contents) > limit:
+            raise HTTPException(400, detail="File too large. Maximum size is 10MB.")
+    return bytes(contents)
+
+
+async def run_analysis(image: PreparedImage, image_hash: int) -> tuple[str, bool]:
+    """Return the macronutrient JSON for `image` and whether it came from the cache."""
+    cached = analysis_cache.get(image_hash)
+    if cached is not None:
+        return cached, True
+
+    async with llm_slots:
+        res = await nutrition_chain.ainvoke({"image_url": image.data_url})
+    # Persisting rewrites the cache file, so keep it off the event loop too.
+    await run_in_threadpool(analysis_cache.put, image_hash, res.content)
+    return res.content, False
+
 
 @app.post("/analyze-image")
-async def analyze_image(file: UploadFile = File(...)) -> Dict[str, str]:
+async def analyze_image(response: Response, file: UploadFile = File(...)) -> Dict[str, str]:
     # Validate file type
-    if file.content_type not in ["image/jpeg", "image/png"]:
+    if file.content_type not in ALLOWED_CONTENT_TYPES:
         raise HTTPException(400, detail="Invalid file type. Only JPEG and PNG are allowed.")
 
-    # Validate file size
-    if file.size and file.size > 10_000_000:
+    # Validate file size; `file.size` can be None, so read_limited enforces it as well.
+    if file.size and file.size > MAX_UPLOAD_BYTES:
         raise HTTPException(400, detail="File too large. Maximum size is 10MB.")
 
+    contents = await read_limited(file, MAX_UPLOAD_BYTES)
     try:
-        contents = await file.read()
-        image = encode_image(contents)
-
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", "You are a nutrition expert capable of analysing food images and providing detailed nutritional advice."),
-            ("human", [
-                {
-                    "type": "text",
-                    "text": """
-Assess the food in the image and reply only with a JSON object that estimates the macronutrients for a typical portion.
-Use the keys "protein_g", "carbs_g", and "fat_g" with gram estimates or ranges (e.g., "20-25g").
-Do not include any other commentary, HTML, or formatting—just the JSON object on one line.
-If the picture is unclear, note uncertainty within the values using ranges or qualifiers inside the JSON.
-"""
-                },
-                {
-                    "type": "image_url",
-                    "image_url": {
-                        "url": f"data:image/jpeg;base64,{image}",
-                        "detail": "high",
-                    },
-                }
-            ])
-        ])
-
-        chain = prompt | llm
-        res = await chain.ainvoke({})
-
-        return {"analysis": res.content}
+        # Decoding and re-encoding is CPU-bound, so keep it off the event loop.
+        image, image_hash = await run_in_threadpool(prepare_image, contents)
+    except ImageTooLargeError:
+        raise HTTPException(400, detail="Image dimensions are too large.")
+    except (UnidentifiedImageError, OSError):
+        raise HTTPException(400, detail="The uploaded file could not be decoded as an image.")
 
+    try:
+        analysis, cached = await run_analysis(image, image_hash)
     except Exception:
         raise HTTPException(500, detail="An error occurred while processing the image")
+
+    response.headers["X-Cache"] = "HIT" if cached else "MISS"
+    return {"analysis": analysis}
+
+
+async def analyze_upload(upload: UploadedFile) -> dict:
+    """Analyze one file of a batch, turning failures into a per-image error entry."""
+    result = {"index": upload.index, "filename": upload.filename}
+    if upload.error:
+        return {**result, "error": upload.error}
+    if upload.content_type not in ALLOWED_CONTENT_TYPES:
+        return {**result, "error": "Invalid file type. Only JPEG and PNG are allowed."}
+
+    try:
+        image, image_hash = await run_in_threadpool(prepare_image, upload.data)
+    except ImageTooLargeError:
+        return {**result, "error": "Image dimensions are too large."}
+    except (UnidentifiedImageError, OSError):
+        return {**result, "error": "The uploaded file could not be decoded as an image."}
+
+    try:
+        analysis, cached = await run_analysis(image, image_hash)
+    except Exception:
+        return {**result, "error": "An error occurred while processing the image"}
+    return {**result, "analysis": analysis, "cached": cached}
+
+
+@app.post("/analyze-images")
+async def analyze_images(request: Request) -> StreamingResponse:
+    """Analyze every image of a multipart upload, streaming one JSON line per image as it finishes.
+
+    Each file is checked against the size limit while it streams in, and its
+    preprocessing starts as soon as its part is complete, overlapping with the
+    rest of the upload.
+    """
+    tasks: list[asyncio.Task] = []
+    received = False
+    try:
+        async for upload in iter_uploaded_files(
+            request, max_file_bytes=MAX_UPLOAD_BYTES, max_files=MAX_BATCH_FILES
+        ):
+            tasks.append(asyncio.create_task(analyze_upload(upload)))
+        received = True
+    except MultipartRequestError as exc:
+        raise HTTPException(400, detail=str(exc)) from exc
+    finally:
+        if not received:
+            # Bad uploads, client disconnects and other failures: nobody will read these results.
+            for task in tasks:
+                task.cancel()
+
+    if not tasks:
+        raise HTTPException(400, detail="No image files were uploaded.")
+
+    async def results():
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield json.dumps(await next_done) + "\n"
+        finally:
+            # The client went away; don't keep paying for Gemini calls nobody will read.
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
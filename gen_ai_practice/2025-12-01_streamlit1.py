@@ -1,39 +1,40 @@
-import os, base64
+import hashlib, os
 import streamlit as st
 from dotenv import load_dotenv
 from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.prompts import ChatPromptTemplate
+
+from image_preprocess import preprocess_image
+from prompt_registry import registry
 
 load_dotenv()
 
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.0-flash",
-    api_key=os.getenv("GEMINI_API_KEY")
-)
-
-prompt = ChatPromptTemplate.from_messages(
-    [
-        ("system", "You are a helpful assistant that can describe images."),
-        (
-            "human",
-            [
-                {"type": "text", "text": "{input}"},
-                {
-                    "type": "image_url",
-                    "image_url": {
-                        "url": "data:image/jpeg;base64,{image}",
-                        "detail": "low",
-                    },
-                },
-            ],
-        ),
-    ]
-)
-
-chain = prompt | llm
-
-def encode_image(image_file):
-    return base64.b64encode(image_file.read()).decode()
+
+# Streamlit reruns this whole script on every widget interaction; the model
+# client and compiled chain are built once per server process instead.
+@st.cache_resource
+def get_chain():
+    llm = ChatGoogleGenerativeAI(
+        model="gemini-2.0-flash",
+        api_key=os.getenv("GEMINI_API_KEY")
+    )
+    return registry.compile("image-describe", llm)
+
+
+chain = get_chain()
+
+if "llm_calls" not in st.session_state:
+    st.session_state.llm_calls = 0
+
+
+# Keyed on the image hash, question and prompt version; the image bytes
+# (leading underscore) are only read on a cache miss.
+@st.cache_data(max_entries=128, show_spinner="Asking Gemini...")
+def describe_image(image_hash, question, prompt_version, _image_bytes):
+    st.session_state.llm_calls += 1
+    image = preprocess_image(_image_bytes, max_dimension=768)
+    res = chain.invoke({"input": question, "image_url": image.data_url})
+    return res.content
+
 
 st.title("Image Analysis Using Gemini")
 col1, col2 = st.columns(2)
@@ -50,6 +51,8 @@ with col2:
 question = st.text_input("Enter a question")
 
 if question and uploaded_file:
-    image = encode_image(uploaded_file)
-    res = chain.invoke({"input": question, "image": image})
-    st.write(res.content)
+    image_bytes = uploaded_file.getvalue()
+    image_hash = hashlib.sha256(image_bytes).hexdigest()
+    st.write(describe_image(image_hash, question.strip(), chain.version, image_bytes))
+
+st.sidebar.metric("LLM calls this session", st.session_state.llm_calls)
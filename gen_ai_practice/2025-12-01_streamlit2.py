@@ -1,41 +1,45 @@
-import os, base64
+import hashlib, os
 import streamlit as st
 from datetime import date
 from dotenv import load_dotenv
 from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.prompts import ChatPromptTemplate
+
+from image_preprocess import preprocess_image
+from prompt_registry import registry
 
 load_dotenv()
 
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.0-flash",
-    api_key=os.getenv("GEMINI_API_KEY")
-)
-
-prompt = ChatPromptTemplate.from_messages(
-    [
-        ("system", "You are a helpful assistant that can verify identification documents"),
-        ("human",
-            [
-                {"type": "text", "text": "Verify the identification details"},
-                {"type": "text", "text": "Name: {user_name}"},
-                {"type": "text", "text": "DOB: {user_dob}"},
-                {
-                    "type": "image_url",
-                    "image_url": {
-                        "url": "data:image/jpeg;base64,{image}",
-                        "detail": "low",
-                    },
-                },
-            ],
-        ),
-    ]
-)
-
-chain = prompt | llm
-
-def encode_image(image_file):
-    return base64.b64encode(image_file.read()).decode()
+
+# Streamlit reruns this whole script on every widget interaction; the model
+# client and compiled chain are built once per server process instead.
+@st.cache_resource
+def get_chain():
+    llm = ChatGoogleGenerativeAI(
+        model="gemini-2.0-flash",
+        api_key=os.getenv("GEMINI_API_KEY")
+    )
+    return registry.compile("kyc-verify", llm)
+
+
+chain = get_chain()
+
+if "llm_calls" not in st.session_state:
+    st.session_state.llm_calls = 0
+
+
+# Keyed on the image hash, name, DOB and prompt version; the image bytes
+# (leading underscore) are only read on a cache miss.
+@st.cache_data(max_entries=128, show_spinner="Verifying document...")
+def verify_document(image_hash, user_name, user_dob, prompt_version, _image_bytes):
+    st.session_state.llm_calls += 1
+    image = preprocess_image(_image_bytes, max_dimension=1024)
+    res = chain.invoke({
+        "user_name": user_name,
+        "user_dob": user_dob,
+        "image_url": image.data_url
+    })
+    return res.content
+
 
 st.title("KYC Verification Application")
 
@@ -57,10 +61,8 @@ user_name = st.text_input("Enter your name")
 user_dob = st.date_input("Enter your date of birth", min_value=date(1900, 1, 1))
 
 if uploaded_file != None and user_name and user_dob:
-    image = encode_image(uploaded_file)
-    res = chain.invoke({
-        "user_name": user_name,
-        "user_dob": user_dob,
-        "image": image
-    })
-    st.write(res.content)
+    image_bytes = uploaded_file.getvalue()
+    image_hash = hashlib.sha256(image_bytes).hexdigest()
+    st.write(verify_document(image_hash, user_name.strip(), str(user_dob), chain.version, image_bytes))
+
+st.sidebar.metric("LLM calls this session", st.session_state.llm_calls)
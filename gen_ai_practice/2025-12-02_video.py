@@ -1,7 +1,24 @@
-import os, base64
+import argparse
+import asyncio
+import base64
+import os
 from dotenv import load_dotenv
 from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+
+from video_frames import SAMPLE_MODES, frames_message, frames_payload_bytes, sample_frames
+from video_segments import analyze_video_segments
+
+# --mode video sends the whole MP4; --mode frames sends sampled, timestamped stills.
+parser = argparse.ArgumentParser(description="Describe a video with Gemini.")
+parser.add_argument("--mode", choices=("video", "frames"), default="video")
+parser.add_argument("--sample", choices=SAMPLE_MODES, default="fps", help="frame sampler for --mode frames")
+parser.add_argument("--fps", type=float, default=1.0, help="frames per second for --sample fps")
+parser.add_argument("--max-frames", type=int, default=32)
+# --segment-seconds N analyses N-second segments in parallel and merges a timeline.
+parser.add_argument("--segment-seconds", type=float, help="split long videos into segments of this length")
+parser.add_argument("--concurrency", type=int, default=4, help="segments analysed at once")
+args = parser.parse_args()
 
 # Load .env file containing GEMINI_API_KEY=xxxx
 load_dotenv()
@@ -23,12 +40,8 @@ llm = ChatGoogleGenerativeAI(
 # ---------------------------------------------------------
 video_file_path = "media/hyena.mp4"
 
-# Read & Base64 encode the video
-with open(video_file_path, "rb") as f:
-    encoded_video = base64.b64encode(f.read()).decode()
-
 # Build prompt
-prompt = ChatPromptTemplate.from_messages([
+video_prompt = ChatPromptTemplate.from_messages([
     ("system",
      "You are an expert video analyst. Provide accurate scene interpretation."),
     ("human", [
@@ -44,18 +57,45 @@ prompt = ChatPromptTemplate.from_messages([
     ])
 ])
 
-# Build the chain
-chain = prompt | llm
+frames_prompt = ChatPromptTemplate.from_messages([
+    ("system",
+     "You are an expert video analyst. Provide accurate scene interpretation."),
+    ("human", "{analysis_request}"),
+    MessagesPlaceholder("frames"),
+])
+
+analysis_request = "Describe what's happening in this video."
+
+if args.segment_seconds:
+    print(f"Analyzing video in {args.segment_seconds:g}s segments...")
+    result, segments = asyncio.run(analyze_video_segments(
+        video_file_path, analysis_request, llm,
+        segment_seconds=args.segment_seconds, concurrency=args.concurrency, mode=args.mode,
+    ))
+    for item in segments:
+        print(f"  {item.segment.label}: {item.seconds:.1f}s" + (f" ({item.error})" if item.error else ""))
+else:
+    if args.mode == "frames":
+        frames = sample_frames(video_file_path, mode=args.sample, fps=args.fps, max_frames=args.max_frames)
+        print(f"Sampled {len(frames)} frames ({frames_payload_bytes(frames) / 1024:.0f} KB)")
+        chain = frames_prompt | llm
+        inputs = {"analysis_request": analysis_request, "frames": [frames_message(frames)]}
+    else:
+        # Read & Base64 encode the video
+        with open(video_file_path, "rb") as f:
+            encoded_video = base64.b64encode(f.read()).decode()
+        chain = video_prompt | llm
+        inputs = {
+            "analysis_request": analysis_request,
+            "video_data": encoded_video,
+            "mime_type": "video/mp4"
+        }
 
-print("Analyzing video...")
+    print("Analyzing video...")
 
-# Call Gemini
-response = chain.invoke({
-    "analysis_request": "Describe what's happening in this video.",
-    "video_data": encoded_video,
-    "mime_type": "video/mp4"
-})
+    # Call Gemini
+    result = chain.invoke(inputs).content
 
 print("Analysis completed.")
 print("\nRESULTS:\n" + "-" * 40)
-print(response.content)
+print(result)
@@ -1,13 +1,21 @@
+import argparse
 import base64
+import asyncio
 import os
-import tempfile
+from collections.abc import Callable
 from pathlib import Path
+from typing import Any
 
 from dotenv import load_dotenv
 from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from yt_dlp import YoutubeDL
 
+from media_store import MediaStore
+from video_frames import SAMPLE_MODES, frames_message, frames_payload_bytes, sample_frames
+from video_segments import analyze_video_segments
+from youtube_ids import media_key, media_key_from_info
+
 # Load .env file containing GEMINI_API_KEY=xxxx
 load_dotenv()
 
@@ -23,6 +31,11 @@ DEFAULT_YOUTUBE_LINK = (
 )
 FALLBACK_VIDEO_PATH = Path("media/hyena.mp4")
 DEFAULT_ANALYSIS_REQUEST = "Describe what's happening in this video."
+# Prefer a single 360p MP4 stream so no merging (and ffmpeg) is required.
+VIDEO_FORMAT = "bestvideo[height<=360][ext=mp4]/best[height<=360]/best"
+
+# Downloads are kept between runs (MEDIA_STORE_DIR, MEDIA_STORE_MAX_BYTES).
+media_store = MediaStore()
 
 
 def prompt_youtube_link(default_link: str) -> str:
@@ -43,46 +56,79 @@ def base64_from_file(video_path: Path) -> str:
         return base64.b64encode(fh.read()).decode()
 
 
-def download_youtube_media(youtube_url: str) -> str:
-    """Download a YouTube video to a temporary file and return the encoded data."""
-    with tempfile.TemporaryDirectory(prefix="youtube-video-") as tmpdir:
-        tmp_path = Path(tmpdir) / "video.%(ext)s"
+def download_youtube_media(
+    youtube_url: str, prepare: Callable[[Path], Any] = base64_from_file
+) -> Any:
+    """Fetch a YouTube video through the media store and return `prepare(path)`.
+
+    Only a store miss touches the network; the file is kept for later runs.
+    """
+    def download(directory: Path) -> tuple[Path, str]:
         ydl_opts = {
-            # Prefer a single 360p MP4 stream so no merging (and ffmpeg) is required.
-            "format": "bestvideo[height<=360][ext=mp4]/best[height<=360]/best",
-            "outtmpl": str(tmp_path),
+            "format": VIDEO_FORMAT,
+            "outtmpl": str(directory / "video.%(ext)s"),
             "noplaylist": True,
             "quiet": True,
             "no_warnings": True,
         }
         with YoutubeDL(ydl_opts) as ydl:
             info = ydl.extract_info(youtube_url, download=True)
-            downloaded_path = Path(ydl.prepare_filename(info))
-            return base64_from_file(downloaded_path)
+            return Path(ydl.prepare_filename(info)), info.get("title", "")
 
+    key = media_key(youtube_url)
+    if key is None:
+        # Not a URL we can read the id from; ask yt-dlp without downloading.
+        with YoutubeDL({"quiet": True, "no_warnings": True, "noplaylist": True}) as ydl:
+            key = media_key_from_info(ydl.extract_info(youtube_url, download=False))
+    stored = media_store.fetch(key, VIDEO_FORMAT, download)
+    return prepare(stored.path)
 
-def get_encoded_video(youtube_url: str) -> str:
+
+def get_encoded_video(
+    youtube_url: str, prepare: Callable[[Path], Any] = base64_from_file
+) -> Any:
     """Try downloading the requested YouTube video, falling back when needed."""
     try:
-        return download_youtube_media(youtube_url)
+        return download_youtube_media(youtube_url, prepare)
     except Exception as err:  # pragma: no cover - best-effort download
         print(
             f"Unable to fetch YouTube video ({youtube_url}): {err}\n"
             "Falling back to the bundled sample video."
         )
-        return base64_from_file(FALLBACK_VIDEO_PATH)
+        return prepare(FALLBACK_VIDEO_PATH)
+
 
+# --mode video sends the whole MP4; --mode frames sends sampled, timestamped stills.
+parser = argparse.ArgumentParser(description="Describe a YouTube video with Gemini.")
+parser.add_argument("--mode", choices=("video", "frames"), default="video")
+parser.add_argument("--sample", choices=SAMPLE_MODES, default="fps", help="frame sampler for --mode frames")
+parser.add_argument("--fps", type=float, default=1.0, help="frames per second for --sample fps")
+parser.add_argument("--max-frames", type=int, default=32)
+# --segment-seconds N analyses N-second segments in parallel and merges a timeline.
+parser.add_argument("--segment-seconds", type=float, help="split long videos into segments of this length")
+parser.add_argument("--concurrency", type=int, default=4, help="segments analysed at once")
+args = parser.parse_args()
 
 youtube_url = prompt_youtube_link(DEFAULT_YOUTUBE_LINK)
 
-encoded_video = get_encoded_video(youtube_url)
+if args.segment_seconds:
+    # The media store keeps the download, so its path stays valid after this returns.
+    video_path = get_encoded_video(youtube_url, lambda path: path)
+elif args.mode == "frames":
+    frames = get_encoded_video(
+        youtube_url,
+        lambda path: sample_frames(path, mode=args.sample, fps=args.fps, max_frames=args.max_frames),
+    )
+    print(f"Sampled {len(frames)} frames ({frames_payload_bytes(frames) / 1024:.0f} KB)")
+else:
+    encoded_video = get_encoded_video(youtube_url)
 
 analysis_request = prompt_analysis_request(DEFAULT_ANALYSIS_REQUEST)
 
 print(f"Using YouTube link: {youtube_url}")
 
 # Build prompt
-prompt = ChatPromptTemplate.from_messages([
+video_prompt = ChatPromptTemplate.from_messages([
     ("system",
      "You are an expert video analyst. Provide accurate scene interpretation."),
     ("human", [
@@ -98,18 +144,39 @@ prompt = ChatPromptTemplate.from_messages([
     ])
 ])
 
-# Build the chain
-chain = prompt | llm
+frames_prompt = ChatPromptTemplate.from_messages([
+    ("system",
+     "You are an expert video analyst. Provide accurate scene interpretation."),
+    ("human", "{analysis_request}"),
+    MessagesPlaceholder("frames"),
+])
+
+if args.segment_seconds:
+    print(f"Analyzing video in {args.segment_seconds:g}s segments...")
+    result, segments = asyncio.run(analyze_video_segments(
+        video_path, analysis_request, llm,
+        segment_seconds=args.segment_seconds, concurrency=args.concurrency, mode=args.mode,
+    ))
+    for item in segments:
+        print(f"  {item.segment.label}: {item.seconds:.1f}s" + (f" ({item.error})" if item.error else ""))
+else:
+    # Build the chain
+    if args.mode == "frames":
+        chain = frames_prompt | llm
+        inputs = {"analysis_request": analysis_request, "frames": [frames_message(frames)]}
+    else:
+        chain = video_prompt | llm
+        inputs = {
+            "analysis_request": analysis_request,
+            "video_data": encoded_video,
+            "mime_type": "video/mp4"
+        }
 
-print("Analyzing video...")
+    print("Analyzing video...")
 
-# Call Gemini
-response = chain.invoke({
-    "analysis_request": analysis_request,
-    "video_data": encoded_video,
-    "mime_type": "video/mp4"
-})
+    # Call Gemini
+    result = chain.invoke(inputs).content
 
 print("Analysis completed.")
 print("\nRESULTS:\n" + "-" * 40)
-print(response.content)
+print(result)
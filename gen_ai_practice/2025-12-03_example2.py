@@ -1,11 +1,12 @@
 import os
-from langchain_mongodb import MongoDBAtlasVectorSearch
-from pymongo import MongoClient
-from langchain_community.document_loaders import TextLoader
 from langchain_text_splitters import CharacterTextSplitter
 from langchain_google_genai.embeddings import GoogleGenerativeAIEmbeddings
 from dotenv import load_dotenv
 
+from embedding_cache import CachedEmbeddings
+from ingest_pipeline import ingest_files
+from vector_store_config import collection_key, open_vector_store
+
 load_dotenv()
 
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
@@ -14,24 +15,14 @@ embeddings = GoogleGenerativeAIEmbeddings(
     model="models/text-embedding-004",
     google_api_key=GEMINI_API_KEY
 )
-
-client = MongoClient(os.getenv("MONGODB_ATLAS_CLUSTER_URI"))
+# Chunks embedded before (same model, same text) are served from .cache/embeddings.sqlite.
+embeddings = CachedEmbeddings(embeddings)
 
 DB_NAME = "test_db"
 COLLECTION_NAME = "test_collection"
 ATLAS_VECTOR_SEARCH_INDEX_NAME = "test-index-1"
 
-MONGODB_COLLECTION = client[DB_NAME][COLLECTION_NAME]
-
-# To clear existing documents:
-MONGODB_COLLECTION.delete_many({})
-
-vector_store = MongoDBAtlasVectorSearch(
-    collection=MONGODB_COLLECTION,
-    embedding=embeddings,
-    index_name=ATLAS_VECTOR_SEARCH_INDEX_NAME,
-    relevance_score_fn="cosine",
-)
+vector_store = open_vector_store(DB_NAME, COLLECTION_NAME, ATLAS_VECTOR_SEARCH_INDEX_NAME, embeddings)
 
 text_splitter = CharacterTextSplitter(
     separator="\n",
@@ -39,10 +30,13 @@ text_splitter = CharacterTextSplitter(
     chunk_overlap=0
 )
 
-loader = TextLoader("media/facts.txt")
-docs = loader.load_and_split(text_splitter=text_splitter)
-
-vector_store.add_documents(docs)
+# Streamed in batches; only chunks not in the collection yet are embedded and written,
+# and chunks no longer in the file are deleted.
+metrics = ingest_files(
+    ["media/facts.txt"], vector_store, embeddings, text_splitter,
+    collection=collection_key(DB_NAME, COLLECTION_NAME), clear_untracked=True,
+)
 print("Documents Added")
+print(metrics)
 
-client.close()
+vector_store.close()
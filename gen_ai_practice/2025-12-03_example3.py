@@ -1,8 +1,6 @@
 import os
 from dotenv import load_dotenv
 
-from pymongo import MongoClient
-from langchain_mongodb import MongoDBAtlasVectorSearch
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_google_genai.embeddings import GoogleGenerativeAIEmbeddings
 
@@ -10,12 +8,15 @@ from langchain_classic.chains import create_retrieval_chain
 from langchain_classic.chains.combine_documents import create_stuff_documents_chain
 from langchain_core.prompts import ChatPromptTemplate
 
+from embedding_cache import CachedEmbeddings
+from query_cache import CachedRetriever
+from vector_store_config import collection_key, open_vector_store
+
 # Load environment variables
 load_dotenv()
 
 # API Keys
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-MONGODB_URI = os.getenv("MONGODB_ATLAS_CLUSTER_URI")
 
 # LLM + Embeddings
 llm = ChatGoogleGenerativeAI(
@@ -27,25 +28,18 @@ embeddings = GoogleGenerativeAIEmbeddings(
     model="models/text-embedding-004",
     google_api_key=GEMINI_API_KEY
 )
+# Query vectors are kept in .cache/embeddings.sqlite.
+embeddings = CachedEmbeddings(embeddings)
 
-# MongoDB Connection
-client = MongoClient(MONGODB_URI)
-
+# Vector store (MongoDB Atlas, or local with VECTOR_STORE=local)
 DB_NAME = "test_db"
 COLLECTION_NAME = "test_collection"
 ATLAS_VECTOR_SEARCH_INDEX_NAME = "test-index-1"
 
-MONGODB_COLLECTION = client[DB_NAME][COLLECTION_NAME]
-
-# Vector store
-vector_store = MongoDBAtlasVectorSearch(
-    collection=MONGODB_COLLECTION,
-    embedding=embeddings,
-    index_name=ATLAS_VECTOR_SEARCH_INDEX_NAME,
-    relevance_score_fn="cosine",
-)
+vector_store = open_vector_store(DB_NAME, COLLECTION_NAME, ATLAS_VECTOR_SEARCH_INDEX_NAME, embeddings)
 
-retriever = vector_store.as_retriever()
+# Results of repeated questions come from .cache/query_cache.sqlite until ingestion changes the collection.
+retriever = CachedRetriever(vector_store=vector_store, collection=collection_key(DB_NAME, COLLECTION_NAME))
 
 # ==============================
 # SYSTEM PROMPT (IMPORTANT PART)
@@ -73,4 +67,4 @@ chain = create_retrieval_chain(retriever, document_chain)
 ai_response = chain.invoke({"input": "list down 3 facts about the english word."})
 print(ai_response["answer"])
 
-client.close()
+vector_store.close()
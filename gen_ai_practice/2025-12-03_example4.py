@@ -1,38 +1,39 @@
 import os
-from langchain_mongodb import MongoDBAtlasVectorSearch
-from pymongo import MongoClient
 from langchain_google_genai.embeddings import GoogleGenerativeAIEmbeddings
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_classic.text_splitter import RecursiveCharacterTextSplitter
 from dotenv import load_dotenv
 
+from embedding_cache import CachedEmbeddings
+from fast_splitter import FastRecursiveSplitter
+from ingest_pipeline import ingest_files
+from vector_store_config import collection_key, open_vector_store
+
+
 load_dotenv()
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 embeddings = GoogleGenerativeAIEmbeddings(model="models/text-embedding-004", google_api_key=GEMINI_API_KEY)
-client = MongoClient(os.getenv("MONGODB_ATLAS_CLUSTER_URI"))
+# Chunks embedded before (same model, same text) are served from .cache/embeddings.sqlite.
+embeddings = CachedEmbeddings(embeddings)
 
 DB_NAME = "test_db"
 COLLECTION_NAME = "test_collection_pdf"
 ATLAS_VECTOR_SEARCH_INDEX_NAME = "test-index-pdf"
 
-MONGODB_COLLECTION = client[DB_NAME][COLLECTION_NAME]
+vector_store = open_vector_store(DB_NAME, COLLECTION_NAME, ATLAS_VECTOR_SEARCH_INDEX_NAME, embeddings)
 
-vector_store = MongoDBAtlasVectorSearch(
-    collection=MONGODB_COLLECTION,
-    embedding=embeddings,
-    index_name=ATLAS_VECTOR_SEARCH_INDEX_NAME,
-    relevance_score_fn="cosine",
-)
-
-text_splitter = RecursiveCharacterTextSplitter(
+# Same chunks as RecursiveCharacterTextSplitter, computed on offsets (see fast_splitter.py).
+text_splitter = FastRecursiveSplitter(
     chunk_size=500,
     chunk_overlap=100
 )
 
-loader = PyPDFLoader('media/diabetes.pdf')
-docs = loader.load_and_split(text_splitter)
-vector_store.add_documents(docs)
+# Pages are streamed through split, embed and write in batches; only chunks not in the
+# collection yet are embedded and written, and chunks no longer in the PDF are deleted.
+metrics = ingest_files(
+    ["media/diabetes.pdf"], vector_store, embeddings, text_splitter,
+    collection=collection_key(DB_NAME, COLLECTION_NAME), clear_untracked=True,
+)
 
 print("Document Added!")
+print(metrics)
 
-client.close()
\ No newline at end of file
+vector_store.close()
\ No newline at end of file
@@ -1,8 +1,6 @@
 import os
 from dotenv import load_dotenv
 
-from pymongo import MongoClient
-
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_google_genai.embeddings import GoogleGenerativeAIEmbeddings
 
@@ -14,14 +12,15 @@ from langchain_core.prompts import (
 from langchain_classic.chains import create_retrieval_chain
 from langchain_classic.chains.combine_documents import create_stuff_documents_chain
 
-from langchain_mongodb import MongoDBAtlasVectorSearch
+from embedding_cache import CachedEmbeddings
+from query_cache import CachedRetriever
+from vector_store_config import collection_key, open_vector_store
 
 
 # Load environment variables
 load_dotenv()
 
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-MONGO_URI = os.getenv("MONGODB_ATLAS_CLUSTER_URI")
 
 # LLM + embedding models
 llm = ChatGoogleGenerativeAI(
@@ -33,25 +32,18 @@ embeddings = GoogleGenerativeAIEmbeddings(
     model="models/text-embedding-004",
     google_api_key=GEMINI_API_KEY
 )
+# Query vectors are kept in .cache/embeddings.sqlite.
+embeddings = CachedEmbeddings(embeddings)
 
-# MongoDB setup
-client = MongoClient(MONGO_URI)
-
+# Vector store (MongoDB Atlas, or local with VECTOR_STORE=local)
 DB_NAME = "test_db"
 COLLECTION_NAME = "test_collection_pdf"
 ATLAS_VECTOR_SEARCH_INDEX_NAME = "test-index-pdf"
 
-MONGODB_COLLECTION = client[DB_NAME][COLLECTION_NAME]
-
-# Vector store
-vector_store = MongoDBAtlasVectorSearch(
-    collection=MONGODB_COLLECTION,
-    embedding=embeddings,
-    index_name=ATLAS_VECTOR_SEARCH_INDEX_NAME,
-    relevance_score_fn="cosine"
-)
+vector_store = open_vector_store(DB_NAME, COLLECTION_NAME, ATLAS_VECTOR_SEARCH_INDEX_NAME, embeddings)
 
-retriever = vector_store.as_retriever()
+# Results of repeated questions come from .cache/query_cache.sqlite until ingestion changes the collection.
+retriever = CachedRetriever(vector_store=vector_store, collection=collection_key(DB_NAME, COLLECTION_NAME))
 
 
 # System prompt
@@ -77,4 +69,4 @@ chain = create_retrieval_chain(retriever, document_chain)
 ai_response = chain.invoke({"input": "which continent is most affected by diabetes?"})
 print(ai_response["answer"])
 
-client.close()
+vector_store.close()
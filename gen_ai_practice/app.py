@@ -1,15 +1,68 @@
 import streamlit as st
+import math
+import os
+from functools import partial
 from pathlib import Path
 from typing import List, Tuple, Optional
-import yt_dlp
-import re
 import time
 
+from audio_pipeline import DOWNLOAD_WORKERS, AudioPipeline
+from download_index import DownloadIndex
+from job_queue import JobQueue, JobRunner
+from media_store import MediaStore
+from youtube_ids import unique_urls
+
 # Paths
 BASE_DIR = Path(__file__).parent
 URLS_FILE = BASE_DIR / "urls.txt"
 DOWNLOADS_DIR = Path("/home/imccw/Downloads/audio-downloads")  # or just "/home/imccw/Downloads"
 DOWNLOADS_DIR.mkdir(exist_ok=True)
+DOWNLOADS_PAGE_SIZE = 50
+
+
+@st.cache_resource
+def get_media_store() -> MediaStore:
+    """The media store shared with 2025-12-02_youtube.py, opened once per process."""
+    return MediaStore()
+
+
+@st.cache_resource
+def get_pipeline() -> AudioPipeline:
+    """Download and transcode worker pools, shared by every session of the app."""
+    return AudioPipeline(DOWNLOADS_DIR, get_media_store(), DownloadIndex())
+
+
+@st.cache_resource
+def get_job_queue() -> JobQueue:
+    return JobQueue()
+
+
+@st.cache_resource
+def get_job_runner() -> JobRunner:
+    """Started once per server process; it outlives every script rerun and session."""
+    return JobRunner(get_job_queue(), get_pipeline(), max_in_flight=DOWNLOAD_WORKERS * 2)
+
+
+JOB_ICONS = {"queued": "⏳", "running": "🔄", "done": "✅", "failed": "❌"}
+STAGE_ICONS = {"idle": "💤", "metadata": "🔎", "downloading": "⬇️", "transcoding": "🎛️"}
+
+
+def render_worker_status(pipeline: AudioPipeline) -> None:
+    """One line per worker thread with its stage, current title and progress."""
+    statuses = pipeline.snapshot()
+    if not statuses:
+        st.caption("Workers starting...")
+        return
+    for status in statuses:
+        label = status.title or status.url[:60]
+        line = f"{STAGE_ICONS.get(status.stage, '')} `{status.worker}` {status.stage}"
+        if label:
+            line += f" — {label}"
+        if status.detail:
+            line += f" ({status.detail})"
+        st.write(line)
+        if status.stage == "downloading" and status.progress is not None:
+            st.progress(min(status.progress, 1.0))
 
 
 def load_urls_from_file(file_path: Path) -> List[str]:
@@ -36,132 +89,117 @@ def save_urls_to_file(file_path: Path, urls: List[str]) -> None:
         return False
 
 
-def sanitise_filename_part(value: str) -> str:
-    """Clean a string to be safe for filenames."""
-    if not value:
-        return "unknown"
-    
-    # Remove invalid characters
-    invalid_chars = r'<>:"/\|?*'
-    for char in invalid_chars:
-        value = value.replace(char, '_')
-    
-    # Replace multiple spaces with single space
-    value = re.sub(r'\s+', ' ', value)
-    
-    # Remove leading/trailing spaces
-    value = value.strip()
-    
-    # Limit length
-    return value[:100]
+@st.fragment(run_every=2)
+def render_job_queue() -> None:
+    """Queue state, refreshed every two seconds without rerunning the whole page."""
+    queue = get_job_queue()
+    runner = get_job_runner()
+    counts = queue.counts()
 
+    st.subheader("📥 Download Queue")
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Queued", counts["queued"])
+    with col2:
+        st.metric("Running", counts["running"])
+    with col3:
+        st.metric("Done", counts["done"])
+    with col4:
+        st.metric("Failed", counts["failed"])
+    if runner.requeued:
+        st.caption(f"Resumed {runner.requeued} jobs interrupted by the last restart.")
 
-def extract_video_info(url: str) -> Tuple[str, str]:
-    """Extract video information without downloading."""
-    ydl_opts = {
-        'quiet': True,
-        'no_warnings': True,
-    }
-    
-    try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=False)
-            title = info.get('title', 'Untitled')
-            video_id = info.get('id', str(int(time.time())))
-            return title, video_id
-    except Exception:
-        # Fallback if we can't extract info
-        return "Unknown", str(int(time.time()))
+    if counts["running"]:
+        with st.expander("Workers", expanded=True):
+            render_worker_status(runner.pipeline)
 
+    now = time.time()
+    with st.expander("Jobs", expanded=bool(counts["queued"] or counts["running"])):
+        for job in queue.recent():
+            line = f"{JOB_ICONS.get(job.status, '')} **{job.title or job.url}**"
+            if job.status == "done":
+                line += f" — {job.result}"
+            elif job.status == "queued" and job.attempts:
+                wait = max(0, int(job.next_run_at - now))
+                line += f" — retry {job.attempts + 1}/{job.max_attempts} in {wait}s"
+            if job.error and job.status != "done":
+                line += f"  \n`{job.error[:200]}`"
+            st.write(line)
 
-def download_audio_for_owned_content(url: str) -> Tuple[str, str, Path]:
-    """
-    Download audio from a URL as MP3.
-    IMPORTANT: Only use for content you own/have rights to.
-    
-    Returns: (title, id, output_path)
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("Retry failed", disabled=not counts["failed"]):
+            queue.retry_failed()
+            runner.wake()
+    with col2:
+        if st.button("Clear finished", disabled=not (counts["done"] or counts["failed"])):
+            queue.clear_finished()
+
+
+@st.cache_data(max_entries=8)
+def list_downloads(directory: str, mtime_ns: int) -> List[Tuple[str, int, float]]:
+    """(name, size, mtime) of every MP3 in `directory`, newest first.
+
+    `mtime_ns` is only part of the cache key: adding, removing or renaming a
+    file changes the directory's mtime, so the listing is rebuilt then and
+    reused on every other rerun.
     """
-    try:
-        # First, extract video information
-        title, video_id = extract_video_info(url)
-        
-        # Sanitize title for filename
-        safe_title = sanitise_filename_part(title)
-        
-        # Create filename
-        filename = f"{safe_title}-{video_id}.mp3"
-        output_path = DOWNLOADS_DIR / filename
-        
-        # Check if file already exists
-        if output_path.exists():
-            st.info(f"File already exists: {filename}")
-            return title, video_id, output_path
-        
-        # Download audio configuration
-        ydl_opts = {
-            'format': 'bestaudio/best',
-            'outtmpl': str(DOWNLOADS_DIR / f'{safe_title}-{video_id}.%(ext)s'),
-            'quiet': False,
-            'no_warnings': True,
-            'postprocessors': [{
-                'key': 'FFmpegExtractAudio',
-                'preferredcodec': 'mp3',
-                'preferredquality': '192',
-            }],
-            'progress_hooks': [lambda d: None],  # You can add progress hooks here
-        }
-        
-        # Download the audio
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=True)
-            
-            # Get the actual filename that was saved
-            downloaded_files = list(DOWNLOADS_DIR.glob(f"{safe_title}-{video_id}.*"))
-            if downloaded_files:
-                output_path = downloaded_files[0]
-        
-        return title, video_id, output_path
-        
-    except Exception as e:
-        st.error(f"Error downloading {url}: {e}")
-        # Return a fallback filename
-        timestamp = str(int(time.time()))
-        fallback_path = DOWNLOADS_DIR / f"error-{timestamp}.mp3"
-        fallback_path.write_bytes(b"")  # Create empty file
-        return "Error", timestamp, fallback_path
+    entries = []
+    with os.scandir(directory) as it:
+        for entry in it:
+            if entry.name.endswith(".mp3") and entry.is_file():
+                info = entry.stat()
+                entries.append((entry.name, info.st_size, info.st_mtime))
+    # Sort by modification time (newest first)
+    entries.sort(key=lambda item: item[2], reverse=True)
+    return entries
+
+
+def read_download(name: str) -> bytes:
+    """Called by the download button only when it is clicked."""
+    return (DOWNLOADS_DIR / name).read_bytes()
 
 
 def display_downloaded_files():
-    """Display all downloaded MP3 files."""
-    mp3_files = list(DOWNLOADS_DIR.glob("*.mp3"))
-    
+    """Display downloaded MP3 files a page at a time."""
+    mp3_files = list_downloads(str(DOWNLOADS_DIR), DOWNLOADS_DIR.stat().st_mtime_ns)
+
     if not mp3_files:
         st.info("No MP3 files downloaded yet.")
         return
-    
+
     st.subheader("📁 Downloaded Files")
-    
-    # Sort by modification time (newest first)
-    mp3_files.sort(key=lambda x: x.stat().st_mtime, reverse=True)
-    
-    for i, mp3_file in enumerate(mp3_files, 1):
-        file_size = mp3_file.stat().st_size / (1024 * 1024)  # Convert to MB
+
+    query = st.text_input("Filter by name", key="downloads_filter").strip().lower()
+    if query:
+        mp3_files = [item for item in mp3_files if query in item[0].lower()]
+
+    pages = max(1, math.ceil(len(mp3_files) / DOWNLOADS_PAGE_SIZE))
+    # A narrower filter can leave the stored page past the end.
+    st.session_state.downloads_page = min(st.session_state.get("downloads_page", 1), pages)
+    page = st.number_input("Page", min_value=1, max_value=pages, step=1, key="downloads_page")
+    start = (page - 1) * DOWNLOADS_PAGE_SIZE
+    st.caption(f"{len(mp3_files)} files · page {page} of {pages}")
+
+    for i, (name, size, _) in enumerate(mp3_files[start:start + DOWNLOADS_PAGE_SIZE], start + 1):
         col1, col2, col3 = st.columns([6, 2, 2])
-        
+
         with col1:
-            st.write(f"**{i}. {mp3_file.name}**")
-        
+            st.write(f"**{i}. {name}**")
+
         with col2:
-            st.write(f"{file_size:.2f} MB")
-        
+            st.write(f"{size / (1024 * 1024):.2f} MB")
+
         with col3:
-            with open(mp3_file, "rb") as f:
-                st.download_button(
-                    label="Download",
-                    data=f,
-                    file_name=mp3_file.name,
-                    key=f"dl_{i}",
-                )
+            st.download_button(
+                label="Download",
+                # Deferred: the file is read when the button is clicked, not on every rerun.
+                data=partial(read_download, name),
+                file_name=name,
+                mime="audio/mpeg",
+                key=f"dl_{name}",
+                on_click="ignore",
+            )
 
 
 def main():
@@ -170,6 +208,8 @@ def main():
         page_icon="🎵",
         layout="wide"
     )
+    # Start the background download runner (and resume interrupted jobs) on any page.
+    get_job_runner()
     
     st.title("🎵 Batch URL Audio Processor")
     st.markdown("---")
@@ -226,9 +266,12 @@ def main():
             if st.button("Clear Input", type="secondary"):
                 st.session_state.url_input = ""
         
-        # Combine URLs
+        # Combine URLs, collapsing different links to the same video
         new_urls = [line.strip() for line in user_urls_text.splitlines() if line.strip()]
-        all_urls = list(dict.fromkeys(existing_urls + new_urls))
+        combined = existing_urls + new_urls
+        all_urls = unique_urls(combined)
+        if len(all_urls) < len(dict.fromkeys(combined)):
+            st.caption(f"Merged {len(dict.fromkeys(combined)) - len(all_urls)} links that point to the same video.")
         
         # Display URLs to process
         st.subheader(f"URLs to Process ({len(all_urls)})")
@@ -262,87 +305,20 @@ def main():
                 if auto_save and new_urls:
                     save_urls_to_file(URLS_FILE, all_urls)
                 
-                # Process limited number of URLs
+                # Queue a limited number of URLs; the background runner processes them
+                # even if this page is left or reloaded.
                 urls_to_process = all_urls[:limit]
-                
-                # Initialize progress tracking
-                progress_bar = st.progress(0)
-                status_text = st.empty()
-                results_container = st.container()
-                
-                results = []
-                successful = 0
-                failed = 0
-                
-                for idx, url in enumerate(urls_to_process, 1):
-                    status_text.text(f"Processing {idx}/{len(urls_to_process)}: {url[:80]}...")
-                    
-                    # Check if file already exists (if skip_existing is enabled)
-                    if skip_existing:
-                        try:
-                            title, video_id = extract_video_info(url)
-                            safe_title = sanitise_filename_part(title)
-                            filename = f"{safe_title}-{video_id}.mp3"
-                            existing_file = DOWNLOADS_DIR / filename
-                            
-                            if existing_file.exists():
-                                st.warning(f"⏭️ Skipping (already exists): {filename}")
-                                results.append({
-                                    "url": url,
-                                    "title": title,
-                                    "id": video_id,
-                                    "file": str(existing_file),
-                                    "status": "skipped"
-                                })
-                                progress_bar.progress(idx / len(urls_to_process))
-                                continue
-                        except:
-                            pass  # Continue with download if we can't check
-                    
-                    # Download the audio
-                    with st.spinner(f"Downloading {url[:50]}..."):
-                        try:
-                            title, vid_id, output_path = download_audio_for_owned_content(url)
-                            
-                            if output_path.exists() and output_path.stat().st_size > 0:
-                                results.append({
-                                    "url": url,
-                                    "title": title,
-                                    "id": vid_id,
-                                    "file": str(output_path),
-                                    "status": "success"
-                                })
-                                successful += 1
-                            else:
-                                st.error(f"❌ Download failed for: {url}")
-                                failed += 1
-                        except Exception as e:
-                            st.error(f"❌ Error processing {url}: {e}")
-                            failed += 1
-                    
-                    progress_bar.progress(idx / len(urls_to_process))
-                
-                # Display results
-                status_text.text("✅ Processing complete!")
-                
-                if results:
-                    with results_container:
-                        st.subheader("📊 Processing Results")
-                        col1, col2, col3 = st.columns(3)
-                        with col1:
-                            st.metric("Total", len(urls_to_process))
-                        with col2:
-                            st.metric("Successful", successful)
-                        with col3:
-                            st.metric("Failed", failed)
-                        
-                        # Show detailed results
-                        with st.expander("View Detailed Results"):
-                            for item in results:
-                                status_icon = "✅" if item.get("status") in ["success", "skipped"] else "❌"
-                                st.write(f"{status_icon} **{item['title']}** - `{item['file']}`")
+                added = get_job_queue().enqueue(urls_to_process, skip_existing=skip_existing)
+                get_job_runner().wake()
+                already = len(urls_to_process) - added
+                st.success(
+                    f"Queued {added} URLs."
+                    + (f" {already} were already queued or running." if already else "")
+                )
         else:
             st.warning("No URLs to process. Please add URLs above.")
+
+        render_job_queue()
     
     elif page == "View Downloads":
         st.header("Downloaded Files")
@@ -391,7 +367,7 @@ def main():
                 st.write(f"Found {len(uploaded_urls)} URLs in uploaded file")
                 
                 if uploaded_urls and st.button("Add Uploaded URLs"):
-                    combined_urls = list(dict.fromkeys(current_urls + uploaded_urls))
+                    combined_urls = unique_urls(current_urls + uploaded_urls)
                     if save_urls_to_file(URLS_FILE, combined_urls):
                         st.success(f"Added {len(uploaded_urls)} URLs! Total: {len(combined_urls)}")
                         st.rerun()
@@ -0,0 +1,222 @@
+"""Concurrent download and MP3 conversion for the batch audio processor (app.py).
+
+Each URL goes through two stages on separate thread pools so each resource
+gets its own bound: downloading (network-bound, `download_workers` threads)
+and converting to MP3 with FFmpeg (CPU-bound, `transcode_workers` threads, each
+driving one ffmpeg process). Metadata is extracted once per URL and reused for
+the skip check, the file name and the download itself. Finished MP3s go into
+the shared media store (media_store.py) and are linked into the downloads
+folder, and the download index (download_index.py) records them so a URL seen
+before is skipped without any network call.
+
+Every worker thread publishes what it is doing in a status table that the
+Streamlit page polls with `snapshot()`.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import shutil
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from pathlib import Path
+
+import yt_dlp
+from yt_dlp.postprocessor import FFmpegExtractAudioPP
+
+from download_index import DownloadIndex
+from media_store import MediaStore, file_sha256
+from youtube_ids import media_key, media_key_from_info
+
+# Key of the MP3 rendition in the shared media store.
+AUDIO_FORMAT = "mp3-192"
+DOWNLOAD_WORKERS = int(os.getenv("AUDIO_DOWNLOAD_WORKERS", "3"))
+TRANSCODE_WORKERS = int(os.getenv("AUDIO_TRANSCODE_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+
+
+def sanitise_filename_part(value: str) -> str:
+    """Clean a string to be safe for filenames."""
+    if not value:
+        return "unknown"
+
+    # Remove invalid characters
+    invalid_chars = r'<>:"/\|?*'
+    for char in invalid_chars:
+        value = value.replace(char, '_')
+
+    # Replace multiple spaces with single space
+    value = re.sub(r'\s+', ' ', value)
+
+    # Remove leading/trailing spaces
+    value = value.strip()
+
+    # Limit length
+    return value[:100]
+
+
+def link_or_copy(source: Path, target: Path) -> None:
+    """Expose a store object in the downloads folder, copying across filesystems."""
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+
+
+@dataclass(frozen=True)
+class WorkerStatus:
+    worker: str
+    stage: str = "idle"  # idle | metadata | downloading | transcoding
+    url: str = ""
+    title: str = ""
+    progress: float | None = None  # 0-1 while downloading, when the size is known
+    detail: str = ""
+    updated: float = 0.0
+
+
+@dataclass(frozen=True)
+class AudioResult:
+    url: str
+    status: str  # success | cached | skipped | failed
+    title: str = ""
+    video_id: str = ""
+    file: Path | None = None
+    error: str = ""
+
+
+class AudioPipeline:
+    def __init__(
+        self,
+        downloads_dir: Path,
+        store: MediaStore,
+        index: DownloadIndex | None = None,
+        *,
+        download_workers: int = DOWNLOAD_WORKERS,
+        transcode_workers: int = TRANSCODE_WORKERS,
+    ):
+        self.downloads_dir = Path(downloads_dir)
+        self.store = store
+        self.index = index
+        self._downloads = ThreadPoolExecutor(download_workers, thread_name_prefix="download")
+        self._transcodes = ThreadPoolExecutor(transcode_workers, thread_name_prefix="transcode")
+        self._status: dict[str, WorkerStatus] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, url: str, *, skip_existing: bool = True) -> Future:
+        """Queue `url`; the future resolves to an AudioResult once it is fully processed."""
+        result: Future = Future()
+        self._downloads.submit(self._download_stage, url, skip_existing, result)
+        return result
+
+    def snapshot(self) -> list[WorkerStatus]:
+        with self._lock:
+            return sorted(self._status.values(), key=lambda status: status.worker)
+
+    def shutdown(self) -> None:
+        self._downloads.shutdown(wait=False, cancel_futures=True)
+        self._transcodes.shutdown(wait=False, cancel_futures=True)
+
+    def _update(self, **changes) -> None:
+        worker = threading.current_thread().name
+        with self._lock:
+            current = self._status.get(worker, WorkerStatus(worker))
+            self._status[worker] = replace(current, updated=time.time(), **changes)
+
+    def _idle(self) -> None:
+        self._update(stage="idle", url="", title="", progress=None, detail="")
+
+    def _record(self, url: str, key: str, title: str, output: Path, sha256: str) -> None:
+        if self.index:
+            self.index.record(url, key, title, output, sha256)
+
+    def _progress_hook(self, event: dict) -> None:
+        if event.get("status") != "downloading":
+            return
+        total = event.get("total_bytes") or event.get("total_bytes_estimate")
+        done = event.get("downloaded_bytes") or 0
+        speed = event.get("speed")
+        self._update(
+            progress=done / total if total else None,
+            detail=f"{done / 1e6:.1f} MB" + (f" at {speed / 1e6:.1f} MB/s" if speed else ""),
+        )
+
+    def _download_stage(self, url: str, skip_existing: bool, result: Future) -> None:
+        if not result.set_running_or_notify_cancel():
+            return
+        try:
+            self._update(stage="metadata", url=url, title="", progress=None, detail="")
+            record = self.index.lookup(url) if self.index else None
+            if skip_existing and record is not None:
+                result.set_result(AudioResult(url, "skipped", record.title, record.video_id, record.path))
+                return
+            key = (self.index.media_key(url) if self.index else None) or media_key(url)
+            stored = self.store.get(key, AUDIO_FORMAT) if key else None
+            info = None
+            if stored is None:
+                with yt_dlp.YoutubeDL({'quiet': True, 'no_warnings': True}) as ydl:
+                    info = ydl.extract_info(url, download=False)
+                key = media_key_from_info(info)
+                if self.index:
+                    self.index.remember_url(url, key)
+                stored = self.store.get(key, AUDIO_FORMAT)
+            title = stored.title if stored else info.get('title') or 'Untitled'
+            video_id = key.split(":", 1)[1]
+            output = self.downloads_dir / f"{sanitise_filename_part(title)}-{video_id}.mp3"
+
+            if skip_existing and output.exists():
+                # Downloaded before the index existed; index it now.
+                self._record(url, key, title, output, stored.sha256 if stored else file_sha256(output))
+                result.set_result(AudioResult(url, "skipped", title, video_id, output))
+                return
+            if stored is not None:
+                output.unlink(missing_ok=True)
+                link_or_copy(stored.path, output)
+                self._record(url, key, title, output, stored.sha256)
+                result.set_result(AudioResult(url, "cached", title, video_id, output))
+                return
+
+            self._update(stage="downloading", title=title)
+            # Named after the video so a retry finds yt-dlp's .part file and resumes it.
+            scratch = self.store.root / "tmp" / f"audio-{hashlib.sha256(key.encode()).hexdigest()[:16]}"
+            scratch.mkdir(exist_ok=True)
+            ydl_opts = {
+                'format': 'bestaudio/best',
+                'outtmpl': str(scratch / 'audio.%(ext)s'),
+                'quiet': True,
+                'no_warnings': True,
+                'progress_hooks': [self._progress_hook],
+            }
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                # Reuse the metadata we already have instead of extracting it again.
+                downloaded = ydl.process_ie_result(info, download=True)
+            source = Path(downloaded['requested_downloads'][0]['filepath'])
+            # The transcode stage removes the scratch folder; after a failure it is
+            # kept so the next attempt can resume.
+            self._transcodes.submit(self._transcode_stage, url, key, title, source, output, result)
+        except Exception as exc:
+            result.set_result(AudioResult(url, "failed", error=str(exc)))
+        finally:
+            self._idle()
+
+    def _transcode_stage(
+        self, url: str, key: str, title: str, source: Path, output: Path, result: Future
+    ) -> None:
+        video_id = key.split(":", 1)[1]
+        try:
+            self._update(stage="transcoding", url=url, title=title, progress=None, detail=source.name)
+            with yt_dlp.YoutubeDL({'quiet': True, 'no_warnings': True}) as ydl:
+                converter = FFmpegExtractAudioPP(ydl, preferredcodec='mp3', preferredquality='192')
+                _, info = converter.run({'filepath': str(source), 'ext': source.suffix.lstrip('.')})
+            stored = self.store.put(key, AUDIO_FORMAT, Path(info['filepath']), title=title, move=True)
+            output.unlink(missing_ok=True)
+            link_or_copy(stored.path, output)
+            self._record(url, key, title, output, stored.sha256)
+            result.set_result(AudioResult(url, "success", title, video_id, output))
+        except Exception as exc:
+            result.set_result(AudioResult(url, "failed", title, video_id, error=str(exc)))
+        finally:
+            shutil.rmtree(source.parent, ignore_errors=True)
+            self._idle()
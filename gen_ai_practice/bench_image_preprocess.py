@@ -0,0 +1,129 @@
+"""Compare upload payloads and latency with and without image preprocessing.
+
+Run from the repository root:
+
+    python gen_ai_practice/bench_image_preprocess.py [photo.jpg ...] [--live]
+
+Without arguments it generates a 12 MP phone-style JPEG and a large PNG
+screenshot. For each image it reports the base64 payload and preparation time
+of today's path (raw upload, base64-encoded) against `preprocess_image`.
+With --live it also sends both payloads to Gemini and reports end-to-end
+latency (needs GEMINI_API_KEY).
+"""
+
+import argparse
+import base64
+import os
+import statistics
+import time
+from io import BytesIO
+from pathlib import Path
+
+from PIL import Image, ImageDraw
+
+from image_preprocess import preprocess_image
+
+NUTRITION_REQUEST = (
+    "Assess the food in the image and reply only with a JSON object that estimates the "
+    'macronutrients for a typical portion, using the keys "protein_g", "carbs_g" and "fat_g".'
+)
+
+
+def synthetic_images() -> dict[str, tuple[bytes, str]]:
+    """A noisy 4032x3024 photo with EXIF and a flat 2560x1600 PNG screenshot."""
+    photo = Image.merge(
+        "RGB",
+        [Image.effect_noise((4032, 3024), sigma).convert("L") for sigma in (40, 55, 70)],
+    )
+    exif = Image.Exif()
+    exif[0x010F] = "Synthetic Camera"
+    exif[0x0112] = 1
+    photo_bytes = BytesIO()
+    photo.save(photo_bytes, "JPEG", quality=92, exif=exif)
+
+    screenshot = Image.new("RGB", (2560, 1600), "white")
+    draw = ImageDraw.Draw(screenshot)
+    for row in range(0, 1600, 40):
+        draw.rectangle((40, row + 8, 2520, row + 30), fill=(230, 236, 245) if row % 80 else (250, 250, 250))
+        draw.text((60, row + 12), f"Meal log entry {row // 40}: rice, chicken, vegetables", fill="black")
+    screenshot_bytes = BytesIO()
+    screenshot.save(screenshot_bytes, "PNG")
+
+    return {
+        "photo-12mp.jpg": (photo_bytes.getvalue(), "image/jpeg"),
+        "screenshot.png": (screenshot_bytes.getvalue(), "image/png"),
+    }
+
+
+def load_images(paths: list[str]) -> dict[str, tuple[bytes, str]]:
+    images = {}
+    for raw in paths:
+        path = Path(raw)
+        mime = "image/png" if path.suffix.lower() == ".png" else "image/jpeg"
+        images[path.name] = (path.read_bytes(), mime)
+    return images
+
+
+def time_call(fn, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return result, statistics.median(timings) * 1000
+
+
+def make_live_caller():
+    from dotenv import load_dotenv
+    from langchain_core.messages import HumanMessage
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    load_dotenv()
+    llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash", api_key=os.getenv("GEMINI_API_KEY"))
+
+    def call(data_url: str) -> None:
+        llm.invoke([
+            HumanMessage(content=[
+                {"type": "text", "text": NUTRITION_REQUEST},
+                {"type": "image_url", "image_url": {"url": data_url, "detail": "high"}},
+            ])
+        ])
+
+    return call
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("images", nargs="*", help="image files to use instead of synthetic ones")
+    parser.add_argument("--repeat", type=int, default=5, help="local timing runs per image")
+    parser.add_argument("--live", action="store_true", help="also measure Gemini round trips")
+    parser.add_argument("--live-repeat", type=int, default=3, help="Gemini calls per image and path")
+    args = parser.parse_args()
+
+    images = load_images(args.images) if args.images else synthetic_images()
+    live_call = make_live_caller() if args.live else None
+
+    header = f"{'image':<18}{'path':<10}{'payload KB':>12}{'prep ms':>10}"
+    if live_call:
+        header += f"{'e2e ms':>10}"
+    print(header)
+    print("-" * len(header))
+
+    for name, (data, mime) in images.items():
+        raw_url, raw_ms = time_call(
+            lambda: f"data:{mime};base64,{base64.b64encode(data).decode()}", args.repeat
+        )
+        prepared, prep_ms = time_call(lambda: preprocess_image(data), args.repeat)
+        rows = (("today", raw_url, raw_ms), ("prepared", prepared.data_url, prep_ms))
+
+        for label, url, ms in rows:
+            line = f"{name:<18}{label:<10}{len(url) / 1024:>12.1f}{ms:>10.1f}"
+            if live_call:
+                _, call_ms = time_call(lambda: live_call(url), args.live_repeat)
+                line += f"{ms + call_ms:>10.0f}"
+            print(line)
+        print(f"{'':<18}{'':<10}{1 - len(prepared.data_url) / len(raw_url):>11.1%} smaller")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Speedup of parallel PDF extraction and splitting against PyPDFLoader.load_and_split.
+
+Run from the repository root:
+
+    python gen_ai_practice/bench_parallel_pdf.py [file.pdf ...] [--workers 1,2,4]
+
+Defaults to media/diabetes.pdf and media/ocean.pdf, split as in example4
+(RecursiveCharacterTextSplitter, chunk_size=500, chunk_overlap=100), and to
+worker counts doubling up to the number of cores. Each row is the best of
+--repeat runs and includes starting the process pool. Every run is also
+checked to produce exactly the chunks (text and metadata) load_and_split
+produces.
+"""
+
+import argparse
+import os
+import time
+import warnings
+from pathlib import Path
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from parallel_pdf import load_and_split_pdf
+
+MEDIA = Path(__file__).resolve().parent.parent / "media"
+
+
+def best_of(repeat: int, fn):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdfs", nargs="*", default=[str(MEDIA / "diabetes.pdf"), str(MEDIA / "ocean.pdf")])
+    cores = os.cpu_count() or 1
+    default_workers = sorted({1, *(2 ** i for i in range(cores.bit_length()) if 2 ** i <= cores), cores})
+    parser.add_argument("--workers", default=",".join(map(str, default_workers)))
+    parser.add_argument("--pages-per-shard", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore", category=DeprecationWarning)
+    from langchain_community.document_loaders import PyPDFLoader
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=100)
+    print(f"{cores} cores")
+    for pdf in args.pdfs:
+        baseline, expected = best_of(args.repeat, lambda: PyPDFLoader(pdf).load_and_split(splitter))
+        print(f"\n{Path(pdf).name}: {len(expected)} chunks")
+        header = f"{'loader':<22}{'seconds':>9}{'speedup':>9}{'same chunks':>13}"
+        print(header)
+        print("-" * len(header))
+        print(f"{'PyPDFLoader':<22}{baseline:>9.2f}{1:>8.2f}x{'-':>13}")
+        for workers in (int(n) for n in args.workers.split(",")):
+            seconds, chunks = best_of(
+                args.repeat,
+                lambda: load_and_split_pdf(pdf, splitter, workers=workers, pages_per_shard=args.pages_per_shard),
+            )
+            same = [(c.page_content, c.metadata) for c in chunks] == [(c.page_content, c.metadata) for c in expected]
+            print(f"{f'parallel, {workers} workers':<22}{seconds:>9.2f}{baseline / seconds:>8.2f}x{str(same):>13}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Measure per-request prompt/chain overhead before and after the prompt registry.
+
+Run from the repository root:
+
+    python gen_ai_practice/bench_prompt_registry.py [--requests 2000]
+
+Gemini is replaced by a fake chat model that answers instantly, so the numbers
+are the framework overhead each request pays on top of the network call:
+building the prompt and chain per request (before) versus invoking a chain
+compiled once at startup (after).
+
+Before timing, it checks that prompt versions are the same in a fresh
+interpreter (caches key on them) and that compile() hands back a compiled
+chain only for an llm and parser configured the same way, new objects
+included.
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+
+from prompt_registry import PromptRegistry, registry
+
+IMAGE_URL = "data:image/webp;base64," + "A" * 40_000
+NUTRITION_TEXT = registry.prompt("nutrition-image").template.messages[1].prompt[0].template
+
+
+def nutrition_before(llm) -> None:
+    # What analyze_image did on every request before the registry.
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", "You are a nutrition expert capable of analysing food images and providing detailed nutritional advice."),
+        ("human", [
+            {"type": "text", "text": NUTRITION_TEXT},
+            {"type": "image_url", "image_url": {"url": IMAGE_URL, "detail": "high"}},
+        ]),
+    ])
+    chain = prompt | llm
+    chain.invoke({})
+
+
+def translate_before(llm) -> None:
+    # main.py built a message list per request and called the model directly.
+    llm.invoke([
+        {"role": "system", "content": "You are a helpful translation assistant."},
+        {"role": "user", "content": "Translate like a local.\n\nTranslate the following text from English to Malay:\nGood morning"},
+    ])
+
+
+def check_registry() -> None:
+    """Exit with an error if prompt versions or compiled-chain reuse are wrong."""
+    fresh = subprocess.run(
+        [sys.executable, "-c", "import json, prompt_registry; print(json.dumps(prompt_registry.registry.versions()))"],
+        capture_output=True, text=True, check=True,
+    )
+    changed = sorted(
+        name for name, version in json.loads(fresh.stdout).items() if registry.versions()[name] != version
+    )
+    if changed:
+        sys.exit(f"Prompt versions differ between two imports: {changed}")
+
+    check = PromptRegistry()
+    spec = registry.prompt("translate")
+    check.register("translate", spec.template, input_variables=set(spec.input_variables))
+    first, second = FakeListChatModel(responses=["a"]), FakeListChatModel(responses=["b"])
+    chain = check.compile("translate", first, parser=StrOutputParser())
+    if check.compile("translate", first, parser=StrOutputParser()) is not chain:
+        sys.exit("compile() rebuilt a chain for the same configuration")
+    if check.compile("translate", second, parser=StrOutputParser()) is chain or check.compile("translate", first) is chain:
+        sys.exit("compile() returned a chain compiled for another llm or parser")
+
+
+def per_request_us(fn, requests: int) -> float:
+    fn()  # warm-up
+    start = time.perf_counter()
+    for _ in range(requests):
+        fn()
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    check_registry()
+    llm = FakeListChatModel(responses=['{"protein_g": "20g", "carbs_g": "45g", "fat_g": "12g"}'])
+
+    # Compile into a private registry so the timings don't show up in the shared stats.
+    bench = PromptRegistry()
+    for name in ("nutrition-image", "translate"):
+        spec = registry.prompt(name)
+        bench.register(name, spec.template, input_variables=set(spec.input_variables))
+    nutrition = bench.compile("nutrition-image", llm)
+    translate = bench.compile("translate", llm)
+
+    startup = time.perf_counter()
+    PromptRegistry().register(
+        "nutrition-image",
+        registry.prompt("nutrition-image").template,
+        input_variables={"image_url"},
+    )
+    startup_us = (time.perf_counter() - startup) * 1e6
+
+    cases = [
+        (
+            "nutrition-image",
+            lambda: nutrition_before(llm),
+            lambda: nutrition.invoke({"image_url": IMAGE_URL}),
+        ),
+        (
+            "translate",
+            lambda: translate_before(llm),
+            lambda: translate.invoke({
+                "instruction": "Translate like a local.",
+                "input_language": "English",
+                "output_language": "Malay",
+                "text": "Good morning",
+            }),
+        ),
+    ]
+
+    header = f"{'chain':<18}{'before us':>12}{'after us':>12}{'saved':>9}"
+    print(header)
+    print("-" * len(header))
+    for name, before, after in cases:
+        before_us = per_request_us(before, args.requests)
+        after_us = per_request_us(after, args.requests)
+        print(f"{name:<18}{before_us:>12.1f}{after_us:>12.1f}{1 - after_us / before_us:>9.1%}")
+    print(f"\nOne-time registration cost: {startup_us:.0f} us")
+    print("Latency recorded by the compiled chains:")
+    for name, stats in bench.stats().items():
+        print(f"  {name}: {stats}")
+
+
+if __name__ == "__main__":
+    main()
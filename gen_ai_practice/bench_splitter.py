@@ -0,0 +1,76 @@
+"""FastRecursiveSplitter against RecursiveCharacterTextSplitter: same chunks, less time.
+
+Run from the repository root:
+
+    python gen_ai_practice/bench_splitter.py [file.pdf ...] [--sizes 500:100,1000:200]
+
+Pages are extracted once with pypdf (media/diabetes.pdf and media/ocean.pdf
+by default) and split by both splitters for every chunk_size:chunk_overlap
+pair, then the same again on the pages of every PDF joined into one long
+text. Each split is checked to give identical chunks, and the time is the
+best of --repeat passes. The extraction time is printed too, to show what
+share of loading a PDF splitting accounts for.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import pypdf
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from fast_splitter import FastRecursiveSplitter
+
+MEDIA = Path(__file__).resolve().parent.parent / "media"
+
+
+def best_of(repeat: int, fn) -> tuple[float, list]:
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdfs", nargs="*", default=[str(MEDIA / "diabetes.pdf"), str(MEDIA / "ocean.pdf")])
+    parser.add_argument("--sizes", default="500:100,200:0,1000:200", help="chunk_size:chunk_overlap pairs")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    pages = [
+        page.extract_text(extraction_mode="plain").strip()
+        for pdf in args.pdfs
+        for page in pypdf.PdfReader(pdf).pages
+    ]
+    extraction = time.perf_counter() - start
+    corpora = {"per page": pages, "joined": ["\n\n".join(pages)]}
+    print(f"{len(pages)} pages, {sum(map(len, pages)) / 1e3:.0f} kB of text, extracted in {extraction:.2f}s")
+
+    header = f"{'size:overlap':<14}{'input':<10}{'chunks':>8}{'langchain ms':>14}{'fast ms':>10}{'speedup':>9}{'same':>6}"
+    print(header)
+    print("-" * len(header))
+    mismatches = 0
+    for pair in args.sizes.split(","):
+        size, overlap = (int(n) for n in pair.split(":"))
+        reference = RecursiveCharacterTextSplitter(chunk_size=size, chunk_overlap=overlap)
+        fast = FastRecursiveSplitter(chunk_size=size, chunk_overlap=overlap)
+        for name, texts in corpora.items():
+            slow_s, expected = best_of(args.repeat, lambda: [reference.split_text(t) for t in texts])
+            fast_s, chunks = best_of(args.repeat, lambda: [fast.split_text(t) for t in texts])
+            same = chunks == expected
+            mismatches += not same
+            print(
+                f"{pair:<14}{name:<10}{sum(map(len, chunks)):>8}{slow_s * 1e3:>14.2f}{fast_s * 1e3:>10.2f}"
+                f"{slow_s / fast_s:>8.2f}x{'yes' if same else 'NO':>6}"
+            )
+    if mismatches:
+        sys.exit(f"{mismatches} splits differ from RecursiveCharacterTextSplitter")
+
+
+if __name__ == "__main__":
+    main()
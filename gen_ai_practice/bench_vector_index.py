@@ -0,0 +1,102 @@
+"""Recall and query latency of the IVF index against exact search in LocalVectorStore.
+
+Run from the repository root:
+
+    python gen_ai_practice/bench_vector_index.py [--sizes 10000,50000,200000] [--dim 256]
+
+The corpus is synthetic and clustered like real embeddings: unit vectors
+scattered around --clusters random topic directions. Queries are drawn the
+same way but are not in the corpus. For every corpus size the exact top-k is
+the reference; each --nprobe setting reports recall@k (share of the exact
+top-k found), median and p95 latency and queries per second of
+similarity_search_by_vector_with_score, so the timings include reading the
+hits back from SQLite.
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+os.environ["IVF_MIN_ROWS"] = "0"  # benchmark the index at every size
+
+import numpy as np
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from local_vector_store import LocalVectorStore
+
+
+def clustered(rng, count: int, centers: np.ndarray, spread: float) -> np.ndarray:
+    vectors = centers[rng.integers(len(centers), size=count)]
+    vectors = vectors + rng.normal(scale=spread / np.sqrt(centers.shape[1]), size=vectors.shape)
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def run_queries(store: LocalVectorStore, queries: np.ndarray, k: int, **kwargs) -> tuple[list[set], list[float]]:
+    results, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        hits = store.similarity_search_by_vector_with_score(query.tolist(), k, **kwargs)
+        latencies.append(time.perf_counter() - start)
+        results.append({doc.id for doc, _ in hits})
+    return results, latencies
+
+
+def report(label: str, results, exact, latencies, k: int) -> None:
+    recall = statistics.mean(len(found & truth) / k for found, truth in zip(results, exact))
+    ms = sorted(1000 * s for s in latencies)
+    p95 = ms[int(0.95 * (len(ms) - 1))]
+    print(f"{label:>14}{recall:>10.3f}{statistics.median(ms):>10.2f}{p95:>10.2f}{len(ms) / sum(latencies):>10.0f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,50000,200000", help="corpus sizes to try")
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--clusters", type=int, default=500, help="topic directions in the corpus")
+    parser.add_argument("--spread", type=float, default=1.0, help="noise around each topic")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, help="IVF lists (default ~4 * sqrt(n))")
+    parser.add_argument("--nprobe", default="1,4,16,64", help="lists probed per query")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(args.clusters, args.dim))
+    centers /= np.linalg.norm(centers, axis=1, keepdims=True)
+    queries = clustered(rng, args.queries, centers, args.spread)
+    embedding = DeterministicFakeEmbedding(size=args.dim)
+
+    for size in (int(n) for n in args.sizes.split(",")):
+        with tempfile.TemporaryDirectory(prefix="bench-vectors-") as tmpdir:
+            path = Path(tmpdir)
+            store = LocalVectorStore(path, embedding, index="flat")
+            for start in range(0, size, 50000):
+                count = min(50000, size - start)
+                store.add_vectors(
+                    clustered(rng, count, centers, args.spread),
+                    [f"doc {start + i}" for i in range(count)],
+                    ids=[str(start + i) for i in range(count)],
+                )
+            exact, exact_latencies = run_queries(store, queries, args.k)
+            store.close()
+
+            store = LocalVectorStore(path, embedding, index="ivf", nlist=args.nlist)
+            start = time.perf_counter()
+            index = store.build_index()
+            build = time.perf_counter() - start
+            print(f"\n{size} vectors x {args.dim} dims, nlist={index.nlist}, IVF build {build:.1f}s")
+            header = f"{'search':>14}{f'recall@{args.k}':>10}{'p50 ms':>10}{'p95 ms':>10}{'QPS':>10}"
+            print(header)
+            print("-" * len(header))
+            report("exact", exact, exact, exact_latencies, args.k)
+            for nprobe in (int(n) for n in args.nprobe.split(",")):
+                results, latencies = run_queries(store, queries, args.k, nprobe=nprobe)
+                report(f"ivf nprobe={nprobe}", results, exact, latencies, args.k)
+            store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Compare sending a whole video against sampled keyframes.
+
+Run from the repository root:
+
+    python gen_ai_practice/bench_video_modes.py [video.mp4] [--live]
+
+For the full-video path and each frame sampler it reports the request payload
+and the local preparation time. With --live it also sends every variant to
+Gemini (needs GEMINI_API_KEY), reports round-trip latency, and scores each
+frame-based answer against the full-video answer by word overlap (Jaccard of
+content words), a rough check that the frames still tell the same story.
+"""
+
+import argparse
+import base64
+import os
+import re
+import statistics
+import time
+from pathlib import Path
+
+from video_frames import frames_message, frames_payload_bytes, sample_frames
+
+DEFAULT_VIDEO = Path(__file__).resolve().parent.parent / "media" / "hyena.mp4"
+ANALYSIS_REQUEST = "Describe what's happening in this video."
+SYSTEM = "You are an expert video analyst. Provide accurate scene interpretation."
+STOPWORDS = set(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were with "
+    "video frame frames shows appears there which while".split()
+)
+
+
+def content_words(text: str) -> set[str]:
+    return {word for word in re.findall(r"[a-z]+", text.lower()) if word not in STOPWORDS and len(word) > 2}
+
+
+def overlap(a: str, b: str) -> float:
+    words_a, words_b = content_words(a), content_words(b)
+    if not words_a or not words_b:
+        return 0.0
+    return len(words_a & words_b) / len(words_a | words_b)
+
+
+def time_call(fn, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return result, statistics.median(timings) * 1000
+
+
+def make_live_callers():
+    from dotenv import load_dotenv
+    from langchain_core.messages import HumanMessage, SystemMessage
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    load_dotenv()
+    llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash", temperature=0.0, api_key=os.getenv("GEMINI_API_KEY"))
+
+    def call_video(encoded: str) -> str:
+        return llm.invoke([
+            SystemMessage(content=SYSTEM),
+            HumanMessage(content=[
+                {"type": "text", "text": ANALYSIS_REQUEST},
+                {"type": "media", "data": encoded, "mime_type": "video/mp4"},
+            ]),
+        ]).content
+
+    def call_frames(frames) -> str:
+        return llm.invoke([
+            SystemMessage(content=SYSTEM),
+            HumanMessage(content=ANALYSIS_REQUEST),
+            frames_message(frames),
+        ]).content
+
+    return call_video, call_frames
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("video", nargs="?", default=str(DEFAULT_VIDEO))
+    parser.add_argument("--repeat", type=int, default=3, help="local timing runs per variant")
+    parser.add_argument("--max-frames", type=int, default=32)
+    parser.add_argument("--live", action="store_true", help="also call Gemini and compare answers")
+    args = parser.parse_args()
+
+    path = Path(args.video)
+    variants = {
+        "frames fps=1": dict(mode="fps", fps=1.0),
+        "frames fps=0.5": dict(mode="fps", fps=0.5),
+        "frames scene": dict(mode="scene"),
+    }
+    live = make_live_callers() if args.live else None
+
+    header = f"{'variant':<16}{'frames':>8}{'payload KB':>12}{'prep ms':>10}"
+    if live:
+        header += f"{'e2e ms':>10}{'overlap':>9}"
+    print(f"{path.name}: {path.stat().st_size / 1024:.0f} KB on disk")
+    print(header)
+    print("-" * len(header))
+
+    encoded, prep_ms = time_call(lambda: base64.b64encode(path.read_bytes()).decode(), args.repeat)
+    full_payload = len(encoded)
+    line = f"{'full video':<16}{'-':>8}{full_payload / 1024:>12.1f}{prep_ms:>10.1f}"
+    reference = None
+    if live:
+        reference, call_ms = time_call(lambda: live[0](encoded), 1)
+        line += f"{prep_ms + call_ms:>10.0f}{'-':>9}"
+    print(line)
+
+    for label, options in variants.items():
+        frames, prep_ms = time_call(
+            lambda: sample_frames(path, max_frames=args.max_frames, **options), args.repeat
+        )
+        payload = frames_payload_bytes(frames)
+        line = f"{label:<16}{len(frames):>8}{payload / 1024:>12.1f}{prep_ms:>10.1f}"
+        if live:
+            answer, call_ms = time_call(lambda: live[1](frames), 1)
+            line += f"{prep_ms + call_ms:>10.0f}{overlap(reference, answer):>9.2f}"
+        print(line + f"   ({1 - payload / full_payload:.0%} smaller)")
+
+
+if __name__ == "__main__":
+    main()
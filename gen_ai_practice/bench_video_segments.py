@@ -0,0 +1,103 @@
+"""Wall-clock time of segment-wise video analysis against segment count.
+
+Run from the repository root:
+
+    python gen_ai_practice/bench_video_segments.py [--duration 1200] [--concurrency 4]
+    python gen_ai_practice/bench_video_segments.py --live [video.mp4] [--mode frames]
+
+By default the Gemini calls are simulated: a segment call takes
+--base-latency plus --per-second for every second of video it covers, and the
+merge call takes --base-latency plus --per-segment for every segment merged.
+Sleeps are scaled down by --time-scale so a sweep finishes in seconds; the
+table shows unscaled times. With --live the same sweep runs against Gemini on
+a real video (needs GEMINI_API_KEY).
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from pathlib import Path
+
+from video_segments import (
+    analyze_segments,
+    analyze_video_segments,
+    plan_segments,
+    video_duration,
+)
+
+DEFAULT_VIDEO = Path(__file__).resolve().parent.parent / "media" / "hyena.mp4"
+
+
+async def simulate(duration: float, segment_count: int, args) -> tuple[float, float]:
+    """Return (segment phase, total) simulated seconds for one run."""
+    segments = plan_segments(duration, duration / segment_count)
+    scale = args.time_scale
+
+    async def analyze(segment) -> str:
+        await asyncio.sleep((args.base_latency + args.per_second * (segment.end - segment.start)) * scale)
+        return "ok"
+
+    start = time.perf_counter()
+    await analyze_segments(segments, analyze, args.concurrency)
+    phase = time.perf_counter() - start
+    if len(segments) > 1:
+        await asyncio.sleep((args.base_latency + args.per_segment * len(segments)) * scale)
+    return phase / scale, (time.perf_counter() - start) / scale
+
+
+async def live(path: Path, segment_seconds: float, args) -> tuple[float, float, int]:
+    from dotenv import load_dotenv
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    load_dotenv()
+    llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash", temperature=0.0, api_key=os.getenv("GEMINI_API_KEY"))
+    start = time.perf_counter()
+    _, results = await analyze_video_segments(
+        path, "Describe what's happening in this video.", llm,
+        segment_seconds=segment_seconds, concurrency=args.concurrency, mode=args.mode,
+    )
+    total = time.perf_counter() - start
+    return max(r.seconds for r in results), total, sum(r.error is not None for r in results)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("video", nargs="?", default=str(DEFAULT_VIDEO), help="video for --live")
+    parser.add_argument("--live", action="store_true", help="call Gemini instead of simulating")
+    parser.add_argument("--mode", choices=("video", "frames"), default="frames", help="segment payload for --live")
+    parser.add_argument("--duration", type=float, default=1200, help="simulated video length in seconds")
+    parser.add_argument("--segments", default="1,2,4,8,16,32", help="segment counts to try")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--base-latency", type=float, default=1.5, help="simulated seconds per call")
+    parser.add_argument("--per-second", type=float, default=0.05, help="simulated seconds per video second")
+    parser.add_argument("--per-segment", type=float, default=0.2, help="simulated merge seconds per segment")
+    parser.add_argument("--time-scale", type=float, default=0.01, help="real seconds per simulated second")
+    args = parser.parse_args()
+
+    counts = [int(n) for n in args.segments.split(",")]
+    if args.live:
+        path = Path(args.video)
+        duration = video_duration(path)
+        print(f"{path.name}: {duration:.0f}s, mode={args.mode}, concurrency={args.concurrency}")
+        header = f"{'segments':>9}{'slowest segment s':>19}{'total s':>10}{'failed':>8}"
+    else:
+        duration = args.duration
+        print(f"simulated {duration:.0f}s video, concurrency={args.concurrency}")
+        header = f"{'segments':>9}{'segment phase s':>17}{'total s':>10}{'speedup':>9}"
+    print(header)
+    print("-" * len(header))
+
+    baseline = None
+    for count in counts:
+        if args.live:
+            slowest, total, failed = asyncio.run(live(path, duration / count, args))
+            print(f"{count:>9}{slowest:>19.1f}{total:>10.1f}{failed:>8}")
+        else:
+            phase, total = asyncio.run(simulate(duration, count, args))
+            baseline = baseline or total
+            print(f"{count:>9}{phase:>17.1f}{total:>10.1f}{baseline / total:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
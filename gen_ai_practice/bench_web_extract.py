@@ -0,0 +1,92 @@
+"""Benchmark main-content extraction against the raw WebBaseLoader text.
+
+Run from the repository root:
+
+    python gen_ai_practice/bench_web_extract.py [--repeat 50] [--count-tokens]
+
+For every saved page in media/html it reports how long extraction takes and how
+many prompt tokens the summary chain would receive before and after. Tokens are
+estimated at ~4 characters each unless --count-tokens is given, which asks
+Gemini's tokenizer (needs GEMINI_API_KEY). Fixtures listed in EXPECTED_TEXT
+are also checked to keep the sentences given there.
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+from web_extract import extract_main_content
+
+FIXTURES_DIR = Path(__file__).resolve().parent.parent / "media" / "html"
+
+# Text that must survive extraction: lead and closing sentences written directly in a <div>.
+EXPECTED_TEXT = {
+    "lead_in_div.html": [
+        "The city council voted on Tuesday to build forty kilometres of protected cycle lanes",
+        "Construction of the first section, along the river, is due to start in the spring.",
+    ],
+}
+
+
+def loader_text(html: str) -> str:
+    """Mirror what WebBaseLoader.load() puts in page_content."""
+    return BeautifulSoup(html, "html.parser").get_text()
+
+
+def make_token_counter(use_gemini: bool):
+    if not use_gemini:
+        return lambda text: max(1, len(text) // 4)
+
+    from dotenv import load_dotenv
+    from langchain_google_genai import GoogleGenerativeAI
+
+    load_dotenv()
+    llm = GoogleGenerativeAI(model="gemini-2.0-flash", google_api_key=os.getenv("GEMINI_API_KEY"))
+    return llm.get_num_tokens
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=50, help="extraction runs per fixture")
+    parser.add_argument("--count-tokens", action="store_true", help="use Gemini's tokenizer")
+    args = parser.parse_args()
+
+    count_tokens = make_token_counter(args.count_tokens)
+    fixtures = sorted(FIXTURES_DIR.glob("*.html"))
+    if not fixtures:
+        raise SystemExit(f"No HTML fixtures found in {FIXTURES_DIR}")
+
+    header = f"{'fixture':<22}{'raw tok':>10}{'main tok':>10}{'saved':>9}{'extract ms':>12}"
+    print(header)
+    print("-" * len(header))
+
+    total_raw = total_main = 0
+    missing = []
+    for path in fixtures:
+        html = path.read_text(encoding="utf-8")
+        raw_tokens = count_tokens(loader_text(html))
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            content = extract_main_content(html)
+        elapsed_ms = (time.perf_counter() - start) * 1000 / args.repeat
+
+        missing.extend(f"{path.name}: {text!r}" for text in EXPECTED_TEXT.get(path.name, ()) if text not in content)
+        main_tokens = count_tokens(content)
+        total_raw += raw_tokens
+        total_main += main_tokens
+        saved = 1 - main_tokens / raw_tokens
+        print(f"{path.name:<22}{raw_tokens:>10}{main_tokens:>10}{saved:>9.1%}{elapsed_ms:>12.2f}")
+
+    print("-" * len(header))
+    print(f"{'total':<22}{total_raw:>10}{total_main:>10}{1 - total_main / total_raw:>9.1%}")
+    if missing:
+        sys.exit("Text lost in extraction:\n" + "\n".join(missing))
+
+
+if __name__ == "__main__":
+    main()
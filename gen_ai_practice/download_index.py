@@ -0,0 +1,109 @@
+"""Local index of what the batch audio processor has already downloaded.
+
+Maps a normalised URL (youtube_ids.normalize_url) to the media key of the
+video, and the media key to the title, file in the downloads folder, size and
+SHA-256. The "Skip existing files" check is then a lookup here instead of a
+yt-dlp metadata call, and any spelling of a known URL resolves to the same
+video before touching the network.
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from youtube_ids import normalize_url
+
+DEFAULT_PATH = Path(__file__).resolve().parent.parent / ".cache" / "download_index.sqlite"
+DOWNLOAD_INDEX_PATH = Path(os.getenv("DOWNLOAD_INDEX_PATH", str(DEFAULT_PATH)))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS urls (
+    url TEXT PRIMARY KEY,
+    media_key TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS downloads (
+    media_key TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    downloaded_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS urls_media_key ON urls(media_key);
+"""
+
+
+@dataclass(frozen=True)
+class DownloadRecord:
+    media_key: str
+    title: str
+    path: Path
+    size: int
+    sha256: str
+
+    @property
+    def video_id(self) -> str:
+        return self.media_key.split(":", 1)[1]
+
+
+class DownloadIndex:
+    def __init__(self, path: Path = DOWNLOAD_INDEX_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode = WAL")
+        self._db.executescript(SCHEMA)
+
+    def media_key(self, url: str) -> str | None:
+        """The media key recorded for any spelling of `url`, if it was seen before."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT media_key FROM urls WHERE url = ?", (normalize_url(url),)
+            ).fetchone()
+        return row[0] if row else None
+
+    def lookup(self, url: str) -> DownloadRecord | None:
+        """The download for `url` if its file is still in place with the recorded size."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT d.media_key, d.title, d.path, d.size, d.sha256 FROM urls u "
+                "JOIN downloads d ON d.media_key = u.media_key WHERE u.url = ?",
+                (normalize_url(url),),
+            ).fetchone()
+        if row is None:
+            return None
+        record = DownloadRecord(row[0], row[1], Path(row[2]), row[3], row[4])
+        try:
+            if record.path.stat().st_size == record.size:
+                return record
+        except FileNotFoundError:
+            pass
+        return None
+
+    def record(self, url: str, media_key: str, title: str, path: Path, sha256: str) -> None:
+        """Remember that `url` is `media_key`, downloaded to `path`."""
+        size = Path(path).stat().st_size
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO urls (url, media_key) VALUES (?, ?)",
+                (normalize_url(url), media_key),
+            )
+            self._db.execute(
+                "INSERT OR REPLACE INTO downloads (media_key, title, path, size, sha256, downloaded_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (media_key, title, str(path), size, sha256, time.time()),
+            )
+
+    def remember_url(self, url: str, media_key: str) -> None:
+        """Record the URL -> video mapping alone, e.g. after a failed download."""
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO urls (url, media_key) VALUES (?, ?)",
+                (normalize_url(url), media_key),
+            )
@@ -0,0 +1,110 @@
+"""Persistent cache in front of an embeddings model.
+
+Re-ingesting a document used to embed every chunk again even when the text
+had not changed. `CachedEmbeddings` wraps any LangChain `Embeddings` and keeps
+document vectors in SQLite keyed by SHA-256 of the model name and the text,
+so only texts never embedded with that model reach the API. Query vectors
+are cached the same way under the normalized query (`normalize_query`), as
+models such as text-embedding-004 embed queries differently from documents.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from pathlib import Path
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+DEFAULT_PATH = Path(__file__).resolve().parent.parent / ".cache" / "embeddings.sqlite"
+EMBEDDING_CACHE_PATH = Path(os.getenv("EMBEDDING_CACHE_PATH", str(DEFAULT_PATH)))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    key TEXT PRIMARY KEY,
+    vector BLOB NOT NULL
+);
+"""
+
+# SQLite limits the number of bound parameters per statement.
+LOOKUP_BATCH = 500
+WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(text: str) -> str:
+    """`text` in NFKC form with runs of whitespace collapsed to one space and the ends stripped."""
+    return WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+def model_name(embeddings: Embeddings) -> str:
+    """Name that identifies the vectors `embeddings` produces, e.g. "models/text-embedding-004"."""
+    return getattr(embeddings, "model", None) or getattr(embeddings, "model_name", None) or type(embeddings).__name__
+
+
+class CachedEmbeddings(Embeddings):
+    def __init__(self, embeddings: Embeddings, path: Path = EMBEDDING_CACHE_PATH):
+        self.embeddings = embeddings
+        self.model = model_name(embeddings)
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode = WAL")
+        self._db.executescript(SCHEMA)
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model}\0{text}".encode()).hexdigest()
+
+    def _lookup(self, keys: list[str]) -> dict[str, list[float]]:
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), LOOKUP_BATCH):
+                batch = keys[start:start + LOOKUP_BATCH]
+                rows = self._db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({', '.join('?' * len(batch))})", batch
+                )
+                found.update((key, np.frombuffer(blob, dtype=np.float32).tolist()) for key, blob in rows)
+        return found
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        keys = [self._key(text) for text in texts]
+        vectors = self._lookup(list(set(keys)))
+        # One API call for the texts not cached yet, each distinct text once.
+        missing = {key: text for key, text in zip(keys, texts) if key not in vectors}
+        if missing:
+            embedded = self.embeddings.embed_documents(list(missing.values()))
+            new = dict(zip(missing, embedded))
+            with self._lock, self._db:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                    [(key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in new.items()],
+                )
+            vectors.update(new)
+        with self._lock:
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+        return [list(vectors[key]) for key in keys]
+
+    def embed_query(self, text: str) -> list[float]:
+        query = normalize_query(text)
+        key = self._key(f"query\0{query}")
+        vector = self._lookup([key]).get(key)
+        if vector is None:
+            vector = self.embeddings.embed_query(query)
+            with self._lock, self._db:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                    (key, np.asarray(vector, dtype=np.float32).tobytes()),
+                )
+                self.misses += 1
+        else:
+            with self._lock:
+                self.hits += 1
+        return list(vector)
@@ -0,0 +1,127 @@
+"""Drop-in, faster equivalent of RecursiveCharacterTextSplitter.
+
+RecursiveCharacterTextSplitter splits a page on paragraph breaks, then lines,
+then words, then characters, merging neighbouring pieces back into chunks of
+up to `chunk_size` with `chunk_overlap`. On the way it copies text a lot:
+re.split builds every piece, the separator is glued back onto each, pieces
+too long are re-split as new strings, and each chunk is joined from a list
+that is rebuilt every time a piece is dropped from its front.
+
+With the default keep_separator=True every piece is a contiguous slice of
+the page and a chunk is the slice from its first piece to its last, so
+FastRecursiveSplitter works on offsets only: a single pass over the range
+being split lists where the separator occurs, chunk boundaries are found by
+bisecting those offsets instead of adding pieces one at a time, and the only
+strings built are the chunks themselves.
+It returns exactly the chunks RecursiveCharacterTextSplitter returns for the
+same separators, chunk_size and chunk_overlap (bench_splitter.py checks this
+on the PDFs in media/). Regex separators, keep_separator=False/"end" and
+custom length functions are not supported.
+"""
+
+from __future__ import annotations
+
+import re
+from bisect import bisect_left, bisect_right
+from operator import sub
+from typing import Any
+
+from langchain_text_splitters import TextSplitter
+
+DEFAULT_SEPARATORS = ["\n\n", "\n", " ", ""]
+
+
+class FastRecursiveSplitter(TextSplitter):
+    def __init__(self, separators: list[str] | None = None, **kwargs: Any):
+        if kwargs.get("length_function", len) is not len:
+            raise ValueError("FastRecursiveSplitter only measures chunks with len()")
+        if kwargs.setdefault("keep_separator", True) is not True:
+            raise ValueError("FastRecursiveSplitter only supports keep_separator=True")
+        if kwargs.get("is_separator_regex"):
+            raise ValueError("FastRecursiveSplitter only supports literal separators")
+        kwargs.pop("is_separator_regex", None)
+        super().__init__(**kwargs)
+        self._separators = separators or DEFAULT_SEPARATORS
+        self._patterns = {separator: re.compile(re.escape(separator)) for separator in self._separators if separator}
+
+    def split_text(self, text: str) -> list[str]:
+        chunks: list[str] = []
+        self._split(text, 0, len(text), 0, chunks)
+        return chunks
+
+    def _split(self, text: str, start: int, end: int, level: int, chunks: list[str]) -> None:
+        """Split text[start:end] with separators[level:], appending chunks."""
+        separators = self._separators
+        # The first separator that occurs in the range; "" means characters and ends the recursion.
+        separator, next_level = separators[-1], len(separators)
+        for index in range(level, len(separators)):
+            candidate = separators[index]
+            if not candidate:
+                separator = candidate
+                break
+            if text.find(candidate, start, end) != -1:
+                separator, next_level = candidate, index + 1
+                break
+
+        # Piece boundaries: each occurrence of the separator starts a new piece,
+        # so piece i spans cuts[i]:cuts[i + 1].
+        if separator:
+            cuts = [start]
+            cuts.extend(match.start() for match in self._patterns[separator].finditer(text, start, end))
+            if len(cuts) > 1 and cuts[1] == start:
+                del cuts[1]
+            if cuts[-1] != end:
+                cuts.append(end)
+        else:
+            cuts = list(range(start, end + 1))
+        if len(cuts) < 2:
+            return
+
+        chunk_size = self._chunk_size
+        lengths = list(map(sub, cuts[1:], cuts[:-1]))
+        if max(lengths) < chunk_size:
+            self._merge(text, cuts, 0, len(lengths), chunks)
+            return
+        # Pieces good..piece-1 are short enough to merge and waiting to be.
+        good = None
+        for piece, length in enumerate(lengths):
+            if length < chunk_size:
+                if good is None:
+                    good = piece
+                continue
+            if good is not None:
+                self._merge(text, cuts, good, piece, chunks)
+                good = None
+            if next_level == len(separators):
+                chunks.append(text[cuts[piece]:cuts[piece + 1]])
+            else:
+                self._split(text, cuts[piece], cuts[piece + 1], next_level, chunks)
+        if good is not None:
+            self._merge(text, cuts, good, len(lengths), chunks)
+
+    def _merge(self, text: str, cuts: list[int], first: int, stop: int, chunks: list[str]) -> None:
+        """Merge pieces first..stop-1 into overlapping chunks, a chunk at a time.
+
+        A chunk runs from piece `head` up to the first piece that would take
+        it past chunk_size (found by bisecting the offsets). The next chunk
+        starts at the first piece that leaves at most chunk_overlap before
+        that piece and room for it, which is where RecursiveCharacterTextSplitter
+        stops dropping pieces from the front.
+        """
+        chunk_size, overlap = self._chunk_size, self._chunk_overlap
+        head = first
+        while True:
+            piece = bisect_right(cuts, cuts[head] + chunk_size, head, stop + 1) - 1
+            if piece >= stop:
+                break
+            self._emit(text[cuts[head]:cuts[piece]], chunks)
+            fits_overlap = bisect_left(cuts, cuts[piece] - overlap, head, piece + 1)
+            leaves_room = bisect_left(cuts, cuts[piece + 1] - chunk_size, head, piece + 1)
+            head = max(fits_overlap, min(leaves_room, piece))
+        self._emit(text[cuts[head]:cuts[stop]], chunks)
+
+    def _emit(self, chunk: str, chunks: list[str]) -> None:
+        if self._strip_whitespace:
+            chunk = chunk.strip()
+        if chunk:
+            chunks.append(chunk)
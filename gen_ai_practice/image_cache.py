@@ -0,0 +1,159 @@
+"""Near-duplicate result cache for image analysis, keyed by perceptual hash.
+
+The same meal photo is often uploaded again after being resized, recompressed
+or cropped slightly by a messaging app. A difference hash (dHash) of such
+copies differs by only a few bits, so results are looked up by Hamming
+distance rather than exact bytes.
+
+Lookups use multi-index hashing: the 64-bit hash is cut into
+`max_distance + 1` bands, and any hash within `max_distance` bits of the query
+must match it exactly on at least one band, so only those buckets are checked.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from io import BytesIO
+from pathlib import Path
+
+from PIL import Image
+
+HASH_BITS = 64
+
+
+def dhash(image: Image.Image, size: int = 8) -> int:
+    """Return the 64-bit difference hash of `image` (brighter-than-right-neighbour bits)."""
+    gray = image.convert("L").resize((size + 1, size), Image.Resampling.LANCZOS)
+    pixels = gray.tobytes()
+    value = 0
+    for row in range(size):
+        offset = row * (size + 1)
+        for col in range(size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def dhash_bytes(data: bytes) -> int:
+    with Image.open(BytesIO(data)) as image:
+        image.draft("L", (64, 64))
+        return dhash(image)
+
+
+def _band_masks(max_distance: int) -> list[tuple[int, int]]:
+    """Split the hash into max_distance + 1 (shift, mask) bands of near-equal width."""
+    bands = max_distance + 1
+    widths = [HASH_BITS // bands + (1 if i < HASH_BITS % bands else 0) for i in range(bands)]
+    masks, shift = [], 0
+    for width in widths:
+        masks.append((shift, (1 << width) - 1))
+        shift += width
+    return masks
+
+
+class PerceptualCache:
+    """LRU map from perceptual hash to a cached result, persisted as JSON."""
+
+    def __init__(
+        self,
+        path: Path | None = None,
+        max_entries: int = 2048,
+        max_distance: int = 6,
+        namespace: str = "",
+    ):
+        if not 0 <= max_distance < HASH_BITS:
+            raise ValueError("max_distance must be between 0 and 63")
+        self.path = Path(path) if path else None
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        # Typically the prompt version; a persisted file from another namespace is ignored.
+        self.namespace = namespace
+        self._bands = _band_masks(max_distance)
+        self._entries: OrderedDict[int, str] = OrderedDict()
+        self._index: list[dict[int, set[int]]] = [{} for _ in self._bands]
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        if self.path:
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _index_add(self, key: int) -> None:
+        for band, (shift, mask) in zip(self._index, self._bands):
+            band.setdefault((key >> shift) & mask, set()).add(key)
+
+    def _index_remove(self, key: int) -> None:
+        for band, (shift, mask) in zip(self._index, self._bands):
+            bucket = band.get((key >> shift) & mask)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del band[(key >> shift) & mask]
+
+    def _nearest(self, key: int) -> int | None:
+        best, best_distance = None, self.max_distance + 1
+        for band, (shift, mask) in zip(self._index, self._bands):
+            for candidate in band.get((key >> shift) & mask, ()):
+                distance = (candidate ^ key).bit_count()
+                if distance < best_distance:
+                    best, best_distance = candidate, distance
+        return best
+
+    def get(self, key: int) -> str | None:
+        """Return the result cached for the closest hash within max_distance, if any."""
+        with self._lock:
+            match = self._nearest(key)
+            if match is None:
+                return None
+            self._entries.move_to_end(match)
+            return self._entries[match]
+
+    def put(self, key: int, value: str) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            else:
+                self._index_add(key)
+            self._entries[key] = value
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                self._index_remove(evicted)
+        if self.path:
+            # Snapshot inside the save lock so the last writer always writes the newest state.
+            with self._save_lock:
+                with self._lock:
+                    snapshot = list(self._entries.items())
+                self._save(snapshot)
+
+    def _load(self) -> None:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            entries = data["entries"]
+        except (FileNotFoundError, ValueError, KeyError):
+            return
+        if data.get("namespace", "") != self.namespace:
+            return
+        # Entries are stored least-recently-used first, so replaying them restores the LRU order.
+        for hex_key, value in entries[-self.max_entries:]:
+            key = int(hex_key, 16)
+            self._entries[key] = value
+            self._index_add(key)
+
+    def _save(self, entries: list[tuple[int, str]]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        payload = json.dumps({
+            "namespace": self.namespace,
+            "entries": [[f"{key:016x}", value] for key, value in entries],
+        })
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                fh.write(payload)
+            os.replace(tmp, self.path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
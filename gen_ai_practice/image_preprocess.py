@@ -0,0 +1,116 @@
+"""Shrink uploaded images before they are sent to Gemini.
+
+Phone photos arrive as multi-megabyte JPEGs or PNGs, far larger than the model
+needs. `preprocess_image` decodes the upload, applies the EXIF rotation,
+downsizes it to a maximum dimension and re-encodes it without metadata, so the
+base64 payload sent upstream is a small fraction of the original.
+"""
+
+from __future__ import annotations
+
+import base64
+import os
+from dataclasses import dataclass
+from io import BytesIO
+from pathlib import Path
+
+from PIL import Image, ImageOps
+
+MAX_DIMENSION = int(os.getenv("IMAGE_MAX_DIMENSION", "1024"))
+OUTPUT_FORMAT = os.getenv("IMAGE_OUTPUT_FORMAT", "WEBP").upper()
+QUALITY = int(os.getenv("IMAGE_QUALITY", "80"))
+# Decoding allocates width * height pixels whatever the file size, so a tiny
+# PNG can claim a huge canvas; anything larger is refused before decoding.
+MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", "64000000"))
+
+MIME_TYPES = {"JPEG": "image/jpeg", "PNG": "image/png", "WEBP": "image/webp"}
+
+
+class ImageTooLargeError(OSError):
+    """The image declares more than MAX_PIXELS pixels."""
+
+
+@dataclass(frozen=True)
+class PreparedImage:
+    """A re-encoded image and the base64 text that goes into the prompt."""
+
+    data: bytes
+    base64: str
+    mime_type: str
+    width: int
+    height: int
+
+    @property
+    def data_url(self) -> str:
+        return f"data:{self.mime_type};base64,{self.base64}"
+
+
+def _normalise_mode(image: Image.Image, fmt: str) -> Image.Image:
+    has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+    if fmt == "JPEG":
+        if has_alpha:
+            # JPEG has no alpha channel; flatten onto white like most viewers do.
+            rgba = image.convert("RGBA")
+            background = Image.new("RGB", rgba.size, (255, 255, 255))
+            background.paste(rgba, mask=rgba.getchannel("A"))
+            return background
+        return image.convert("RGB") if image.mode != "RGB" else image
+    if image.mode not in ("RGB", "RGBA", "L"):
+        return image.convert("RGBA" if has_alpha else "RGB")
+    return image
+
+
+def preprocess_image(
+    data: bytes | str | Path,
+    max_dimension: int = MAX_DIMENSION,
+    fmt: str = OUTPUT_FORMAT,
+    quality: int = QUALITY,
+    max_pixels: int = MAX_PIXELS,
+) -> PreparedImage:
+    """Decode, downsize and re-encode `data`, dropping EXIF and other metadata.
+
+    `data` is the image bytes or a path; given a path, Pillow reads the file
+    as it decodes instead of the whole file being loaded first.
+
+    Raises PIL.UnidentifiedImageError (an OSError) when `data` is not an image
+    and ImageTooLargeError (also an OSError) when it has more than
+    `max_pixels` pixels.
+    This is CPU-bound; call it from a worker thread in async code.
+    """
+    fmt = fmt.upper()
+    if fmt not in MIME_TYPES:
+        raise ValueError(f"Unsupported output format: {fmt}")
+
+    try:
+        source = Image.open(BytesIO(data) if isinstance(data, bytes) else data)
+    except Image.DecompressionBombError as exc:
+        raise ImageTooLargeError(str(exc)) from exc
+    with source:
+        if source.width * source.height > max_pixels:
+            raise ImageTooLargeError(
+                f"Image is {source.width}x{source.height} pixels, more than the limit of {max_pixels}"
+            )
+        # Lets the JPEG decoder scale by 1/2, 1/4 or 1/8 while decoding, which is much faster.
+        source.draft("RGB", (max_dimension, max_dimension))
+        image = ImageOps.exif_transpose(source)
+        image = _normalise_mode(image, fmt)
+        image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+        # Some encoders copy ICC profiles and text chunks from `info`; drop them with the EXIF.
+        image.info = {}
+
+        out = BytesIO()
+        if fmt == "JPEG":
+            image.save(out, "JPEG", quality=quality, optimize=True)
+        elif fmt == "WEBP":
+            image.save(out, "WEBP", quality=quality, method=4)
+        else:
+            image.save(out, "PNG", optimize=True)
+
+    encoded = out.getvalue()
+    return PreparedImage(
+        data=encoded,
+        base64=base64.b64encode(encoded).decode(),
+        mime_type=MIME_TYPES[fmt],
+        width=image.width,
+        height=image.height,
+    )
@@ -0,0 +1,177 @@
+"""Incremental ingestion of chunks into a vector store.
+
+The ingestion examples used to empty the collection (example2) or append
+every chunk again (example4, example4b) on each run. Each chunk now gets an
+id made from a hash of the embedding model, its text and its metadata, and a
+small SQLite table remembers which ids every source (metadata["source"], the
+file a loader read) has in each collection. Re-ingesting a source writes only
+the chunks that are new, deletes only the ones that disappeared and leaves
+everything else untouched, so an unchanged corpus costs no embedding calls
+and no writes. Sources not part of a run are left alone.
+
+Every change to a collection's chunks also bumps its version number, which
+query_cache.py uses to tell when cached search results went stale.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from collections.abc import Iterable
+from dataclasses import dataclass
+from pathlib import Path
+
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+DEFAULT_PATH = Path(__file__).resolve().parent.parent / ".cache" / "ingest_records.sqlite"
+INGEST_RECORDS_PATH = Path(os.getenv("INGEST_RECORDS_PATH", str(DEFAULT_PATH)))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    collection TEXT NOT NULL,
+    source TEXT NOT NULL,
+    id TEXT NOT NULL,
+    PRIMARY KEY (collection, id)
+);
+CREATE INDEX IF NOT EXISTS chunks_source ON chunks(collection, source);
+CREATE TABLE IF NOT EXISTS versions (
+    collection TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+"""
+
+# SQLite limits the number of bound parameters per statement.
+LOOKUP_BATCH = 500
+
+
+def chunk_id(document: Document, model: str) -> str:
+    payload = json.dumps([model, document.page_content, document.metadata], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+@dataclass
+class IngestReport:
+    added: int = 0
+    unchanged: int = 0
+    deleted: int = 0
+
+    def __str__(self) -> str:
+        return f"{self.added} added, {self.unchanged} unchanged, {self.deleted} deleted"
+
+
+class IngestRecords:
+    """Which chunk ids each source has in each collection."""
+
+    def __init__(self, path: Path = INGEST_RECORDS_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode = WAL")
+        self._db.executescript(SCHEMA)
+
+    def ids(self, collection: str, source: str) -> set[str]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id FROM chunks WHERE collection = ? AND source = ?", (collection, source)
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def existing(self, collection: str, ids: list[str]) -> set[str]:
+        """Those of `ids` already stored in `collection`."""
+        found = set()
+        with self._lock:
+            for start in range(0, len(ids), LOOKUP_BATCH):
+                batch = ids[start:start + LOOKUP_BATCH]
+                rows = self._db.execute(
+                    f"SELECT id FROM chunks WHERE collection = ? AND id IN ({', '.join('?' * len(batch))})",
+                    [collection, *batch],
+                )
+                found.update(row[0] for row in rows)
+        return found
+
+    def add(self, collection: str, source: str, ids: Iterable[str]) -> None:
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO chunks (collection, source, id) VALUES (?, ?, ?)",
+                [(collection, source, chunk) for chunk in ids],
+            )
+            self._bump(collection)
+
+    def remove(self, collection: str, ids: Iterable[str]) -> None:
+        with self._lock, self._db:
+            self._db.executemany(
+                "DELETE FROM chunks WHERE collection = ? AND id = ?", [(collection, chunk) for chunk in ids]
+            )
+            self._bump(collection)
+
+    def _bump(self, collection: str) -> None:
+        self._db.execute(
+            "INSERT INTO versions (collection, version) VALUES (?, 1) "
+            "ON CONFLICT (collection) DO UPDATE SET version = version + 1",
+            (collection,),
+        )
+
+    def bump(self, collection: str) -> None:
+        """Mark `collection` as changed by something other than add() or remove()."""
+        with self._lock, self._db:
+            self._bump(collection)
+
+    def version(self, collection: str) -> int:
+        """Number that changes whenever the chunks stored in `collection` do."""
+        with self._lock:
+            row = self._db.execute("SELECT version FROM versions WHERE collection = ?", (collection,)).fetchone()
+        return row[0] if row else 0
+
+    def known(self, collection: str) -> bool:
+        with self._lock:
+            row = self._db.execute("SELECT 1 FROM chunks WHERE collection = ? LIMIT 1", (collection,)).fetchone()
+        return row is not None
+
+
+def upsert_documents(
+    vector_store: VectorStore,
+    documents: Iterable[Document],
+    *,
+    collection: str,
+    model: str,
+    records: IngestRecords | None = None,
+    clear_untracked: bool = False,
+) -> IngestReport:
+    """Bring `collection` in line with `documents`, source by source.
+
+    `collection` names the store's collection in the records (see
+    vector_store_config.collection_key) and `model` the embedding model, so a
+    model change re-embeds everything. With `clear_untracked`, a collection
+    that has no records yet is emptied first, dropping chunks written before
+    ingestion was incremental that would otherwise stay as duplicates.
+    """
+    records = records or IngestRecords()
+    if clear_untracked and not records.known(collection):
+        vector_store.delete()
+        records.bump(collection)
+    by_source: dict[str, dict[str, Document]] = {}
+    for document in documents:
+        source = str(document.metadata.get("source", ""))
+        by_source.setdefault(source, {})[chunk_id(document, model)] = document
+
+    report = IngestReport()
+    for source, chunks in by_source.items():
+        stored = records.ids(collection, source)
+        new = [chunk for chunk in chunks if chunk not in stored]
+        gone = [chunk for chunk in stored if chunk not in chunks]
+        if new:
+            vector_store.add_documents([chunks[chunk] for chunk in new], ids=new)
+            records.add(collection, source, new)
+        # Never call delete() with an empty list: Atlas treats that as "delete everything".
+        if gone:
+            vector_store.delete(gone)
+            records.remove(collection, gone)
+        report.added += len(new)
+        report.unchanged += len(chunks) - len(new)
+        report.deleted += len(gone)
+    return report
@@ -0,0 +1,145 @@
+"""Section-level change tracking for web page summaries.
+
+The web summary app keeps the extracted sections and the summary of every URL
+it has seen. On the next request the new sections are diffed against the
+stored ones, so a page that only changed a little can be summarized by
+patching the previous summary instead of starting over.
+"""
+
+from __future__ import annotations
+
+import difflib
+import hashlib
+import json
+import os
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from web_extract import Block
+
+
+@dataclass(frozen=True)
+class Section:
+    """A heading and the body text that follows it, up to the next heading."""
+
+    heading: str
+    text: str
+
+    @property
+    def digest(self) -> str:
+        return hashlib.sha256(f"{self.heading}\n{self.text}".encode("utf-8")).hexdigest()
+
+    def render(self) -> str:
+        return f"## {self.heading}\n\n{self.text}" if self.heading else self.text
+
+
+@dataclass
+class SectionDiff:
+    """New or edited sections, removed sections and how much of the page they cover."""
+
+    changed: list[Section] = field(default_factory=list)
+    removed: list[Section] = field(default_factory=list)
+    changed_chars: int = 0
+    total_chars: int = 0
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.changed and not self.removed
+
+    @property
+    def ratio(self) -> float:
+        return self.changed_chars / max(self.total_chars, 1)
+
+
+@dataclass
+class PageState:
+    url: str
+    sections: list[Section]
+    summary: str
+    prompt_version: str = ""
+    # Incremental patches applied since the last full summary; bounded so drift can't pile up.
+    incremental_updates: int = 0
+    updated_at: float = field(default_factory=time.time)
+
+
+def split_sections(blocks: list[Block]) -> list[Section]:
+    """Group extracted blocks into sections, starting a new one at every heading."""
+    sections: list[Section] = []
+    heading = ""
+    body: list[str] = []
+    for block in blocks:
+        if block.level:
+            if heading or body:
+                sections.append(Section(heading, "\n\n".join(body)))
+            heading, body = block.text, []
+        else:
+            body.append(block.text)
+    if heading or body:
+        sections.append(Section(heading, "\n\n".join(body)))
+    return sections
+
+
+def diff_sections(old: list[Section], new: list[Section]) -> SectionDiff:
+    """Align old and new sections by content hash and collect what changed."""
+    matcher = difflib.SequenceMatcher(
+        None, [s.digest for s in old], [s.digest for s in new], autojunk=False
+    )
+    diff = SectionDiff(total_chars=sum(len(s.text) for s in new))
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            continue
+        diff.changed.extend(new[j1:j2])
+        # An edited section shows up as a replace; only count it once.
+        changed_headings = {s.heading for s in new[j1:j2]}
+        diff.removed.extend(s for s in old[i1:i2] if s.heading not in changed_headings)
+    diff.changed_chars = sum(len(s.text) for s in diff.changed) + sum(len(s.text) for s in diff.removed)
+    return diff
+
+
+def render_changes(diff: SectionDiff) -> str:
+    """Describe a diff for the update prompt."""
+    parts = [section.render() for section in diff.changed]
+    if diff.removed:
+        removed = "\n".join(f"- {s.heading or '(untitled section)'}" for s in diff.removed)
+        parts.append(f"Sections removed from the page:\n{removed}")
+    return "\n\n".join(parts)
+
+
+class SummaryStore:
+    """One JSON file per URL holding its last extracted sections and summary."""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, url: str) -> Path:
+        return self.root / f"{hashlib.sha256(url.encode('utf-8')).hexdigest()}.json"
+
+    def load(self, url: str) -> PageState | None:
+        path = self._path(url)
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return None
+        return PageState(
+            url=data["url"],
+            sections=[Section(**s) for s in data["sections"]],
+            summary=data["summary"],
+            prompt_version=data.get("prompt_version", ""),
+            incremental_updates=data.get("incremental_updates", 0),
+            updated_at=data.get("updated_at", 0.0),
+        )
+
+    def save(self, state: PageState) -> None:
+        payload = json.dumps(asdict(state), ensure_ascii=False)
+        # Write to a temp file and rename so concurrent readers never see half a file.
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                fh.write(payload)
+            os.replace(tmp, self._path(state.url))
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
@@ -0,0 +1,357 @@
+"""Streaming ingestion of files into a vector store, in bounded memory.
+
+`loader.load_and_split()` followed by `vector_store.add_documents()` held
+every chunk of a file in memory and embedded and wrote them in one go. Files
+now flow through three stages:
+
+    load + split   pages are read and split in page order (PDFs on a process
+                   pool, see parallel_pdf.py), near-duplicate chunks are
+                   dropped (minhash_dedup.py) and a thread groups the rest
+                   into batches of `batch_size`
+    embed          up to `concurrency` batches are embedded at once on a
+                   thread pool, skipping chunks already in the collection
+    write          batches are written in order, `add_documents` per batch
+
+Each stage hands over through a bounded queue, so a slow stage holds the
+ones before it back (backpressure) instead of letting chunks pile up: at
+most `queue_batches + concurrency` batches exist at any time. Embedding and
+writing are retried with exponential backoff.
+
+Embeddings go through a `CachedEmbeddings`; the vector store must be opened
+with the same one, so the write stage finds the vectors of the embed stage in
+the cache instead of calling the API again.
+
+Chunk ids and change tracking come from incremental_ingest.py: unchanged
+chunks are neither embedded nor written, and chunks that disappeared from a
+file are deleted once the whole file has been read. After every written
+batch the pipeline checkpoints the next page to read. If a run stops part way,
+running it again on the unchanged file resumes from that page.
+
+A chunk is dropped when its estimated Jaccard similarity to a chunk kept
+earlier in the same run, from any of `paths`, reaches `dedup_threshold`
+(INGEST_DEDUP_THRESHOLD, 0.9 by default; 0 keeps every chunk). Dropped chunks
+are never embedded or stored, and a copy stored by an earlier run is deleted
+like any chunk that left its file. Pages skipped by resuming are not read, so
+duplicates of their chunks are kept in the resumed run.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Iterator, Sequence
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from itertools import islice
+from pathlib import Path
+
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+from langchain_text_splitters import TextSplitter
+
+from embedding_cache import CachedEmbeddings
+from incremental_ingest import IngestRecords, chunk_id
+from minhash_dedup import DEDUP_THRESHOLD, NearDuplicateFilter
+from parallel_pdf import split_pdf_pages
+
+DEFAULT_PATH = Path(__file__).resolve().parent.parent / ".cache" / "ingest_checkpoints.sqlite"
+INGEST_CHECKPOINT_PATH = Path(os.getenv("INGEST_CHECKPOINT_PATH", str(DEFAULT_PATH)))
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "64"))
+INGEST_CONCURRENCY = int(os.getenv("INGEST_CONCURRENCY", "4"))
+INGEST_RETRIES = int(os.getenv("INGEST_RETRIES", "3"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    collection TEXT NOT NULL,
+    source TEXT NOT NULL,
+    signature TEXT NOT NULL,
+    next_page INTEGER NOT NULL,
+    PRIMARY KEY (collection, source)
+);
+CREATE TABLE IF NOT EXISTS seen (
+    collection TEXT NOT NULL,
+    source TEXT NOT NULL,
+    id TEXT NOT NULL,
+    PRIMARY KEY (collection, source, id)
+);
+"""
+
+
+def file_signature(path: Path) -> str:
+    stat = path.stat()
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+class Checkpoints:
+    """Next page to read per (collection, source), and the chunk ids the current pass has seen."""
+
+    def __init__(self, path: Path = INGEST_CHECKPOINT_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode = WAL")
+        self._db.executescript(SCHEMA)
+
+    def start(self, collection: str, source: str, signature: str) -> int:
+        """Page to start `source` from: the checkpoint if the file is unchanged, else 0."""
+        with self._lock, self._db:
+            row = self._db.execute(
+                "SELECT signature, next_page FROM checkpoints WHERE collection = ? AND source = ?",
+                (collection, source),
+            ).fetchone()
+            if row and row[0] == signature:
+                return row[1]
+            self._db.execute("DELETE FROM seen WHERE collection = ? AND source = ?", (collection, source))
+            self._db.execute(
+                "INSERT OR REPLACE INTO checkpoints (collection, source, signature, next_page) VALUES (?, ?, ?, 0)",
+                (collection, source, signature),
+            )
+        return 0
+
+    def advance(self, collection: str, source: str, ids: Sequence[str], next_page: int) -> None:
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT OR IGNORE INTO seen (collection, source, id) VALUES (?, ?, ?)",
+                [(collection, source, chunk) for chunk in ids],
+            )
+            self._db.execute(
+                "UPDATE checkpoints SET next_page = ? WHERE collection = ? AND source = ?",
+                (next_page, collection, source),
+            )
+
+    def seen(self, collection: str, source: str) -> set[str]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id FROM seen WHERE collection = ? AND source = ?", (collection, source)
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def finish(self, collection: str, source: str) -> None:
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM seen WHERE collection = ? AND source = ?", (collection, source))
+            self._db.execute("DELETE FROM checkpoints WHERE collection = ? AND source = ?", (collection, source))
+
+
+def split_pages(path: Path, splitter: TextSplitter, start_page: int = 0) -> Iterator[list[Document]]:
+    """Chunks of every page of `path` from `start_page` on, one list per page.
+
+    PDFs are extracted and split on a process pool; a text file is one page.
+    """
+    if path.suffix.lower() == ".pdf":
+        return split_pdf_pages(path, splitter, start_page=start_page)
+    from langchain_community.document_loaders import TextLoader
+
+    return (splitter.split_documents([page]) for page in islice(TextLoader(str(path)).lazy_load(), start_page, None))
+
+
+def with_retries(fn: Callable, *args, retries: int = INGEST_RETRIES, **kwargs):
+    for attempt in range(retries + 1):
+        try:
+            return fn(*args, **kwargs)
+        except Exception:
+            if attempt == retries:
+                raise
+            time.sleep(2 ** attempt)
+
+
+@dataclass
+class Batch:
+    source: str
+    documents: list[Document]
+    ids: list[str]
+    next_page: int  # every page before this one is complete once the batch is written
+    new: list[int] = field(default_factory=list)  # positions of chunks not stored yet
+    embed_seconds: float = 0.0
+
+
+@dataclass
+class SourceDone:
+    source: str
+    resumed_from: int
+
+
+@dataclass
+class StageMetrics:
+    name: str
+    unit: str
+    items: int = 0
+    busy: float = 0.0
+    waiting: float = 0.0  # blocked handing work to the next stage
+
+    def row(self) -> str:
+        rate = self.items / self.busy if self.busy else 0.0
+        return f"{self.name:<14}{self.items:>8} {self.unit:<7}{self.busy:>9.2f}{rate:>12.1f}{self.waiting:>11.2f}"
+
+
+@dataclass
+class IngestMetrics:
+    load: StageMetrics = field(default_factory=lambda: StageMetrics("load+split", "pages"))
+    embed: StageMetrics = field(default_factory=lambda: StageMetrics("embed", "chunks"))
+    write: StageMetrics = field(default_factory=lambda: StageMetrics("write", "chunks"))
+    chunks: int = 0
+    unchanged: int = 0
+    deleted: int = 0
+    duplicates: int = 0
+    duplicate_bytes: int = 0  # text and metadata of the dropped chunks
+    dimensions: int = 0
+    resumed_pages: int = 0
+    seconds: float = 0.0
+
+    def __str__(self) -> str:
+        header = f"{'stage':<14}{'items':>16}{'busy s':>9}{'items/s':>12}{'waiting s':>11}"
+        lines = [header, "-" * len(header), self.load.row(), self.embed.row(), self.write.row()]
+        lines.append(
+            f"{self.chunks} chunks: {self.write.items} written, {self.unchanged} unchanged, "
+            f"{self.deleted} deleted; {self.resumed_pages} pages skipped by resuming; {self.seconds:.1f}s total"
+        )
+        if self.duplicates:
+            saved = self.duplicate_bytes + self.duplicates * self.dimensions * 4
+            lines.append(
+                f"{self.duplicates} near-duplicate chunks dropped: {self.duplicates} embedding inputs and "
+                f"{saved / 1024:.0f} KiB of index saved"
+            )
+        return "\n".join(lines)
+
+
+def _put(target: queue.Queue, item, stop: threading.Event, metrics: StageMetrics) -> None:
+    """Blocking put that gives up when the pipeline is stopping."""
+    start = time.perf_counter()
+    while not stop.is_set():
+        try:
+            target.put(item, timeout=0.1)
+            break
+        except queue.Full:
+            continue
+    metrics.waiting += time.perf_counter() - start
+
+
+def ingest_files(
+    paths: Sequence[Path | str],
+    vector_store: VectorStore,
+    embeddings: CachedEmbeddings,
+    splitter: TextSplitter,
+    *,
+    collection: str,
+    batch_size: int = INGEST_BATCH_SIZE,
+    concurrency: int = INGEST_CONCURRENCY,
+    queue_batches: int = 8,
+    records: IngestRecords | None = None,
+    checkpoints: Checkpoints | None = None,
+    clear_untracked: bool = False,
+    dedup_threshold: float = DEDUP_THRESHOLD,
+    pages: Callable[[Path, TextSplitter, int], Iterator[list[Document]]] = split_pages,
+) -> IngestMetrics:
+    """Stream `paths` into `vector_store`; see the module docstring for the stages.
+
+    `collection` and `clear_untracked` mean the same as for
+    incremental_ingest.upsert_documents.
+    """
+    records = records or IngestRecords()
+    checkpoints = checkpoints or Checkpoints()
+    metrics = IngestMetrics(dimensions=getattr(vector_store, "dimensions", None) or 0)
+    dedup = NearDuplicateFilter(dedup_threshold) if dedup_threshold > 0 else None
+    if clear_untracked and not records.known(collection):
+        vector_store.delete()
+        records.bump(collection)
+
+    batches: queue.Queue = queue.Queue(maxsize=queue_batches)
+    stop = threading.Event()
+    failure: list[BaseException] = []
+
+    def produce() -> None:
+        try:
+            for path in map(Path, paths):
+                source = str(path)
+                first_page = checkpoints.start(collection, source, file_signature(path))
+                metrics.resumed_pages += first_page
+                buffer: list[tuple[str, Document]] = []
+                page_number = first_page
+                start = time.perf_counter()
+                for page_number, chunks in enumerate(pages(path, splitter, first_page), first_page):
+                    for chunk in chunks:
+                        if dedup is not None and dedup.add(chunk.page_content) is not None:
+                            metrics.duplicates += 1
+                            metrics.duplicate_bytes += len(chunk.page_content.encode()) + len(json.dumps(chunk.metadata))
+                            continue
+                        buffer.append((chunk_id(chunk, embeddings.model), chunk))
+                    metrics.load.items += 1
+                    while len(buffer) >= batch_size:
+                        head, buffer = buffer[:batch_size], buffer[batch_size:]
+                        # Chunks left over belong to this page, so it is not complete yet.
+                        batch = Batch(source, [d for _, d in head], [i for i, _ in head],
+                                      page_number if buffer else page_number + 1)
+                        metrics.load.busy += time.perf_counter() - start
+                        _put(batches, batch, stop, metrics.load)
+                        start = time.perf_counter()
+                    if stop.is_set():
+                        return
+                metrics.load.busy += time.perf_counter() - start
+                if buffer:
+                    batch = Batch(source, [d for _, d in buffer], [i for i, _ in buffer], page_number + 1)
+                    _put(batches, batch, stop, metrics.load)
+                _put(batches, SourceDone(source, first_page), stop, metrics.load)
+        except BaseException as exc:
+            failure.append(exc)
+        finally:
+            _put(batches, None, stop, metrics.load)
+
+    def embed(batch: Batch) -> Batch:
+        start = time.perf_counter()
+        stored = records.existing(collection, batch.ids)
+        batch.new = [i for i, chunk in enumerate(batch.ids) if chunk not in stored]
+        if batch.new:
+            vectors = with_retries(embeddings.embed_documents, [batch.documents[i].page_content for i in batch.new])
+            metrics.dimensions = len(vectors[0])
+        batch.embed_seconds = time.perf_counter() - start
+        return batch
+
+    def write(item: Future | SourceDone) -> None:
+        if isinstance(item, SourceDone):
+            # The whole file has been read: whatever it no longer contains goes.
+            gone = list(records.ids(collection, item.source) - checkpoints.seen(collection, item.source))
+            if gone:
+                with_retries(vector_store.delete, gone)
+                records.remove(collection, gone)
+            checkpoints.finish(collection, item.source)
+            metrics.deleted += len(gone)
+            return
+        batch = item.result()
+        metrics.embed.items += len(batch.new)
+        metrics.embed.busy += batch.embed_seconds
+        metrics.chunks += len(batch.ids)
+        metrics.unchanged += len(batch.ids) - len(batch.new)
+        start = time.perf_counter()
+        if batch.new:
+            ids = [batch.ids[i] for i in batch.new]
+            with_retries(vector_store.add_documents, [batch.documents[i] for i in batch.new], ids=ids)
+            records.add(collection, batch.source, ids)
+        checkpoints.advance(collection, batch.source, batch.ids, batch.next_page)
+        metrics.write.items += len(batch.new)
+        metrics.write.busy += time.perf_counter() - start
+
+    started = time.perf_counter()
+    producer = threading.Thread(target=produce, name="ingest-load", daemon=True)
+    producer.start()
+    # Embeds in flight, oldest first; writing in this order keeps checkpoints monotonic.
+    pending: deque[Future | SourceDone] = deque()
+    try:
+        with ThreadPoolExecutor(concurrency, thread_name_prefix="ingest-embed") as pool:
+            while (item := batches.get()) is not None:
+                pending.append(item if isinstance(item, SourceDone) else pool.submit(embed, item))
+                while len(pending) > concurrency or (pending and isinstance(pending[0], SourceDone)):
+                    write(pending.popleft())
+            while pending:
+                write(pending.popleft())
+    finally:
+        stop.set()
+        producer.join()
+    if failure:
+        raise failure[0]
+    metrics.seconds = time.perf_counter() - started
+    return metrics
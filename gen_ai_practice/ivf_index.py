@@ -0,0 +1,118 @@
+"""IVF-flat approximate nearest-neighbour index for LocalVectorStore.
+
+Exact search scores every row, which is fine for media/facts.txt but grows
+linearly with the collection. IVF (inverted file) clusters the normalised
+vectors with spherical k-means into `nlist` lists; a query is compared with
+the centroids first and only the rows in the `nprobe` closest lists are
+scored exactly. With nlist around 4 * sqrt(n), probing a handful of lists
+touches a few percent of the rows; raising nprobe trades speed for recall
+(see bench_vector_index.py).
+
+The index is kept in memory next to the store: centroids plus the list each
+row belongs to. It is saved as ivf.npz in the store folder and loaded again
+on open; rows added since the last save are assigned to their list then.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+from pathlib import Path
+
+import numpy as np
+
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", "16"))
+IVF_ITERATIONS = int(os.getenv("IVF_ITERATIONS", "10"))
+# k-means is trained on at most this many rows per list, like Faiss does.
+TRAINING_ROWS_PER_LIST = 256
+# Rows scored per matrix product while assigning, to bound temporary memory.
+ASSIGN_CHUNK = 65536
+
+
+def default_nlist(rows: int) -> int:
+    return max(1, min(rows, int(4 * math.sqrt(rows))))
+
+
+def _normalise(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def nearest_centroids(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the most similar centroid for every row of `vectors`."""
+    lists = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), ASSIGN_CHUNK):
+        chunk = np.asarray(vectors[start:start + ASSIGN_CHUNK])
+        lists[start:start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+    return lists
+
+
+def spherical_kmeans(
+    vectors: np.ndarray, nlist: int, *, iterations: int = IVF_ITERATIONS, seed: int = 0
+) -> np.ndarray:
+    """Unit-length centroids of `nlist` clusters of the (normalised) rows of `vectors`."""
+    rng = np.random.default_rng(seed)
+    sample_size = min(len(vectors), nlist * TRAINING_ROWS_PER_LIST)
+    sample = np.asarray(vectors[np.sort(rng.choice(len(vectors), sample_size, replace=False))])
+    centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+    for _ in range(iterations):
+        lists = nearest_centroids(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, lists, sample)
+        counts = np.bincount(lists, minlength=nlist)
+        empty = counts == 0
+        # Re-seed empty clusters from random rows so every list stays in use.
+        sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+        centroids = _normalise(sums)
+    return centroids.astype(np.float32)
+
+
+class IVFIndex:
+    def __init__(self, centroids: np.ndarray, lists: np.ndarray, trained_rows: int):
+        self.centroids = centroids
+        self.lists = lists  # list id per store row
+        self.trained_rows = trained_rows
+        self._inverted: tuple[np.ndarray, np.ndarray] | None = None
+
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+
+    @classmethod
+    def train(cls, vectors: np.ndarray, nlist: int | None = None, **kwargs) -> IVFIndex:
+        nlist = min(nlist or default_nlist(len(vectors)), len(vectors))
+        centroids = spherical_kmeans(vectors, nlist, **kwargs)
+        return cls(centroids, nearest_centroids(vectors, centroids), len(vectors))
+
+    def assign(self, rows: np.ndarray, vectors: np.ndarray) -> None:
+        """Put new or overwritten `rows` (with these vectors) in their nearest list."""
+        rows = np.asarray(rows)
+        if len(rows) and rows.max() >= len(self.lists):
+            grown = np.full(rows.max() + 1, -1, dtype=np.int32)
+            grown[: len(self.lists)] = self.lists
+            self.lists = grown
+        self.lists[rows] = nearest_centroids(vectors, self.centroids)
+        self._inverted = None
+
+    def probe(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+        """Sorted rows in the `nprobe` lists whose centroids are most similar to `query`."""
+        if self._inverted is None:
+            order = np.argsort(self.lists, kind="stable")
+            offsets = np.searchsorted(self.lists[order], np.arange(self.nlist + 1))
+            self._inverted = order, offsets
+        order, offsets = self._inverted
+        nprobe = min(nprobe, self.nlist)
+        closest = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+        rows = np.concatenate([order[offsets[i]:offsets[i + 1]] for i in closest])
+        # Ascending rows read the memmap front to back.
+        return np.sort(rows)
+
+    def save(self, path: Path) -> None:
+        tmp = path.with_suffix(".tmp.npz")
+        np.savez(tmp, centroids=self.centroids, lists=self.lists, trained_rows=self.trained_rows)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path) -> IVFIndex:
+        with np.load(path) as data:
+            return cls(data["centroids"], data["lists"], int(data["trained_rows"]))
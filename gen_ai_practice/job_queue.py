@@ -0,0 +1,277 @@
+"""Persistent download queue for the batch audio processor (app.py).
+
+Batches used to run inside the Streamlit rerun that handled the button click,
+so refreshing the page or switching to another one killed them. URLs are now
+queued as jobs in SQLite and a `JobRunner` thread, created once per process
+with st.cache_resource, feeds them to the audio pipeline whatever the script
+is doing. The page only reads job state.
+
+A failed job is retried with exponential backoff up to `max_attempts`. Jobs
+still marked running when the process starts were interrupted by a restart
+and are queued again; the pipeline downloads into a scratch folder named
+after the video, so yt-dlp continues the partial file instead of starting
+over.
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, replace
+from pathlib import Path
+
+from audio_pipeline import AudioPipeline, AudioResult
+from youtube_ids import normalize_url
+
+DEFAULT_PATH = Path(__file__).resolve().parent.parent / ".cache" / "audio_jobs.sqlite"
+JOB_QUEUE_PATH = Path(os.getenv("AUDIO_JOB_QUEUE_PATH", str(DEFAULT_PATH)))
+MAX_ATTEMPTS = int(os.getenv("AUDIO_JOB_MAX_ATTEMPTS", "4"))
+RETRY_SECONDS = float(os.getenv("AUDIO_JOB_RETRY_SECONDS", "30"))
+MAX_RETRY_SECONDS = 15 * 60
+
+ACTIVE = ("queued", "running")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT NOT NULL,
+    normalized_url TEXT NOT NULL,
+    skip_existing INTEGER NOT NULL DEFAULT 1,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    next_run_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    result TEXT NOT NULL DEFAULT '',
+    title TEXT NOT NULL DEFAULT '',
+    file TEXT NOT NULL DEFAULT '',
+    error TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS jobs_pending ON jobs(status, next_run_at);
+"""
+
+
+@dataclass(frozen=True)
+class Job:
+    id: int
+    url: str
+    skip_existing: bool
+    status: str  # queued | running | done | failed
+    attempts: int
+    max_attempts: int
+    next_run_at: float
+    updated_at: float
+    result: str  # the pipeline's status once done: success | cached | skipped
+    title: str
+    file: str
+    error: str
+
+
+COLUMNS = (
+    "id, url, skip_existing, status, attempts, max_attempts, next_run_at, "
+    "updated_at, result, title, file, error"
+)
+
+
+def _job(row) -> Job:
+    return Job(row[0], row[1], bool(row[2]), *row[3:])
+
+
+def retry_delay(attempts: int, base: float = RETRY_SECONDS) -> float:
+    """Seconds to wait after the `attempts`-th failure: base, 2x base, 4x base, ... capped."""
+    return min(base * 2 ** (attempts - 1), MAX_RETRY_SECONDS)
+
+
+class JobQueue:
+    def __init__(self, path: Path = JOB_QUEUE_PATH, max_attempts: int = MAX_ATTEMPTS):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        # Autocommit, so claim() can take a write lock with BEGIN IMMEDIATE itself.
+        self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode = WAL")
+        self._db.executescript(SCHEMA)
+
+    def enqueue(self, urls: list[str], *, skip_existing: bool = True) -> int:
+        """Queue every URL not already queued or running; returns how many were added."""
+        now = time.time()
+        added = 0
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                for url in urls:
+                    normalized = normalize_url(url)
+                    active = self._db.execute(
+                        "SELECT 1 FROM jobs WHERE normalized_url = ? AND status IN (?, ?)",
+                        (normalized, *ACTIVE),
+                    ).fetchone()
+                    if active:
+                        continue
+                    self._db.execute(
+                        "INSERT INTO jobs (url, normalized_url, skip_existing, max_attempts, "
+                        "next_run_at, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (url, normalized, int(skip_existing), self.max_attempts, now, now, now),
+                    )
+                    added += 1
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return added
+
+    def claim(self) -> Job | None:
+        """Mark the oldest due job as running and return it."""
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute(
+                    f"SELECT {COLUMNS} FROM jobs WHERE status = 'queued' AND next_run_at <= ? "
+                    "ORDER BY next_run_at, id LIMIT 1",
+                    (now,),
+                ).fetchone()
+                if row is not None:
+                    self._db.execute(
+                        "UPDATE jobs SET status = 'running', attempts = attempts + 1, updated_at = ? "
+                        "WHERE id = ?",
+                        (now, row[0]),
+                    )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        job = _job(row)
+        return replace(job, status="running", attempts=job.attempts + 1)
+
+    def complete(self, job: Job, result: AudioResult) -> None:
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = 'done', result = ?, title = ?, file = ?, error = '', "
+                "updated_at = ? WHERE id = ?",
+                (result.status, result.title, str(result.file or ""), time.time(), job.id),
+            )
+
+    def fail(self, job: Job, error: str) -> None:
+        """Queue the job again after a backoff delay, or mark it failed after its last attempt."""
+        now = time.time()
+        with self._lock:
+            if job.attempts < job.max_attempts:
+                self._db.execute(
+                    "UPDATE jobs SET status = 'queued', next_run_at = ?, error = ?, updated_at = ? "
+                    "WHERE id = ?",
+                    (now + retry_delay(job.attempts), error, now, job.id),
+                )
+            else:
+                self._db.execute(
+                    "UPDATE jobs SET status = 'failed', error = ?, updated_at = ? WHERE id = ?",
+                    (error, now, job.id),
+                )
+
+    def requeue_running(self) -> int:
+        """Put jobs left running by a previous process back in the queue."""
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE jobs SET status = 'queued', attempts = MAX(attempts - 1, 0), next_run_at = ?, "
+                "updated_at = ? WHERE status = 'running'",
+                (time.time(), time.time()),
+            )
+        return cursor.rowcount
+
+    def retry_failed(self) -> int:
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE jobs SET status = 'queued', attempts = 0, next_run_at = ?, updated_at = ? "
+                "WHERE status = 'failed'",
+                (time.time(), time.time()),
+            )
+        return cursor.rowcount
+
+    def clear_finished(self) -> int:
+        with self._lock:
+            cursor = self._db.execute("DELETE FROM jobs WHERE status IN ('done', 'failed')")
+        return cursor.rowcount
+
+    def counts(self) -> dict[str, int]:
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {"queued": 0, "running": 0, "done": 0, "failed": 0, **dict(rows)}
+
+    def recent(self, limit: int = 50) -> list[Job]:
+        """Active jobs first, then the most recently finished ones."""
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {COLUMNS} FROM jobs ORDER BY status NOT IN (?, ?), updated_at DESC LIMIT ?",
+                (*ACTIVE, limit),
+            ).fetchall()
+        return [_job(row) for row in rows]
+
+
+class JobRunner:
+    """Background thread moving queued jobs into the pipeline, `max_in_flight` at a time."""
+
+    def __init__(self, queue: JobQueue, pipeline: AudioPipeline, max_in_flight: int, poll_seconds: float = 1.0):
+        self.queue = queue
+        self.pipeline = pipeline
+        self.max_in_flight = max_in_flight
+        self.poll_seconds = poll_seconds
+        self._in_flight: set[int] = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self.requeued = queue.requeue_running()
+        self._thread = threading.Thread(target=self._run, name="job-runner", daemon=True)
+        self._thread.start()
+
+    def wake(self) -> None:
+        """Check the queue now instead of at the next poll, e.g. right after enqueueing."""
+        self._wake.set()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            while True:
+                with self._lock:
+                    if len(self._in_flight) >= self.max_in_flight:
+                        break
+                try:
+                    job = self.queue.claim()
+                except sqlite3.Error:
+                    break
+                if job is None:
+                    break
+                with self._lock:
+                    self._in_flight.add(job.id)
+                try:
+                    future = self.pipeline.submit(job.url, skip_existing=job.skip_existing)
+                except RuntimeError:
+                    # The pipeline was shut down (the interpreter is exiting); the job
+                    # stays running and requeue_running() picks it up next start.
+                    return
+                future.add_done_callback(lambda done, job=job: self._finish(job, done))
+            self._wake.wait(self.poll_seconds)
+            self._wake.clear()
+
+    def _finish(self, job: Job, future: Future) -> None:
+        try:
+            result = future.result()
+            if result.status == "failed":
+                self.queue.fail(job, result.error)
+            else:
+                self.queue.complete(job, result)
+        except Exception as exc:
+            self.queue.fail(job, f"{type(exc).__name__}: {exc}")
+        finally:
+            with self._lock:
+                self._in_flight.discard(job.id)
+            self._wake.set()
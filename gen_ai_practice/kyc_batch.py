@@ -0,0 +1,208 @@
+"""Headless batch mode for the KYC verification app (2025-12-01_streamlit2.py).
+
+Run from the repository root:
+
+    python gen_ai_practice/kyc_batch.py manifest.csv [--output results.jsonl]
+
+The manifest is a CSV with `image_path,name,dob` columns, or a JSONL file with
+the same keys; an optional `id` column is copied to the output. Image paths
+are resolved relative to the manifest.
+
+Images are decoded and downscaled in a process pool, verification calls run
+with bounded concurrency under a requests-per-second limit, and every result
+is appended to the output JSONL as soon as it arrives. Re-running the same
+command after a crash skips rows that already have a successful result, so a
+batch resumes where it stopped; failed rows are retried.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from dotenv import load_dotenv
+from langchain_google_genai import ChatGoogleGenerativeAI
+
+from image_preprocess import preprocess_image
+from prompt_registry import registry
+
+
+class RateLimiter:
+    """Token bucket allowing `rate` acquisitions per second with bursts up to `burst`."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def read_manifest(path: Path) -> list[dict]:
+    if path.suffix.lower() == ".jsonl":
+        with path.open(encoding="utf-8") as fh:
+            rows = [json.loads(line) for line in fh if line.strip()]
+    else:
+        with path.open(newline="", encoding="utf-8") as fh:
+            rows = list(csv.DictReader(fh))
+    for index, row in enumerate(rows):
+        missing = {"image_path", "name", "dob"} - row.keys()
+        if missing:
+            raise SystemExit(f"Manifest row {index} is missing {sorted(missing)}")
+        row["row"] = index
+    return rows
+
+
+def completed_rows(output: Path) -> set[int]:
+    """Rows with a successful result; also trims a line left half-written by a crash."""
+    if not output.exists():
+        return set()
+    with output.open("rb+") as fh:
+        data = fh.read()
+        if data and not data.endswith(b"\n"):
+            fh.truncate(data.rfind(b"\n") + 1)
+            data = data[: data.rfind(b"\n") + 1]
+    done = set()
+    for line in data.decode("utf-8").splitlines():
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if record.get("status") == "ok":
+            done.add(record["row"])
+    return done
+
+
+def prepare_image(path: str, max_dimension: int) -> str:
+    """Runs in a worker process: read, downscale and return the image as a data URL."""
+    return preprocess_image(path, max_dimension=max_dimension).data_url
+
+
+class ResultWriter:
+    """Appends one JSON line per result and syncs it to disk before returning."""
+
+    def __init__(self, path: Path):
+        self._fh = path.open("a", encoding="utf-8")
+        self._lock = asyncio.Lock()
+
+    async def write(self, record: dict) -> None:
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        async with self._lock:
+            self._fh.write(line)
+            self._fh.flush()
+            os.fsync(self._fh.fileno())
+
+    def close(self) -> None:
+        self._fh.close()
+
+
+async def verify_row(row, chain, pool, limiter, writer, args, base_dir: Path) -> bool:
+    loop = asyncio.get_running_loop()
+    record = {
+        "row": row["row"],
+        "id": row.get("id"),
+        "image_path": row["image_path"],
+        "name": row["name"],
+        "dob": row["dob"],
+        "prompt_version": chain.version,
+    }
+    start = time.perf_counter()
+    try:
+        image_url = await loop.run_in_executor(
+            pool, prepare_image, str(base_dir / row["image_path"]), args.max_dimension
+        )
+        for attempt in range(args.retries + 1):
+            await limiter.acquire()
+            try:
+                res = await chain.ainvoke(
+                    {"user_name": row["name"], "user_dob": row["dob"], "image_url": image_url}
+                )
+                break
+            except Exception:
+                if attempt == args.retries:
+                    raise
+                await asyncio.sleep(2 ** attempt)
+        record.update(status="ok", result=res.content)
+    except Exception as exc:
+        record.update(status="error", error=f"{type(exc).__name__}: {exc}")
+    record["elapsed_ms"] = round((time.perf_counter() - start) * 1000)
+    await writer.write(record)
+    return record["status"] == "ok"
+
+
+async def run(args) -> None:
+    manifest = Path(args.manifest)
+    output = Path(args.output) if args.output else manifest.with_suffix(".results.jsonl")
+    rows = read_manifest(manifest)
+    done = completed_rows(output)
+    pending = [row for row in rows if row["row"] not in done]
+    print(f"{len(rows)} rows in manifest, {len(done)} already verified, {len(pending)} to go")
+    if not pending:
+        return
+
+    load_dotenv()
+    llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash", api_key=os.getenv("GEMINI_API_KEY"))
+    chain = registry.compile("kyc-verify", llm)
+    limiter = RateLimiter(args.rate, burst=args.concurrency)
+    writer = ResultWriter(output)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=args.concurrency * 2)
+    ok = failed = 0
+
+    async def worker(pool) -> None:
+        nonlocal ok, failed
+        while True:
+            row = await queue.get()
+            if row is None:
+                return
+            if await verify_row(row, chain, pool, limiter, writer, args, manifest.parent):
+                ok += 1
+            else:
+                failed += 1
+            finished = ok + failed
+            if finished % 25 == 0 or finished == len(pending):
+                print(f"  {finished}/{len(pending)} done ({failed} failed)")
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        workers = [asyncio.create_task(worker(pool)) for _ in range(args.concurrency)]
+        # The bounded queue keeps only a few rows in flight, however large the manifest.
+        for row in pending:
+            await queue.put(row)
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+    writer.close()
+    print(f"Finished in {time.perf_counter() - start:.1f}s: {ok} verified, {failed} failed -> {output}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("manifest", help="CSV or JSONL with image_path, name, dob")
+    parser.add_argument("--output", help="results JSONL (default: <manifest>.results.jsonl)")
+    parser.add_argument("--concurrency", type=int, default=4, help="verification calls in flight")
+    parser.add_argument("--rate", type=float, default=2.0, help="max verification calls per second")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="image preprocessing processes")
+    parser.add_argument("--max-dimension", type=int, default=1024, help="longest image side sent to Gemini")
+    parser.add_argument("--retries", type=int, default=2, help="retries per row on LLM errors")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
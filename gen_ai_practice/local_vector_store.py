@@ -0,0 +1,539 @@
+"""Offline vector store with the same interface as MongoDBAtlasVectorSearch.
+
+The RAG examples (2025-12-03_example1 to example5) could only run against a
+live Atlas cluster, and every query paid a network round trip. This store
+keeps a collection in a folder on disk instead:
+
+    vectors.f32   float32 matrix, one L2-normalised row per document, opened
+                  with np.memmap so only the pages a search touches are read
+    docs.sqlite   row -> id, text and metadata (JSON), plus the dimensions and
+                  the number of rows in use
+    ivf.npz       the IVF index, when one is used (see below)
+
+A search is one matrix-vector product over the memmap (cosine similarity,
+since rows are normalised) followed by np.argpartition for the top k, so it
+never sorts the whole collection. Ids and metadata are kept in memory for
+filtering; texts are only read back for the hits. With index="ivf"
+(LOCAL_VECTOR_INDEX=ivf) collections of IVF_MIN_ROWS rows or more are
+searched through an IVF-flat index instead (ivf_index.py), which only scores
+the rows in the clusters closest to the query. The index is trained by the
+write that takes the collection past IVF_MIN_ROWS (and retrained by the one
+that grows it IVF_RETRAIN_GROWTH-fold), or by an explicit build_index();
+searches never train it and use exact search until an index exists.
+
+It follows Atlas where the examples can tell the difference: scores are
+(1 + cosine) / 2 in [0, 1], `pre_filter` takes MongoDB-style conditions on
+metadata fields, `delete()` with no ids empties the collection and `close()`
+releases it. Pick it with VECTOR_STORE=local (see vector_store_config.py).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from collections.abc import Callable, Iterable, Sequence
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+from langchain_core.vectorstores.utils import maximal_marginal_relevance
+
+from ivf_index import IVF_NPROBE, IVFIndex
+
+DEFAULT_ROOT = Path(__file__).resolve().parent.parent / ".cache" / "vector_stores"
+LOCAL_VECTOR_STORE_DIR = Path(os.getenv("LOCAL_VECTOR_STORE_DIR", str(DEFAULT_ROOT)))
+LOCAL_VECTOR_INDEX = os.getenv("LOCAL_VECTOR_INDEX", "flat")  # flat | ivf
+# Below this many rows exact search is fast enough and an IVF index is not built.
+IVF_MIN_ROWS = int(os.getenv("IVF_MIN_ROWS", "20000"))
+# Retrain the IVF index once the collection has grown this much since training.
+IVF_RETRAIN_GROWTH = 4
+
+INITIAL_CAPACITY = 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS docs (
+    row INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    text TEXT NOT NULL,
+    metadata TEXT NOT NULL
+);
+"""
+
+COMPARISONS: dict[str, Callable[[Any, Any], bool]] = {
+    "$eq": lambda value, operand: value == operand,
+    "$ne": lambda value, operand: value != operand,
+    "$gt": lambda value, operand: value is not None and value > operand,
+    "$gte": lambda value, operand: value is not None and value >= operand,
+    "$lt": lambda value, operand: value is not None and value < operand,
+    "$lte": lambda value, operand: value is not None and value <= operand,
+    "$in": lambda value, operand: value in operand,
+    "$nin": lambda value, operand: value not in operand,
+    "$exists": lambda value, operand: (value is not None) == bool(operand),
+}
+
+
+def matches(metadata: dict, condition: dict) -> bool:
+    """Evaluate a MongoDB-style filter ({"source": "a.pdf"}, {"page": {"$lt": 3}},
+    {"$and": [...]}, {"$or": [...]}) against one document's metadata."""
+    for field, expected in condition.items():
+        if field == "$and":
+            if not all(matches(metadata, part) for part in expected):
+                return False
+        elif field == "$or":
+            if not any(matches(metadata, part) for part in expected):
+                return False
+        elif isinstance(expected, dict) and expected and all(op.startswith("$") for op in expected):
+            value = metadata.get(field)
+            for op, operand in expected.items():
+                if op not in COMPARISONS:
+                    raise ValueError(f"Unsupported filter operator: {op}")
+                try:
+                    if not COMPARISONS[op](value, operand):
+                        return False
+                except TypeError:
+                    return False
+        elif metadata.get(field) != expected:
+            return False
+    return True
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the `k` highest scores, best first, without sorting all of them."""
+    if k >= len(scores):
+        return np.argsort(-scores, kind="stable")
+    best = np.argpartition(-scores, k - 1)[:k]
+    return best[np.argsort(-scores[best], kind="stable")]
+
+
+def _normalise(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class LocalVectorStore(VectorStore):
+    def __init__(
+        self,
+        path: Path,
+        embedding: Embeddings,
+        *,
+        dimensions: int | None = None,
+        index: str = LOCAL_VECTOR_INDEX,
+        nlist: int | None = None,
+        nprobe: int = IVF_NPROBE,
+    ):
+        if index not in ("flat", "ivf"):
+            raise ValueError(f"index must be 'flat' or 'ivf', not {index!r}")
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.embedding = embedding
+        self.index = index
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(self.path / "docs.sqlite", timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode = WAL")
+        self._db.executescript(SCHEMA)
+        meta = dict(self._db.execute("SELECT key, value FROM meta"))
+        self.dimensions: int | None = meta.get("dimensions")
+        self._rows = meta.get("rows", 0)
+        # Per matrix row: whether it holds a document, and its metadata.
+        self._live = np.zeros(self._rows, dtype=bool)
+        self._metadata: list[dict | None] = [None] * self._rows
+        self._row_of: dict[str, int] = {}
+        for row, doc_id, metadata in self._db.execute("SELECT row, id, metadata FROM docs"):
+            self._live[row] = True
+            self._metadata[row] = json.loads(metadata)
+            self._row_of[doc_id] = row
+        self._vectors: np.memmap | None = None
+        self._ivf: IVFIndex | None = None
+        self._ivf_dirty = False
+        # Training runs outside _lock; rows overwritten meanwhile are reassigned when it is installed.
+        self._build_lock = threading.Lock()
+        self._overwritten: list[np.ndarray] | None = None
+        self._generation = 0  # bumped when the collection is emptied
+        if self.dimensions is None and dimensions is not None:
+            self.create_vector_search_index(dimensions)
+        elif self.dimensions is not None:
+            self._open_vectors()
+            if index == "ivf" and self._ivf_path.exists():
+                self._load_ivf()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding
+
+    def __len__(self) -> int:
+        return len(self._row_of)
+
+    # -- storage ---------------------------------------------------------------
+
+    @property
+    def _vectors_path(self) -> Path:
+        return self.path / "vectors.f32"
+
+    @property
+    def _ivf_path(self) -> Path:
+        return self.path / "ivf.npz"
+
+    def _open_vectors(self, capacity: int | None = None) -> None:
+        row_bytes = self.dimensions * 4
+        current = self._vectors_path.stat().st_size // row_bytes if self._vectors_path.exists() else 0
+        capacity = max(capacity or 0, current, INITIAL_CAPACITY)
+        if capacity != current:
+            if self._vectors is not None:
+                self._vectors.flush()
+                self._vectors = None
+            with open(self._vectors_path, "ab") as fh:
+                fh.truncate(capacity * row_bytes)
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dimensions))
+
+    def _ensure_capacity(self, rows: int) -> None:
+        if rows > len(self._vectors):
+            capacity = len(self._vectors)
+            while capacity < rows:
+                capacity *= 2
+            self._open_vectors(capacity)
+
+    def _set_meta(self, key: str, value: int) -> None:
+        self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def create_vector_search_index(self, dimensions: int, **kwargs: Any) -> None:
+        """Fix the vector size; Atlas needs an index created up front, here it only sizes the file."""
+        with self._lock:
+            if self.dimensions is not None:
+                if self.dimensions != dimensions:
+                    raise ValueError(f"{self.path} holds {self.dimensions}-d vectors, not {dimensions}-d")
+                return
+            self.dimensions = dimensions
+            with self._db:
+                self._set_meta("dimensions", dimensions)
+            self._open_vectors()
+
+    # -- writing ---------------------------------------------------------------
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: list[dict] | None = None,
+        *,
+        ids: list[str] | None = None,
+        **kwargs: Any,
+    ) -> list[str]:
+        texts = list(texts)
+        if not texts:
+            return []
+        vectors = np.asarray(self.embedding.embed_documents(texts), dtype=np.float32)
+        return self.add_vectors(vectors, texts, metadatas, ids=ids)
+
+    def add_documents(self, documents: list[Document], **kwargs: Any) -> list[str]:
+        ids = kwargs.pop("ids", None) or [doc.id or str(uuid.uuid4()) for doc in documents]
+        return self.add_texts(
+            [doc.page_content for doc in documents],
+            [doc.metadata for doc in documents],
+            ids=ids,
+            **kwargs,
+        )
+
+    def add_vectors(
+        self,
+        vectors: np.ndarray,
+        texts: Sequence[str],
+        metadatas: Sequence[dict] | None = None,
+        *,
+        ids: Sequence[str] | None = None,
+    ) -> list[str]:
+        """Store precomputed embeddings; an id that already exists is overwritten in place.
+
+        An id given more than once keeps its last entry, as successive upserts would.
+        """
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        texts = list(texts)
+        metadatas = list(metadatas) if metadatas is not None else [{} for _ in texts]
+        ids = list(ids) if ids is not None else [str(uuid.uuid4()) for _ in texts]
+        if not len(vectors) == len(texts) == len(metadatas) == len(ids):
+            raise ValueError("vectors, texts, metadatas and ids must have the same length")
+        given = ids
+        last = {doc_id: i for i, doc_id in enumerate(ids)}
+        if len(last) < len(ids):
+            keep = sorted(last.values())
+            vectors = vectors[keep]
+            texts, metadatas, ids = [texts[i] for i in keep], [metadatas[i] for i in keep], [ids[i] for i in keep]
+        with self._lock:
+            self.create_vector_search_index(vectors.shape[1])
+            rows = []
+            next_row = self._rows
+            for doc_id in ids:
+                row = self._row_of.get(doc_id)
+                if row is None:
+                    row, next_row = next_row, next_row + 1
+                rows.append(row)
+            self._ensure_capacity(next_row)
+            vectors = _normalise(vectors)
+            self._vectors[rows] = vectors
+            # Vectors reach the file before the rows that point at them are committed.
+            self._vectors.flush()
+            with self._db:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO docs (row, id, text, metadata) VALUES (?, ?, ?, ?)",
+                    [(row, doc_id, text, json.dumps(metadata))
+                     for row, doc_id, text, metadata in zip(rows, ids, texts, metadatas)],
+                )
+                self._set_meta("rows", next_row)
+            grow = next_row - self._rows
+            self._live = np.concatenate([self._live, np.zeros(grow, dtype=bool)])
+            self._metadata.extend([None] * grow)
+            self._rows = next_row
+            self._live[rows] = True
+            for row, doc_id, metadata in zip(rows, ids, metadatas):
+                self._metadata[row] = dict(metadata)
+                self._row_of[doc_id] = row
+            if self._ivf is not None:
+                self._ivf.assign(np.asarray(rows), vectors)
+                self._ivf_dirty = True
+            if self._overwritten is not None:
+                self._overwritten.append(np.asarray(rows))
+        self._maybe_build_index()
+        return given
+
+    def delete(self, ids: list[str] | None = None, **kwargs: Any) -> bool | None:
+        """Delete the given ids, or every document when `ids` is None (as Atlas does)."""
+        with self._lock:
+            if ids is None:
+                with self._db:
+                    self._db.execute("DELETE FROM docs")
+                    self._set_meta("rows", 0)
+                self._rows = 0
+                self._live, self._metadata, self._row_of = np.zeros(0, dtype=bool), [], {}
+                self._generation += 1
+                self._ivf = None
+                self._ivf_path.unlink(missing_ok=True)
+                if self._vectors is not None:
+                    self._vectors = None
+                    self._vectors_path.unlink(missing_ok=True)
+                    self._open_vectors()
+                return True
+            rows = [self._row_of.pop(doc_id) for doc_id in ids if doc_id in self._row_of]
+            with self._db:
+                self._db.executemany("DELETE FROM docs WHERE row = ?", [(row,) for row in rows])
+            self._live[rows] = False
+            for row in rows:
+                self._metadata[row] = None
+        return True
+
+    def close(self) -> None:
+        with self._lock:
+            if self._ivf is not None and self._ivf_dirty:
+                self._ivf.save(self._ivf_path)
+            if self._vectors is not None:
+                self._vectors.flush()
+                self._vectors = None
+            self._db.close()
+
+    # -- reading ---------------------------------------------------------------
+
+    def get_by_ids(self, ids: Sequence[str], /) -> list[Document]:
+        with self._lock:
+            rows = [self._row_of[doc_id] for doc_id in ids if doc_id in self._row_of]
+            return self._documents(rows)
+
+    def _fetch(self, rows: Sequence[int]) -> dict[int, Document]:
+        if not rows:
+            return {}
+        placeholders = ", ".join("?" * len(rows))
+        return {
+            row: Document(id=doc_id, page_content=text, metadata=json.loads(metadata))
+            for row, doc_id, text, metadata in self._db.execute(
+                f"SELECT row, id, text, metadata FROM docs WHERE row IN ({placeholders})", list(rows)
+            )
+        }
+
+    def _documents(self, rows: Sequence[int]) -> list[Document]:
+        """Documents of `rows` in order, skipping rows that hold none."""
+        found = self._fetch(rows)
+        return [found[row] for row in rows if row in found]
+
+    # -- IVF index --------------------------------------------------------------
+
+    def build_index(self, nlist: int | None = None, **kwargs: Any) -> IVFIndex | None:
+        """(Re)train the IVF index on every row and save it; `nlist` defaults to ~4 * sqrt(rows).
+
+        Training runs without holding the store's lock, so searches and writes
+        carry on meanwhile (searches on the previous index, or exactly); rows
+        written during training are assigned before the new index is
+        installed. Returns None if the collection was emptied meanwhile.
+        """
+        with self._build_lock:
+            with self._lock:
+                if self._vectors is None or not self._rows:
+                    raise ValueError("cannot build an index over an empty collection")
+                vectors, trained, generation = self._vectors, self._rows, self._generation
+                self._overwritten = []
+            try:
+                ivf = IVFIndex.train(vectors[:trained], nlist or self.nlist, **kwargs)
+            except BaseException:
+                with self._lock:
+                    self._overwritten = None
+                raise
+            with self._lock:
+                overwritten, self._overwritten = self._overwritten, None
+                if generation != self._generation:
+                    return None
+                changed = [rows[rows < trained] for rows in overwritten]
+                changed.append(np.arange(trained, self._rows))
+                rows = np.unique(np.concatenate(changed))
+                if len(rows):
+                    ivf.assign(rows, self._vectors[rows])
+                ivf.save(self._ivf_path)
+                self._ivf, self._ivf_dirty = ivf, False
+                return ivf
+
+    def _maybe_build_index(self) -> None:
+        """Train the IVF index once the collection needs one, or has outgrown it."""
+        if self.index != "ivf" or self._rows < IVF_MIN_ROWS or self._build_lock.locked():
+            return
+        if self._ivf is None or self._rows > IVF_RETRAIN_GROWTH * self._ivf.trained_rows:
+            self.build_index()
+
+    def _load_ivf(self) -> None:
+        self._ivf = IVFIndex.load(self._ivf_path)
+        saved = len(self._ivf.lists)
+        if saved < self._rows:
+            # Rows added after the last save.
+            self._ivf.assign(np.arange(saved, self._rows), self._vectors[saved: self._rows])
+            self._ivf_dirty = True
+
+    def _index_for_search(self) -> IVFIndex | None:
+        if self.index != "ivf" or self._rows < IVF_MIN_ROWS:
+            return None
+        return self._ivf
+
+    # -- searching ---------------------------------------------------------------
+
+    def _matching_rows(self, rows: np.ndarray | None, pre_filter: dict | None) -> np.ndarray | None:
+        """Those of `rows` (default: all) that hold a document passing the filter.
+
+        None stands for every row, so an unfiltered search of a store without
+        deleted rows can score the matrix without gathering it first.
+        """
+        if rows is None:
+            if not pre_filter and len(self._row_of) == self._rows:
+                return None
+            rows = np.flatnonzero(self._live[: self._rows])
+        else:
+            rows = rows[self._live[rows]]
+        if pre_filter:
+            keep = np.fromiter((matches(self._metadata[row], pre_filter) for row in rows), dtype=bool, count=len(rows))
+            rows = rows[keep]
+        return rows
+
+    def _rank(self, rows: np.ndarray | None, query: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        if rows is None:
+            scores = self._vectors[: self._rows] @ query
+            best = top_k(scores, k)
+            return best, scores[best]
+        scores = self._vectors[rows] @ query
+        best = top_k(scores, k)
+        return rows[best], scores[best]
+
+    def _search(
+        self, embedding: Sequence[float], k: int, pre_filter: dict | None, nprobe: int | None = None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Matrix rows and cosine similarities of the `k` nearest documents, best first."""
+        if self._vectors is None or k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        query = _normalise(np.asarray(embedding, dtype=np.float32))
+        ivf = self._index_for_search()
+        if ivf is not None:
+            rows = self._matching_rows(ivf.probe(query, nprobe or self.nprobe), pre_filter)
+            # A selective filter can leave fewer than k rows in the probed lists;
+            # fall back to exact search rather than return a short list.
+            if len(rows) >= k:
+                return self._rank(rows, query, k)
+        return self._rank(self._matching_rows(None, pre_filter), query, k)
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, pre_filter: dict | None = None, **kwargs: Any
+    ) -> list[tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_score(
+            self.embedding.embed_query(query), k, pre_filter, **kwargs
+        )
+
+    def similarity_search_by_vector_with_score(
+        self, embedding: list[float], k: int = 4, pre_filter: dict | None = None, **kwargs: Any
+    ) -> list[tuple[Document, float]]:
+        pre_filter = pre_filter or kwargs.get("filter")
+        with self._lock:
+            rows, scores = self._search(embedding, k, pre_filter, kwargs.get("nprobe"))
+            found = self._fetch(rows.tolist())
+        return [(found[row], float((1 + score) / 2)) for row, score in zip(rows.tolist(), scores) if row in found]
+
+    def similarity_search(
+        self, query: str, k: int = 4, pre_filter: dict | None = None, **kwargs: Any
+    ) -> list[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, pre_filter, **kwargs)]
+
+    def similarity_search_by_vector(
+        self, embedding: list[float], k: int = 4, pre_filter: dict | None = None, **kwargs: Any
+    ) -> list[Document]:
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k, pre_filter, **kwargs)]
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        # Scores are already in [0, 1], like Atlas.
+        return lambda score: score
+
+    def max_marginal_relevance_search_by_vector(
+        self,
+        embedding: list[float],
+        k: int = 4,
+        fetch_k: int = 20,
+        lambda_mult: float = 0.5,
+        pre_filter: dict | None = None,
+        **kwargs: Any,
+    ) -> list[Document]:
+        pre_filter = pre_filter or kwargs.get("filter")
+        with self._lock:
+            rows, _ = self._search(embedding, fetch_k, pre_filter, kwargs.get("nprobe"))
+            if not len(rows):
+                return []
+            picked = maximal_marginal_relevance(
+                np.asarray(embedding, dtype=np.float32), self._vectors[rows], lambda_mult=lambda_mult, k=k
+            )
+            return self._documents([int(rows[i]) for i in picked])
+
+    def max_marginal_relevance_search(
+        self,
+        query: str,
+        k: int = 4,
+        fetch_k: int = 20,
+        lambda_mult: float = 0.5,
+        pre_filter: dict | None = None,
+        **kwargs: Any,
+    ) -> list[Document]:
+        return self.max_marginal_relevance_search_by_vector(
+            self.embedding.embed_query(query), k, fetch_k, lambda_mult, pre_filter, **kwargs
+        )
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: list[str],
+        embedding: Embeddings,
+        metadatas: list[dict] | None = None,
+        *,
+        ids: list[str] | None = None,
+        path: Path | None = None,
+        **kwargs: Any,
+    ) -> LocalVectorStore:
+        store = cls(path or LOCAL_VECTOR_STORE_DIR / "default", embedding)
+        store.add_texts(texts, metadatas, ids=ids)
+        return store
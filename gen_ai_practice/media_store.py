@@ -0,0 +1,167 @@
+"""Persistent, content-addressed store for downloaded media.
+
+The YouTube analyser used to download into a fresh temp directory on every
+run and the audio downloader kept its own folder, so the same video was
+fetched again and again. Files now live once under ``objects/`` named by
+their SHA-256, and a small SQLite index maps (media key, format) to them,
+where the media key is e.g. "youtube:<id>" (see youtube_ids.py) and format is
+whatever distinguishes the rendition (a yt-dlp format selector, "mp3-192").
+
+Writes go to a temp file in the store and are renamed into place, so a crash
+never leaves a partial object behind. When the objects outgrow `max_bytes`
+the least recently used ones are evicted.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+
+DEFAULT_ROOT = Path(__file__).resolve().parent.parent / ".cache" / "media"
+MEDIA_STORE_DIR = Path(os.getenv("MEDIA_STORE_DIR", str(DEFAULT_ROOT)))
+MEDIA_STORE_MAX_BYTES = int(os.getenv("MEDIA_STORE_MAX_BYTES", str(5 * 1024**3)))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects (
+    sha256 TEXT PRIMARY KEY,
+    relpath TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS media (
+    key TEXT NOT NULL,
+    format TEXT NOT NULL,
+    sha256 TEXT NOT NULL REFERENCES objects(sha256) ON DELETE CASCADE,
+    title TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (key, format)
+);
+CREATE INDEX IF NOT EXISTS objects_last_used ON objects(last_used);
+"""
+
+
+@dataclass(frozen=True)
+class StoredMedia:
+    path: Path
+    sha256: str
+    size: int
+    title: str = ""
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class MediaStore:
+    def __init__(self, root: Path = MEDIA_STORE_DIR, max_bytes: int = MEDIA_STORE_MAX_BYTES):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        (self.root / "objects").mkdir(parents=True, exist_ok=True)
+        (self.root / "tmp").mkdir(exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.root / "index.sqlite", timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA foreign_keys = ON")
+        self._db.execute("PRAGMA journal_mode = WAL")
+        self._db.executescript(SCHEMA)
+
+    def get(self, key: str, fmt: str) -> StoredMedia | None:
+        """Return the stored file for (key, fmt) and mark it used, or None."""
+        with self._lock, self._db:
+            row = self._db.execute(
+                "SELECT o.sha256, o.relpath, o.size, m.title FROM media m "
+                "JOIN objects o ON o.sha256 = m.sha256 WHERE m.key = ? AND m.format = ?",
+                (key, fmt),
+            ).fetchone()
+            if row is None:
+                return None
+            sha256, relpath, size, title = row
+            path = self.root / relpath
+            if not path.exists():
+                # Someone deleted the file behind our back; forget it.
+                self._db.execute("DELETE FROM objects WHERE sha256 = ?", (sha256,))
+                return None
+            self._db.execute("UPDATE objects SET last_used = ? WHERE sha256 = ?", (time.time(), sha256))
+        return StoredMedia(path, sha256, size, title)
+
+    def put(self, key: str, fmt: str, source: Path, *, title: str = "", move: bool = False) -> StoredMedia:
+        """Add `source` under (key, fmt); with move=True the file is taken over, not copied."""
+        source = Path(source)
+        fd, tmp = tempfile.mkstemp(dir=self.root / "tmp", suffix=source.suffix)
+        os.close(fd)
+        staged = Path(tmp)
+        try:
+            (shutil.move if move else shutil.copyfile)(source, staged)
+            sha256 = file_sha256(staged)
+            relpath = f"objects/{sha256[:2]}/{sha256}{source.suffix}"
+            target = self.root / relpath
+            if target.exists():
+                staged.unlink()
+            else:
+                target.parent.mkdir(exist_ok=True)
+                with open(staged, "rb") as fh:
+                    os.fsync(fh.fileno())
+                os.replace(staged, target)
+        except BaseException:
+            staged.unlink(missing_ok=True)
+            raise
+        size = target.stat().st_size
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT INTO objects (sha256, relpath, size, last_used) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(sha256) DO UPDATE SET last_used = excluded.last_used",
+                (sha256, relpath, size, time.time()),
+            )
+            self._db.execute(
+                "INSERT OR REPLACE INTO media (key, format, sha256, title) VALUES (?, ?, ?, ?)",
+                (key, fmt, sha256, title),
+            )
+            self._evict(keep=sha256)
+        return StoredMedia(target, sha256, size, title)
+
+    def fetch(
+        self,
+        key: str,
+        fmt: str,
+        download: Callable[[Path], tuple[Path, str]],
+    ) -> StoredMedia:
+        """Return (key, fmt) from the store, calling `download` only on a miss.
+
+        `download(directory)` saves the file into `directory` (a scratch folder
+        inside the store) and returns its path and title.
+        """
+        stored = self.get(key, fmt)
+        if stored is not None:
+            return stored
+        with tempfile.TemporaryDirectory(dir=self.root / "tmp") as scratch:
+            path, title = download(Path(scratch))
+            return self.put(key, fmt, path, title=title, move=True)
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COALESCE(SUM(size), 0) FROM objects").fetchone()[0]
+
+    def _evict(self, keep: str) -> None:
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM objects").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._db.execute(
+            "SELECT sha256, relpath, size FROM objects WHERE sha256 != ? ORDER BY last_used",
+            (keep,),
+        ).fetchall()
+        for sha256, relpath, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM objects WHERE sha256 = ?", (sha256,))
+            (self.root / relpath).unlink(missing_ok=True)
+            total -= size
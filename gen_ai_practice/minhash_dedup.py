@@ -0,0 +1,135 @@
+"""Drop near-duplicate chunks before they are embedded.
+
+PDFs repeat running headers, footers, reference lists and boilerplate from
+page to page, and every copy used to be embedded, stored and then returned
+side by side at query time. `NearDuplicateFilter` keeps the first chunk of
+each group of near-identical ones: a chunk is reduced to the set of its word
+3-grams, a MinHash signature estimates the Jaccard similarity of two such
+sets, and LSH banding finds the earlier chunks worth comparing without
+looking at all of them. A chunk whose estimated similarity to a kept chunk
+reaches `threshold` is dropped.
+
+The ingestion pipeline (ingest_pipeline.py) runs every chunk through a filter
+when INGEST_DEDUP_THRESHOLD is set (0.9 by default, 0 turns it off). Run this
+module to see what a threshold would save on a set of PDFs:
+
+    python gen_ai_practice/minhash_dedup.py [file.pdf ...] [--threshold 0.8]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+DEDUP_THRESHOLD = float(os.getenv("INGEST_DEDUP_THRESHOLD", "0.9"))
+NUM_PERM = 128
+SHINGLE_WORDS = 3
+
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+WORD = re.compile(r"\w+")
+
+
+def shingles(text: str, size: int = SHINGLE_WORDS) -> set[str]:
+    """Lower-cased word `size`-grams of `text`; short texts give their words joined."""
+    words = WORD.findall(text.lower())
+    if len(words) <= size:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def lsh_params(threshold: float, num_perm: int) -> tuple[int, int]:
+    """(bands, rows) with bands * rows <= num_perm whose S-curve midpoint, (1/bands)^(1/rows),
+    is closest to `threshold`."""
+    candidates = [(bands, num_perm // bands) for bands in range(1, num_perm + 1)]
+    return min(candidates, key=lambda p: abs((1 / p[0]) ** (1 / p[1]) - threshold))
+
+
+class NearDuplicateFilter:
+    def __init__(self, threshold: float = DEDUP_THRESHOLD, num_perm: int = NUM_PERM, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.threshold = threshold
+        self._a = rng.integers(1, MERSENNE_PRIME, num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, MERSENNE_PRIME, num_perm, dtype=np.uint64)
+        self.bands, self.rows = lsh_params(threshold, num_perm)
+        self._buckets: list[dict[bytes, list[int]]] = [{} for _ in range(self.bands)]
+        self._signatures: list[np.ndarray] = []
+        self.dropped = 0
+
+    @property
+    def kept(self) -> int:
+        return len(self._signatures)
+
+    def signature(self, text: str) -> np.ndarray:
+        hashes = np.fromiter((zlib.crc32(s.encode()) for s in shingles(text)), dtype=np.uint64)
+        # One universal hash per permutation, (a * x + b) mod p; the minimum over shingles is the signature.
+        permuted = (np.outer(self._a, hashes) + self._b[:, None]) % MERSENNE_PRIME & MAX_HASH
+        return permuted.min(axis=1).astype(np.uint32)
+
+    def add(self, text: str) -> int | None:
+        """Remember `text` unless it nearly duplicates one kept before.
+
+        Returns the index (in order kept) of that earlier text, or None if
+        `text` was kept.
+        """
+        signature = self.signature(text)
+        keys = [signature[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(self.bands)]
+        candidates = {index for band, key in enumerate(keys) for index in self._buckets[band].get(key, ())}
+        for index in sorted(candidates):
+            if np.mean(self._signatures[index] == signature) >= self.threshold:
+                self.dropped += 1
+                return index
+        index = len(self._signatures)
+        self._signatures.append(signature)
+        for band, key in enumerate(keys):
+            self._buckets[band].setdefault(key, []).append(index)
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    media = Path(__file__).resolve().parent.parent / "media"
+    parser.add_argument("pdfs", nargs="*", default=[str(media / "diabetes.pdf"), str(media / "ocean.pdf")])
+    parser.add_argument("--threshold", type=float, default=DEDUP_THRESHOLD)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--chunk-overlap", type=int, default=100)
+    parser.add_argument("--dimensions", type=int, default=768, help="embedding size, for index bytes")
+    parser.add_argument("--batch-size", type=int, default=64, help="texts per embedding call")
+    parser.add_argument("--examples", type=int, default=3, help="duplicate pairs to print")
+    args = parser.parse_args()
+
+    from fast_splitter import FastRecursiveSplitter
+    from parallel_pdf import load_and_split_pdf
+
+    splitter = FastRecursiveSplitter(chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap)
+    dedup = NearDuplicateFilter(args.threshold)
+    kept, pairs, chunks, saved_bytes = [], [], 0, 0
+    for pdf in args.pdfs:
+        for chunk in load_and_split_pdf(pdf, splitter):
+            chunks += 1
+            original = dedup.add(chunk.page_content)
+            if original is None:
+                kept.append(chunk)
+                continue
+            pairs.append((kept[original], chunk))
+            stored = chunk.page_content.encode() + json.dumps(chunk.metadata).encode()
+            saved_bytes += len(stored) + 4 * args.dimensions
+
+    calls = lambda n: -(-n // args.batch_size)  # noqa: E731
+    print(f"threshold {args.threshold} ({dedup.bands} bands x {dedup.rows} rows)")
+    print(f"chunks:           {chunks} -> {dedup.kept} ({dedup.dropped} near-duplicates dropped)")
+    print(f"embedding inputs: {dedup.dropped} saved; calls at {args.batch_size}/call: {calls(chunks)} -> {calls(dedup.kept)}")
+    print(f"index bytes:      {saved_bytes / 1024:.0f} KiB saved (text, metadata and {args.dimensions}-d float32 vectors)")
+    for first, duplicate in pairs[: args.examples]:
+        print(f"\n  page {first.metadata.get('page')}: {first.page_content[:70]!r}")
+        print(f"  page {duplicate.metadata.get('page')}: {duplicate.page_content[:70]!r}")
+
+
+if __name__ == "__main__":
+    main()
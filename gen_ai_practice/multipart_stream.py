@@ -0,0 +1,132 @@
+"""Streaming multipart parsing with per-file size limits.
+
+FastAPI's `UploadFile` spools the whole request body before the endpoint runs,
+so a size check on `file.size` happens after the bytes were already received
+(and `size` may be None). `iter_uploaded_files` instead feeds the raw request
+stream through python-multipart and hands back each file as soon as its part
+ends, dropping the data of any file that grows past the limit as it arrives.
+"""
+
+from __future__ import annotations
+
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+
+from starlette.requests import Request
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
+
+
+class MultipartRequestError(Exception):
+    """The request as a whole broke a limit (too many files, bad framing)."""
+
+
+@dataclass
+class UploadedFile:
+    index: int
+    filename: str
+    content_type: str
+    data: bytes = b""
+    error: str | None = None
+
+
+async def iter_uploaded_files(
+    request: Request,
+    *,
+    max_file_bytes: int,
+    max_files: int,
+) -> AsyncIterator[UploadedFile]:
+    """Yield every file part of a multipart/form-data request in upload order.
+
+    A file larger than `max_file_bytes` is yielded with `error` set and no data;
+    more than `max_files` files raises MultipartRequestError. Plain form fields
+    are skipped.
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise MultipartRequestError("Expected a multipart/form-data request with a boundary.")
+
+    completed: list[UploadedFile] = []
+    headers: dict[bytes, bytes] = {}
+    header_field = bytearray()
+    header_value = bytearray()
+    current: UploadedFile | None = None
+    buffer = bytearray()
+    file_count = 0
+
+    def on_part_begin() -> None:
+        nonlocal current
+        headers.clear()
+        buffer.clear()
+        current = None
+
+    def on_header_field(data: bytes, start: int, end: int) -> None:
+        header_field.extend(data[start:end])
+
+    def on_header_value(data: bytes, start: int, end: int) -> None:
+        header_value.extend(data[start:end])
+
+    def on_header_end() -> None:
+        headers[bytes(header_field).lower()] = bytes(header_value)
+        header_field.clear()
+        header_value.clear()
+
+    def on_headers_finished() -> None:
+        nonlocal current, file_count
+        _, options = parse_options_header(headers.get(b"content-disposition", b""))
+        if b"filename" not in options:
+            return
+        file_count += 1
+        if file_count > max_files:
+            raise MultipartRequestError(f"Too many files. At most {max_files} images per request.")
+        current = UploadedFile(
+            index=file_count - 1,
+            filename=options[b"filename"].decode("utf-8", "replace"),
+            content_type=headers.get(b"content-type", b"").decode("latin-1").strip(),
+        )
+
+    def on_part_data(data: bytes, start: int, end: int) -> None:
+        if current is None or current.error:
+            return
+        if len(buffer) + (end - start) > max_file_bytes:
+            current.error = f"File too large. Maximum size is {max_file_bytes // 1_000_000}MB."
+            buffer.clear()
+            return
+        buffer.extend(data[start:end])
+
+    def on_part_end() -> None:
+        if current is None:
+            return
+        if not current.error:
+            current.data = bytes(buffer)
+        buffer.clear()
+        completed.append(current)
+
+    parser = MultipartParser(
+        params[b"boundary"],
+        {
+            "on_part_begin": on_part_begin,
+            "on_header_field": on_header_field,
+            "on_header_value": on_header_value,
+            "on_header_end": on_header_end,
+            "on_headers_finished": on_headers_finished,
+            "on_part_data": on_part_data,
+            "on_part_end": on_part_end,
+        },
+    )
+
+    async for chunk in request.stream():
+        try:
+            parser.write(chunk)
+        except MultipartRequestError:
+            raise
+        except Exception as exc:
+            raise MultipartRequestError(f"Malformed multipart body: {exc}") from exc
+        while completed:
+            yield completed.pop(0)
+    parser.finalize()
+    while completed:
+        yield completed.pop(0)
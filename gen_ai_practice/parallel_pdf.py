@@ -0,0 +1,109 @@
+"""Extract and split PDF pages on a process pool.
+
+`PyPDFLoader(path).load_and_split(splitter)` extracts the text of every page
+and splits it in a single process, and for a PDF with complex layout that
+costs more than anything before the embedding calls. Here the pages are
+sharded into runs of `pages_per_shard`, and each worker process opens the PDF
+once, then extracts and splits the shards it is given. Results come back in
+page order through a window of `2 * workers` shards in flight, so a long PDF
+does not pile up in memory.
+
+The chunks are the same as load_and_split gives: the page text comes from
+the same pypdf call, and the document-level metadata (producer, source,
+total_pages, ...) is taken from PyPDFLoader's own first page, with "page" and
+"page_label" set per page. bench_parallel_pdf.py checks both the equality
+and the speedup.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from langchain_core.documents import Document
+from langchain_text_splitters import TextSplitter
+
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(os.cpu_count() or 1)))
+PDF_PAGES_PER_SHARD = int(os.getenv("PDF_PAGES_PER_SHARD", "4"))
+
+# Per worker process: the open PDF, the splitter and the document metadata.
+_worker: tuple | None = None
+
+
+def _open(path: str, splitter: TextSplitter | None, metadata: dict) -> None:
+    import pypdf
+
+    global _worker
+    _worker = (pypdf.PdfReader(path), splitter, metadata)
+
+
+def _split_shard(start: int, stop: int) -> list[list[Document]]:
+    """Chunks of pages [start, stop), one list per page (the page itself without a splitter)."""
+    reader, splitter, metadata = _worker
+    pages = []
+    for number in range(start, stop):
+        page = Document(
+            page_content=reader.pages[number].extract_text(extraction_mode="plain").strip(),
+            metadata=metadata | {"page": number, "page_label": reader.page_labels[number]},
+        )
+        pages.append(splitter.split_documents([page]) if splitter else [page])
+    return pages
+
+
+def split_pdf_pages(
+    path: Path | str,
+    splitter: TextSplitter | None = None,
+    *,
+    start_page: int = 0,
+    workers: int = PDF_WORKERS,
+    pages_per_shard: int = PDF_PAGES_PER_SHARD,
+) -> Iterator[list[Document]]:
+    """Chunks of each page of the PDF at `path`, one list per page, in page order."""
+    from langchain_community.document_loaders import PyPDFLoader
+
+    pages = PyPDFLoader(str(path)).lazy_load()
+    first = next(pages, None)
+    pages.close()
+    if first is None:
+        # A PDF with no pages has no chunks, just as PyPDFLoader gives none.
+        return
+    metadata = {key: value for key, value in first.metadata.items() if key not in ("page", "page_label")}
+    total = metadata["total_pages"]
+    if start_page == 0:
+        yield splitter.split_documents([first]) if splitter else [first]
+        start_page = 1
+    shards = [(start, min(start + pages_per_shard, total)) for start in range(start_page, total, pages_per_shard)]
+    if workers <= 1 or len(shards) <= 1:
+        global _worker
+        _open(str(path), splitter, metadata)
+        try:
+            for shard in shards:
+                yield from _split_shard(*shard)
+        finally:
+            _worker = None
+        return
+
+    # Callers run this on threads (ingest_pipeline's producer), and forking a
+    # threaded process can copy a lock another thread holds into the children.
+    with ProcessPoolExecutor(
+        workers,
+        mp_context=multiprocessing.get_context("forkserver"),
+        initializer=_open,
+        initargs=(str(path), splitter, metadata),
+    ) as pool:
+        pending = deque()
+        for shard in shards:
+            pending.append(pool.submit(_split_shard, *shard))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def load_and_split_pdf(path: Path | str, splitter: TextSplitter, **kwargs) -> list[Document]:
+    """Parallel equivalent of `PyPDFLoader(path).load_and_split(splitter)`."""
+    return [chunk for page in split_pdf_pages(path, splitter, **kwargs) for chunk in page]
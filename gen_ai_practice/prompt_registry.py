@@ -0,0 +1,450 @@
+"""Central registry of prompts and the chains compiled from them.
+
+Apps used to rebuild their `ChatPromptTemplate` and `prompt | llm` chain on
+every request. Prompts are now declared once here, checked against the input
+variables they are expected to take, and given a version made of a
+hand-maintained label plus a digest of the template, so any edit to a prompt
+changes the version that caches key on. Each app compiles the chains it needs
+at startup and the compiled chain records how long every invocation takes.
+
+This module only depends on langchain_core so it can be imported both from the
+scripts in this folder and from main.py at the repository root.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import statistics
+import threading
+import time
+from collections import OrderedDict, deque
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+from typing import Any
+
+from langchain_core.load import dumpd
+from langchain_core.output_parsers import BaseOutputParser
+from langchain_core.prompts import BasePromptTemplate, ChatPromptTemplate, MessagesPlaceholder, PromptTemplate
+from langchain_core.runnables import Runnable
+
+# Compiled chains kept per registry, least recently compiled dropped first.
+MAX_COMPILED_CHAINS = 64
+
+
+def fingerprint(obj: Any) -> str:
+    """Digest of an llm's or parser's configuration, so equal ones share compiled chains.
+
+    Uses LangChain's serialization plus the values of its secrets (which
+    dumpd replaces with placeholders), so two clients with different API keys
+    differ. Objects LangChain cannot serialize are keyed by identity.
+    """
+    if obj is None:
+        return ""
+    serialized = dumpd(obj)
+    if serialized.get("type") == "not_implemented":
+        return f"id:{id(obj)}"
+    secrets = [getattr(obj, name, None) for name in getattr(obj, "lc_secrets", {})]
+    secrets = [secret.get_secret_value() if hasattr(secret, "get_secret_value") else secret for secret in secrets]
+    payload = json.dumps([serialized, secrets], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class LatencyStats:
+    """Invocation count and latency of one chain; percentiles cover the latest calls."""
+
+    count: int = 0
+    errors: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+    recent: deque = field(default_factory=lambda: deque(maxlen=512))
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, seconds: float, failed: bool = False) -> None:
+        with self._lock:
+            self.count += 1
+            self.errors += failed
+            self.total_seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+            self.recent.append(seconds)
+
+    def snapshot(self) -> dict[str, float]:
+        with self._lock:
+            recent = sorted(self.recent)
+            count, errors, total, peak = self.count, self.errors, self.total_seconds, self.max_seconds
+        if not recent:
+            return {"count": 0, "errors": 0}
+        p95 = recent[min(len(recent) - 1, int(len(recent) * 0.95))]
+        return {
+            "count": count,
+            "errors": errors,
+            "mean_ms": round(total / count * 1000, 2),
+            "p50_ms": round(statistics.median(recent) * 1000, 2),
+            "p95_ms": round(p95 * 1000, 2),
+            "max_ms": round(peak * 1000, 2),
+        }
+
+
+@dataclass(frozen=True)
+class PromptSpec:
+    name: str
+    version: str
+    template: BasePromptTemplate
+    input_variables: frozenset[str]
+
+
+class CompiledChain:
+    """A prompt | llm [| parser] chain built once, timing every call."""
+
+    def __init__(self, spec: PromptSpec, runnable: Runnable, stats: LatencyStats | None = None):
+        self.name = spec.name
+        self.version = spec.version
+        self.runnable = runnable
+        self.stats = stats if stats is not None else LatencyStats()
+
+    def invoke(self, inputs: dict[str, Any], config: dict | None = None) -> Any:
+        start = time.perf_counter()
+        try:
+            result = self.runnable.invoke(inputs, config)
+        except Exception:
+            self.stats.record(time.perf_counter() - start, failed=True)
+            raise
+        self.stats.record(time.perf_counter() - start)
+        return result
+
+    async def ainvoke(self, inputs: dict[str, Any], config: dict | None = None) -> Any:
+        start = time.perf_counter()
+        try:
+            result = await self.runnable.ainvoke(inputs, config)
+        except Exception:
+            self.stats.record(time.perf_counter() - start, failed=True)
+            raise
+        self.stats.record(time.perf_counter() - start)
+        return result
+
+    async def astream(self, inputs: dict[str, Any], config: dict | None = None) -> AsyncIterator[Any]:
+        """Stream the output; the recorded time runs until the last chunk."""
+        start = time.perf_counter()
+        try:
+            async for chunk in self.runnable.astream(inputs, config):
+                yield chunk
+        except Exception:
+            self.stats.record(time.perf_counter() - start, failed=True)
+            raise
+        self.stats.record(time.perf_counter() - start)
+
+
+class PromptRegistry:
+    def __init__(self):
+        self._prompts: dict[str, PromptSpec] = {}
+        self._chains: OrderedDict[tuple, CompiledChain] = OrderedDict()
+        # Shared by every chain compiled from one prompt.
+        self._stats: dict[str, LatencyStats] = {}
+
+    def register(
+        self,
+        name: str,
+        template: BasePromptTemplate,
+        *,
+        input_variables: set[str],
+        version: str = "1",
+    ) -> PromptSpec:
+        """Add a prompt, failing fast if its variables differ from `input_variables`."""
+        if name in self._prompts:
+            raise ValueError(f"Prompt {name!r} is already registered")
+        actual = set(template.input_variables)
+        if actual != set(input_variables):
+            raise ValueError(
+                f"Prompt {name!r} takes {sorted(actual)}, expected {sorted(input_variables)}"
+            )
+        # dumpd rather than repr: reprs can hold object addresses (MessagesPlaceholder does),
+        # which would change the version on every start.
+        serialized = json.dumps(dumpd(template), sort_keys=True, default=str)
+        digest = hashlib.sha256(serialized.encode("utf-8")).hexdigest()[:8]
+        spec = PromptSpec(name, f"{name}:{version}:{digest}", template, frozenset(actual))
+        self._prompts[name] = spec
+        return spec
+
+    def prompt(self, name: str) -> PromptSpec:
+        try:
+            return self._prompts[name]
+        except KeyError:
+            raise KeyError(f"Unknown prompt {name!r}") from None
+
+    def compile(
+        self,
+        name: str,
+        llm: Runnable,
+        *,
+        parser: BaseOutputParser | None = None,
+        partial: dict[str, Any] | None = None,
+    ) -> CompiledChain:
+        """Build the chain for `name` once per configuration.
+
+        Later calls with an llm and parser configured the same way (see
+        `fingerprint`) and equal partial values return the same chain, even
+        when the objects are new; any other configuration gets a chain of its
+        own. At most MAX_COMPILED_CHAINS chains are kept.
+        """
+        partial_key = json.dumps(partial or {}, sort_keys=True, default=repr)
+        key = (name, fingerprint(llm), fingerprint(parser), hashlib.sha256(partial_key.encode("utf-8")).hexdigest())
+        if key in self._chains:
+            self._chains.move_to_end(key)
+            return self._chains[key]
+        spec = self.prompt(name)
+        template = spec.template
+        if partial:
+            unknown = set(partial) - spec.input_variables
+            if unknown:
+                raise ValueError(f"Prompt {name!r} has no variables {sorted(unknown)}")
+            template = template.partial(**partial)
+        runnable = template | llm
+        if parser is not None:
+            runnable = runnable | parser
+        chain = CompiledChain(spec, runnable, self._stats.setdefault(name, LatencyStats()))
+        self._chains[key] = chain
+        # An identity key stays unique while its chain is cached, since the chain holds the object.
+        while len(self._chains) > MAX_COMPILED_CHAINS:
+            self._chains.popitem(last=False)
+        return chain
+
+    def versions(self) -> dict[str, str]:
+        return {name: spec.version for name, spec in self._prompts.items()}
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        return {
+            name: {"version": self._prompts[name].version, **stats.snapshot()}
+            for name, stats in self._stats.items()
+        }
+
+
+registry = PromptRegistry()
+
+# --- main.py ---------------------------------------------------------------
+
+registry.register(
+    "translate",
+    ChatPromptTemplate.from_messages([
+        (
+            "system",
+            "You are a helpful translation assistant. Produce the translation cleanly "
+            "and with the tone requested by the user.",
+        ),
+        (
+            "human",
+            "{instruction}\n\n"
+            "Translate the following text from {input_language} to {output_language}:\n"
+            "{text}",
+        ),
+    ]),
+    input_variables={"instruction", "input_language", "output_language", "text"},
+)
+
+registry.register(
+    "diabetes-qa",
+    ChatPromptTemplate.from_messages([
+        (
+            "system",
+            "You are a concise medical research assistant. Answer only from the provided diabetes.pdf text. "
+            "Do not hallucinate, and if the document lacks an answer, say so clearly.",
+        ),
+        (
+            "human",
+            "Document excerpt from diabetes.pdf:\n"
+            "{document}\n\n"
+            "Question:\n{question}\n\n"
+            "Answer using only the text above. If the document does not contain the answer, "
+            'respond with "I do not have enough information to answer that.".',
+        ),
+    ]),
+    input_variables={"document", "question"},
+)
+
+# --- 2025-12-01_image.py ---------------------------------------------------
+
+registry.register(
+    "nutrition-image",
+    ChatPromptTemplate.from_messages([
+        ("system", "You are a nutrition expert capable of analysing food images and providing detailed nutritional advice."),
+        ("human", [
+            {
+                "type": "text",
+                "text": """
+Assess the food in the image and reply only with a JSON object that estimates the macronutrients for a typical portion.
+Use the keys "protein_g", "carbs_g", and "fat_g" with gram estimates or ranges (e.g., "20-25g").
+Do not include any other commentary, HTML, or formatting—just the JSON object on one line.
+If the picture is unclear, note uncertainty within the values using ranges or qualifiers inside the JSON.
+"""
+            },
+            {
+                "type": "image_url",
+                "image_url": {
+                    "url": "{image_url}",
+                    "detail": "high",
+                },
+            }
+        ])
+    ]),
+    input_variables={"image_url"},
+)
+
+# --- 2025-11-28_textSummary.py ---------------------------------------------
+
+registry.register(
+    "pdf-summary",
+    PromptTemplate.from_template(
+        """
+        Write a concise summary of the following:
+        "{text}"
+
+        CONCISE SUMMARY:
+        """
+    ),
+    input_variables={"text"},
+)
+
+# --- 2025-11-28_textSummaryWeb.py ------------------------------------------
+
+registry.register(
+    "web-summary",
+    PromptTemplate.from_template(
+        """Write a concise summary of the following:
+
+{text}
+
+CONCISE SUMMARY:"""
+    ),
+    input_variables={"text"},
+)
+
+registry.register(
+    "web-summary-update",
+    PromptTemplate.from_template(
+        """Here is a concise summary of a web page:
+
+{summary}
+
+The page has since changed. These are its new or edited sections:
+
+{changes}
+
+Update the summary so it reflects the current page. Keep whatever is still accurate and stay concise.
+
+UPDATED SUMMARY:"""
+    ),
+    input_variables={"summary", "changes"},
+)
+
+# --- 2025-12-01_streamlit1.py / 2025-12-01_streamlit2.py ----------------------
+
+registry.register(
+    "image-describe",
+    ChatPromptTemplate.from_messages(
+        [
+            ("system", "You are a helpful assistant that can describe images."),
+            (
+                "human",
+                [
+                    {"type": "text", "text": "{input}"},
+                    {
+                        "type": "image_url",
+                        "image_url": {
+                            "url": "{image_url}",
+                            "detail": "low",
+                        },
+                    },
+                ],
+            ),
+        ]
+    ),
+    input_variables={"input", "image_url"},
+)
+
+registry.register(
+    "kyc-verify",
+    ChatPromptTemplate.from_messages(
+        [
+            ("system", "You are a helpful assistant that can verify identification documents"),
+            ("human",
+                [
+                    {"type": "text", "text": "Verify the identification details"},
+                    {"type": "text", "text": "Name: {user_name}"},
+                    {"type": "text", "text": "DOB: {user_dob}"},
+                    {
+                        "type": "image_url",
+                        "image_url": {
+                            "url": "{image_url}",
+                            "detail": "low",
+                        },
+                    },
+                ],
+            ),
+        ]
+    ),
+    input_variables={"user_name", "user_dob", "image_url"},
+)
+
+# --- video_segments.py (2025-12-02_video.py / 2025-12-02_youtube.py) ------------
+
+VIDEO_ANALYST = "You are an expert video analyst. Provide accurate scene interpretation."
+SEGMENT_REQUEST = (
+    "{analysis_request}\n\n"
+    "This is the part of a longer video from {start} to {end}. Describe only what happens in this "
+    "part, in time order, giving timestamps relative to the start of the whole video."
+)
+
+registry.register(
+    "video-segment",
+    ChatPromptTemplate.from_messages([
+        ("system", VIDEO_ANALYST),
+        ("human", [
+            {"type": "text", "text": SEGMENT_REQUEST},
+            {"type": "media", "data": "{video_data}", "mime_type": "{mime_type}"},
+        ]),
+    ]),
+    input_variables={"analysis_request", "start", "end", "video_data", "mime_type"},
+)
+
+registry.register(
+    "video-segment-frames",
+    ChatPromptTemplate.from_messages([
+        ("system", VIDEO_ANALYST),
+        ("human", SEGMENT_REQUEST),
+        MessagesPlaceholder("frames"),
+    ]),
+    input_variables={"analysis_request", "start", "end", "frames"},
+)
+
+registry.register(
+    "video-timeline",
+    PromptTemplate.from_template(
+        """A video was analysed in consecutive parts. These are the descriptions of each part:
+
+{timeline}
+
+Merge them into one timeline of the whole video with timestamps, removing repetition where a scene
+spans two parts. Then answer this request about the whole video:
+
+{analysis_request}"""
+    ),
+    input_variables={"timeline", "analysis_request"},
+)
+
+# --- rag_service.py (2025-12-03_example5.py) --------------------------------
+
+registry.register(
+    "rag-qa",
+    ChatPromptTemplate.from_messages([
+        (
+            "system",
+            "You are a retrieval-augmented assistant.\n"
+            "You must:\n"
+            "• Only answer using information from the retrieved documents.\n"
+            "• If the documents lack the answer, say you do not have enough information.\n"
+            "Be concise and factual.",
+        ),
+        ("human", "Context:\n{context}\n\nQuestion:\n{input}"),
+    ]),
+    input_variables={"context", "input"},
+)
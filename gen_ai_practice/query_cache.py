@@ -0,0 +1,116 @@
+"""Cache of retriever results for the RAG query examples (example3, example5).
+
+Every question used to be embedded and searched again, even one asked the
+run before. `CachedRetriever` is a drop-in for `vector_store.as_retriever()`
+that keeps the documents each search returned in SQLite, keyed by the
+collection, its version, the search type and kwargs (k, filters) and the
+normalized query (embedding_cache.normalize_query). A repeated question is
+answered from the cache with no embedding call and no vector search; a new
+one is embedded through the store's `CachedEmbeddings`, which keeps the query
+vector as well.
+
+The version is the collection's counter in the ingestion records
+(incremental_ingest.py), which every ingestion run that adds or deletes
+chunks bumps, so results cached before the collection changed are never
+served and are pruned on the next write. Writes that bypass ingest_files and
+upsert_documents are not seen; call `IngestRecords().bump(collection)` after
+them.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.vectorstores import VectorStore
+from pydantic import Field
+
+from embedding_cache import normalize_query
+from incremental_ingest import IngestRecords
+
+DEFAULT_PATH = Path(__file__).resolve().parent.parent / ".cache" / "query_cache.sqlite"
+QUERY_CACHE_PATH = Path(os.getenv("QUERY_CACHE_PATH", str(DEFAULT_PATH)))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    collection TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    documents TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_collection ON results(collection, version);
+"""
+
+
+class QueryCache:
+    """Search results per (collection, version, search, query), in SQLite."""
+
+    def __init__(self, path: Path = QUERY_CACHE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode = WAL")
+        self._db.executescript(SCHEMA)
+
+    @staticmethod
+    def key(collection: str, version: int, search_type: str, search_kwargs: dict, query: str) -> str:
+        payload = json.dumps(
+            [collection, version, search_type, search_kwargs, normalize_query(query)], sort_keys=True, default=str
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key: str) -> list[Document] | None:
+        with self._lock:
+            row = self._db.execute("SELECT documents FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return [Document(**document) for document in json.loads(row[0])]
+
+    def put(self, key: str, collection: str, version: int, documents: list[Document]) -> None:
+        payload = json.dumps(
+            [{"page_content": d.page_content, "metadata": d.metadata, "id": d.id} for d in documents], default=str
+        )
+        with self._lock, self._db:
+            # Results of older versions can never be served again.
+            self._db.execute("DELETE FROM results WHERE collection = ? AND version < ?", (collection, version))
+            self._db.execute(
+                "INSERT OR REPLACE INTO results (key, collection, version, documents) VALUES (?, ?, ?, ?)",
+                (key, collection, version, payload),
+            )
+
+
+class CachedRetriever(BaseRetriever):
+    """`vector_store.as_retriever(search_type=..., search_kwargs=...)` with results cached.
+
+    `collection` is the name the collection is ingested under
+    (vector_store_config.collection_key).
+    """
+
+    vector_store: VectorStore
+    collection: str
+    search_type: str = "similarity"
+    search_kwargs: dict[str, Any] = Field(default_factory=dict)
+    cache: QueryCache = Field(default_factory=QueryCache)
+    records: IngestRecords = Field(default_factory=IngestRecords)
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> list[Document]:
+        version = self.records.version(self.collection)
+        key = self.cache.key(self.collection, version, self.search_type, self.search_kwargs, query)
+        documents = self.cache.get(key)
+        if documents is None:
+            documents = self.vector_store.search(query, self.search_type, **self.search_kwargs)
+            self.cache.put(key, self.collection, version, documents)
+        return documents
@@ -0,0 +1,209 @@
+"""Long-lived RAG query service over the collection example4/example4b ingest.
+
+example3 and example5 connect to the vector store, build the embeddings
+client, retriever and chain, answer one hard-coded question and close
+everything, so each question pays the whole setup. This service does that
+setup once, in the app lifespan, and keeps for its lifetime:
+
+- one vector store from vector_store_config.open_vector_store. For Atlas
+  this is a single MongoClient, whose connection pool is shared by all
+  requests. Searches run on the thread pool because langchain_mongodb
+  drives the synchronous driver.
+- the Gemini embeddings client behind a CachedEmbeddings, warmed with one
+  search at startup so the first request does not open the connections;
+- the "rag-qa" chain compiled once from prompt_registry.
+
+Run from this folder:
+
+    uvicorn rag_service:app --port 8001
+
+POST /rag/query with {"question": ..., "k": 4, "filter": {...}} streams
+newline-delimited JSON:
+
+    {"type": "sources", "sources": [...], "cached": false, "timings": {"embed_ms": .., "search_ms": ..}}
+    {"type": "token", "text": "..."}                      (one per streamed chunk)
+    {"type": "done", "timings": {"embed_ms": .., "search_ms": .., "llm_first_token_ms": .., "llm_ms": .., "total_ms": ..}}
+
+The embed and search times are also sent in a Server-Timing header.
+Repeated questions reuse the cached results (query_cache.py) until ingestion
+changes the collection, and then report 0 ms for both. GET /rag/stats returns
+latency percentiles per stage.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any
+
+from dotenv import load_dotenv
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from langchain_core.documents import Document
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.vectorstores import VectorStore
+from pydantic import BaseModel, Field
+
+from embedding_cache import CachedEmbeddings
+from incremental_ingest import IngestRecords
+from prompt_registry import CompiledChain, LatencyStats, registry
+from query_cache import QueryCache
+from vector_store_config import collection_key, open_vector_store
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+DB_NAME = os.getenv("RAG_DB_NAME", "test_db")
+COLLECTION_NAME = os.getenv("RAG_COLLECTION_NAME", "test_collection_pdf")
+ATLAS_VECTOR_SEARCH_INDEX_NAME = os.getenv("RAG_INDEX_NAME", "test-index-pdf")
+RAG_TOP_K = int(os.getenv("RAG_TOP_K", "4"))
+MAX_TOP_K = 20
+
+
+@dataclass
+class RagState:
+    embeddings: CachedEmbeddings
+    vector_store: VectorStore
+    chain: CompiledChain
+    collection: str
+    records: IngestRecords
+    cache: QueryCache
+    stages: dict[str, LatencyStats]
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if not GEMINI_API_KEY:
+        raise RuntimeError("GEMINI_API_KEY not set; add it to .env or the environment.")
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    from langchain_google_genai.embeddings import GoogleGenerativeAIEmbeddings
+
+    embeddings = CachedEmbeddings(
+        GoogleGenerativeAIEmbeddings(model="models/text-embedding-004", google_api_key=GEMINI_API_KEY)
+    )
+    llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash", api_key=GEMINI_API_KEY)
+    vector_store = open_vector_store(DB_NAME, COLLECTION_NAME, ATLAS_VECTOR_SEARCH_INDEX_NAME, embeddings)
+    state = RagState(
+        embeddings=embeddings,
+        vector_store=vector_store,
+        chain=registry.compile("rag-qa", llm, parser=StrOutputParser()),
+        collection=collection_key(DB_NAME, COLLECTION_NAME),
+        records=IngestRecords(),
+        cache=QueryCache(),
+        stages={stage: LatencyStats() for stage in ("embed", "search", "llm", "total")},
+    )
+    try:
+        # Opens the embeddings and database connections before the first request needs them.
+        await run_in_threadpool(vector_store.similarity_search, "warm-up", k=1)
+    except Exception as exc:
+        logger.warning("Warm-up search failed, the first request will open the connections: %s", exc)
+    app.state.rag = state
+    try:
+        yield
+    finally:
+        vector_store.close()
+
+
+app = FastAPI(title="RAG query service", lifespan=lifespan)
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_methods=["GET", "POST"],
+    allow_headers=["*"],
+)
+
+
+class RagQuery(BaseModel):
+    question: str = Field(..., min_length=1)
+    k: int = Field(RAG_TOP_K, ge=1, le=MAX_TOP_K)
+    filter: dict[str, Any] | None = None
+
+
+def retrieve(state: RagState, query: RagQuery) -> tuple[list[Document], dict[str, float], bool]:
+    """Documents for `query`, the embed and search seconds, and whether they came from the cache."""
+    search_kwargs: dict[str, Any] = {"k": query.k}
+    if query.filter:
+        search_kwargs["pre_filter"] = query.filter
+    version = state.records.version(state.collection)
+    key = state.cache.key(state.collection, version, "similarity", search_kwargs, query.question)
+    documents = state.cache.get(key)
+    if documents is not None:
+        return documents, {"embed": 0.0, "search": 0.0}, True
+
+    start = time.perf_counter()
+    vector = state.embeddings.embed_query(query.question)
+    embedded = time.perf_counter()
+    documents = state.vector_store.similarity_search_by_vector(vector, **search_kwargs)
+    searched = time.perf_counter()
+    state.cache.put(key, state.collection, version, documents)
+    state.stages["embed"].record(embedded - start)
+    state.stages["search"].record(searched - embedded)
+    return documents, {"embed": embedded - start, "search": searched - embedded}, False
+
+
+def ms(seconds: float) -> float:
+    return round(seconds * 1000, 2)
+
+
+@app.post("/rag/query")
+async def rag_query(query: RagQuery, request: Request) -> StreamingResponse:
+    state: RagState = request.app.state.rag
+    started = time.perf_counter()
+    try:
+        documents, seconds, cached = await run_in_threadpool(retrieve, state, query)
+    except Exception as exc:
+        raise HTTPException(502, detail=f"Retrieval failed: {exc}") from exc
+    timings = {"embed_ms": ms(seconds["embed"]), "search_ms": ms(seconds["search"])}
+    sources = [
+        {"source": d.metadata.get("source"), "page": d.metadata.get("page"), "preview": d.page_content[:200]}
+        for d in documents
+    ]
+    context = "\n\n".join(d.page_content for d in documents)
+
+    async def answer():
+        yield json.dumps({"type": "sources", "sources": sources, "cached": cached, "timings": timings}) + "\n"
+        llm_start = time.perf_counter()
+        first_token = None
+        try:
+            async for text in state.chain.astream({"context": context, "input": query.question}):
+                if first_token is None:
+                    first_token = time.perf_counter() - llm_start
+                yield json.dumps({"type": "token", "text": text}) + "\n"
+        except Exception as exc:
+            logger.exception("RAG answer failed")
+            yield json.dumps({"type": "error", "detail": str(exc)}) + "\n"
+            return
+        finished = time.perf_counter()
+        state.stages["llm"].record(finished - llm_start)
+        state.stages["total"].record(finished - started)
+        done = {
+            **timings,
+            "llm_first_token_ms": ms(first_token or 0.0),
+            "llm_ms": ms(finished - llm_start),
+            "total_ms": ms(finished - started),
+        }
+        yield json.dumps({"type": "done", "timings": done}) + "\n"
+
+    server_timing = f"embed;dur={timings['embed_ms']}, search;dur={timings['search_ms']}"
+    return StreamingResponse(
+        answer(), media_type="application/x-ndjson", headers={"Server-Timing": server_timing}
+    )
+
+
+@app.get("/rag/stats")
+def rag_stats(request: Request) -> dict[str, Any]:
+    state: RagState = request.app.state.rag
+    return {
+        "stages": {name: stats.snapshot() for name, stats in state.stages.items()},
+        "result_cache": {"hits": state.cache.hits, "misses": state.cache.misses},
+        "embedding_cache": {"hits": state.embeddings.hits, "misses": state.embeddings.misses},
+        "chains": registry.stats(),
+    }
@@ -0,0 +1,46 @@
+"""Pick the vector store behind the RAG examples (2025-12-03_example1 to example5).
+
+VECTOR_STORE=atlas (the default) keeps using MongoDB Atlas Vector Search at
+MONGODB_ATLAS_CLUSTER_URI. VECTOR_STORE=local uses LocalVectorStore, stored
+under LOCAL_VECTOR_STORE_DIR/<db>/<collection>, so the examples run with no
+cluster and no network round trip per query. Both stores take the same calls
+in the examples: add_documents, as_retriever, delete() to empty the
+collection and close().
+"""
+
+from __future__ import annotations
+
+import os
+
+from dotenv import load_dotenv
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+load_dotenv()
+
+VECTOR_STORE = os.getenv("VECTOR_STORE", "atlas").lower()
+
+
+def collection_key(db_name: str, collection_name: str) -> str:
+    """Name of a collection in the configured store, for ingestion records (incremental_ingest.py)."""
+    return f"{VECTOR_STORE}:{db_name}/{collection_name}"
+
+
+def open_vector_store(db_name: str, collection_name: str, index_name: str, embeddings: Embeddings) -> VectorStore:
+    """Open the configured vector store for one collection; call `.close()` when done."""
+    if VECTOR_STORE == "local":
+        from local_vector_store import LOCAL_VECTOR_STORE_DIR, LocalVectorStore
+
+        return LocalVectorStore(LOCAL_VECTOR_STORE_DIR / db_name / collection_name, embeddings)
+    if VECTOR_STORE == "atlas":
+        from langchain_mongodb import MongoDBAtlasVectorSearch
+        from pymongo import MongoClient
+
+        client = MongoClient(os.getenv("MONGODB_ATLAS_CLUSTER_URI"))
+        return MongoDBAtlasVectorSearch(
+            collection=client[db_name][collection_name],
+            embedding=embeddings,
+            index_name=index_name,
+            relevance_score_fn="cosine",
+        )
+    raise ValueError(f"VECTOR_STORE must be 'atlas' or 'local', not {VECTOR_STORE!r}")
@@ -0,0 +1,208 @@
+"""Analyse a long video in time segments, in parallel, and merge a timeline.
+
+One request for a whole long video is slow and loses detail. Instead the video
+is cut into segments of `segment_seconds`, every segment is described by its
+own Gemini call (at most `concurrency` at a time), and a final call merges the
+descriptions into one timestamped timeline that answers the request.
+
+Segments are sent either as video clips (``mode="video"``, cut with ffmpeg
+stream copy, so cuts land on keyframes and nothing is re-encoded) or as
+sampled frames (``mode="frames"``, see video_frames.py), which needs no
+ffmpeg.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import csv
+import shutil
+import subprocess
+import tempfile
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from pathlib import Path
+
+import cv2
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.runnables import Runnable
+
+from prompt_registry import registry
+from video_frames import frames_message, sample_frames
+
+SEGMENT_MODES = ("video", "frames")
+
+
+def format_time(seconds: float) -> str:
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+
+@dataclass(frozen=True)
+class Segment:
+    index: int
+    start: float
+    end: float
+    path: Path | None = None
+
+    @property
+    def label(self) -> str:
+        return f"{format_time(self.start)}-{format_time(self.end)}"
+
+
+@dataclass
+class SegmentResult:
+    segment: Segment
+    text: str = ""
+    error: str | None = None
+    seconds: float = 0.0
+
+
+def video_duration(path: str | Path) -> float:
+    """Duration in seconds, from ffprobe when installed, else from OpenCV's frame count."""
+    if shutil.which("ffprobe"):
+        out = subprocess.run(
+            ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", str(path)],
+            check=True, capture_output=True, text=True,
+        )
+        return float(out.stdout.strip())
+    capture = cv2.VideoCapture(str(path))
+    try:
+        fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+        return capture.get(cv2.CAP_PROP_FRAME_COUNT) / fps
+    finally:
+        capture.release()
+
+
+def plan_segments(duration: float, segment_seconds: float) -> list[Segment]:
+    """Equal segments covering `duration`; a tail shorter than a quarter segment joins the last one."""
+    starts = []
+    position = 0.0
+    while position < duration:
+        starts.append(position)
+        position += segment_seconds
+    if len(starts) > 1 and duration - starts[-1] < segment_seconds / 4:
+        starts.pop()
+    ends = starts[1:] + [duration]
+    return [Segment(i, start, end) for i, (start, end) in enumerate(zip(starts, ends))]
+
+
+def split_video(path: str | Path, segment_seconds: float, out_dir: Path) -> list[Segment]:
+    """Cut the video into clips with ffmpeg's segment muxer, without re-encoding.
+
+    Stream copy can only cut on keyframes, so the real boundaries (read back
+    from the segment list) are close to, not exactly at, multiples of
+    `segment_seconds`.
+    """
+    if not shutil.which("ffmpeg"):
+        raise RuntimeError("ffmpeg is required to split videos; use mode='frames' without it")
+    suffix = Path(path).suffix or ".mp4"
+    listing = out_dir / "segments.csv"
+    subprocess.run(
+        [
+            "ffmpeg", "-v", "error", "-y", "-i", str(path),
+            "-map", "0", "-c", "copy", "-f", "segment",
+            "-segment_time", str(segment_seconds), "-reset_timestamps", "1",
+            "-segment_list", str(listing), "-segment_list_type", "csv",
+            str(out_dir / f"segment-%04d{suffix}"),
+        ],
+        check=True, capture_output=True,
+    )
+    with listing.open(newline="") as fh:
+        return [
+            Segment(i, float(start), float(end), out_dir / name)
+            for i, (name, start, end) in enumerate(csv.reader(fh))
+        ]
+
+
+async def analyze_segments(
+    segments: list[Segment],
+    analyze: Callable[[Segment], Awaitable[str]],
+    concurrency: int,
+) -> list[SegmentResult]:
+    """Run `analyze` on every segment, at most `concurrency` at once, results in order."""
+    slots = asyncio.Semaphore(concurrency)
+
+    async def run(segment: Segment) -> SegmentResult:
+        async with slots:
+            start = time.perf_counter()
+            try:
+                text = await analyze(segment)
+                return SegmentResult(segment, text, seconds=time.perf_counter() - start)
+            except Exception as exc:
+                return SegmentResult(
+                    segment, error=f"{type(exc).__name__}: {exc}", seconds=time.perf_counter() - start
+                )
+
+    return await asyncio.gather(*(run(segment) for segment in segments))
+
+
+def render_timeline(results: list[SegmentResult]) -> str:
+    lines = []
+    for result in results:
+        body = result.text.strip() if result.error is None else f"(not analysed: {result.error})"
+        lines.append(f"[{result.segment.label}]\n{body}")
+    return "\n\n".join(lines)
+
+
+async def analyze_video_segments(
+    path: str | Path,
+    analysis_request: str,
+    llm: Runnable,
+    *,
+    segment_seconds: float = 60,
+    concurrency: int = 4,
+    mode: str = "frames",
+    frames_per_segment: int = 16,
+) -> tuple[str, list[SegmentResult]]:
+    """Describe every segment of the video at `path` and merge them into one answer.
+
+    Returns the merged answer and the per-segment results.
+    """
+    if mode not in SEGMENT_MODES:
+        raise ValueError(f"Unknown segment mode {mode!r}; expected one of {SEGMENT_MODES}")
+    parser = StrOutputParser()
+    merge_chain = registry.compile("video-timeline", llm, parser=parser)
+
+    with tempfile.TemporaryDirectory(prefix="video-segments-") as tmpdir:
+        if mode == "video":
+            segment_chain = registry.compile("video-segment", llm, parser=parser)
+            segments = await asyncio.to_thread(split_video, path, segment_seconds, Path(tmpdir))
+
+            async def analyze(segment: Segment) -> str:
+                encoded = await asyncio.to_thread(lambda: base64.b64encode(segment.path.read_bytes()).decode())
+                return await segment_chain.ainvoke({
+                    "analysis_request": analysis_request,
+                    "start": format_time(segment.start),
+                    "end": format_time(segment.end),
+                    "video_data": encoded,
+                    "mime_type": "video/mp4",
+                })
+        else:
+            segment_chain = registry.compile("video-segment-frames", llm, parser=parser)
+            segments = plan_segments(await asyncio.to_thread(video_duration, path), segment_seconds)
+            fps = frames_per_segment / segment_seconds
+
+            async def analyze(segment: Segment) -> str:
+                frames = await asyncio.to_thread(
+                    sample_frames, path, fps=fps, max_frames=frames_per_segment,
+                    start=segment.start, end=segment.end,
+                )
+                return await segment_chain.ainvoke({
+                    "analysis_request": analysis_request,
+                    "start": format_time(segment.start),
+                    "end": format_time(segment.end),
+                    "frames": [frames_message(frames)],
+                })
+
+        results = await analyze_segments(segments, analyze, concurrency)
+
+    if len(results) == 1 and results[0].error is None:
+        return results[0].text, results
+    merged = await merge_chain.ainvoke({
+        "timeline": render_timeline(results),
+        "analysis_request": analysis_request,
+    })
+    return merged, results
@@ -0,0 +1,240 @@
+"""Readability-style main-content extraction for web pages.
+
+WebBaseLoader hands us the whole page text, navigation, cookie banners and
+footers included. The helpers below strip that boilerplate from the bs4 tree
+and keep only the blocks of the main article, so the summary prompt is a
+fraction of the size.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+
+from bs4 import BeautifulSoup, NavigableString, Tag
+
+# Tags that never carry article text.
+DROP_TAGS = (
+    "script", "style", "noscript", "template", "iframe", "svg", "canvas",
+    "form", "button", "input", "select", "textarea", "nav", "aside", "footer",
+)
+
+# Landmark roles used by navigation, banners and dialogs.
+DROP_ROLES = {"navigation", "banner", "contentinfo", "complementary", "dialog", "alertdialog", "search"}
+
+NEGATIVE_HINTS = re.compile(
+    r"cookie|consent|gdpr|banner|breadcrumb|\bnav|menu|footer|sidebar|comment|share|social|"
+    r"subscribe|newsletter|promo|advert|\bads?\b|sponsor|popup|modal|related|recommend|widget|"
+    r"masthead|skip-link|toolbar|pagination|signup|login",
+    re.IGNORECASE,
+)
+POSITIVE_HINTS = re.compile(
+    r"article|body|content|entry|main|post|text|blog|story|prose",
+    re.IGNORECASE,
+)
+# Hints that mark boilerplate even when a positive hint is also present ("cookie-content").
+STRONG_NEGATIVE_HINTS = re.compile(
+    r"cookie|consent|gdpr|footer|sidebar|newsletter|popup|modal|advert",
+    re.IGNORECASE,
+)
+
+BLOCK_TAGS = {
+    "p", "h1", "h2", "h3", "h4", "h5", "h6", "li", "pre", "blockquote",
+    "td", "th", "dt", "dd", "figcaption", "div", "section", "article", "main",
+}
+HEADING_TAGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+PARAGRAPH_TAGS = ("p", "pre", "td", "blockquote", "li")
+
+MIN_PARAGRAPH_CHARS = 25
+MIN_CONTENT_CHARS = 200
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+@dataclass(frozen=True)
+class Block:
+    """A run of text from the main content; `level` is 1-6 for headings, 0 for body text."""
+
+    text: str
+    level: int = 0
+
+
+def _parse(markup: str | bytes | BeautifulSoup) -> BeautifulSoup:
+    if isinstance(markup, BeautifulSoup):
+        return markup
+    try:
+        return BeautifulSoup(markup, "lxml")
+    except Exception:  # lxml is optional; html.parser is always available
+        return BeautifulSoup(markup, "html.parser")
+
+
+def _text(el: Tag) -> str:
+    return _WHITESPACE.sub(" ", el.get_text(" ")).strip()
+
+
+def _hint(el: Tag) -> str:
+    attrs = el.attrs or {}
+    classes = attrs.get("class") or []
+    if isinstance(classes, str):
+        classes = [classes]
+    return " ".join(classes) + " " + (attrs.get("id") or "")
+
+
+def _is_hidden(el: Tag) -> bool:
+    attrs = el.attrs or {}
+    if "hidden" in attrs or attrs.get("aria-hidden") == "true":
+        return True
+    style = (attrs.get("style") or "").replace(" ", "").lower()
+    return "display:none" in style or "visibility:hidden" in style
+
+
+def _strip_boilerplate(soup: BeautifulSoup) -> None:
+    for el in soup.find_all(DROP_TAGS):
+        el.decompose()
+
+    for el in soup.find_all(True):
+        if el.decomposed or el.name in ("html", "body", "main", "article"):
+            continue
+        if el.attrs is None:
+            continue
+        if _is_hidden(el) or (el.get("role") or "").lower() in DROP_ROLES:
+            el.decompose()
+            continue
+        # Page-level headers are boilerplate, but an <article>'s own header holds its title.
+        if el.name == "header" and el.find_parent(("article", "main")) is None:
+            el.decompose()
+            continue
+        hint = _hint(el)
+        if not hint.strip():
+            continue
+        if STRONG_NEGATIVE_HINTS.search(hint) or (
+            NEGATIVE_HINTS.search(hint) and not POSITIVE_HINTS.search(hint)
+        ):
+            el.decompose()
+
+
+def _link_length(el: Tag) -> int:
+    """Characters of link text in `el`, `el` itself included when it is a link."""
+    links = [el] if el.name == "a" else el.find_all("a")
+    return sum(len(_text(a)) for a in links)
+
+
+def _link_density(el: Tag) -> float:
+    text_len = len(_text(el))
+    if not text_len:
+        return 1.0
+    return _link_length(el) / text_len
+
+
+def _find_content_root(soup: BeautifulSoup) -> Tag:
+    """Score paragraph containers the way Readability does and return the best one."""
+    scores: dict[int, float] = {}
+    nodes: dict[int, Tag] = {}
+
+    for para in soup.find_all(PARAGRAPH_TAGS):
+        text = _text(para)
+        if len(text) < MIN_PARAGRAPH_CHARS:
+            continue
+        score = 1 + text.count(",") + min(len(text) // 100, 3)
+        parent = para.parent
+        grandparent = parent.parent if isinstance(parent, Tag) else None
+        for ancestor, weight in ((parent, 1.0), (grandparent, 0.5)):
+            if not isinstance(ancestor, Tag) or ancestor.name in ("html", "[document]"):
+                continue
+            key = id(ancestor)
+            if key not in scores:
+                nodes[key] = ancestor
+                scores[key] = 0.0
+                if POSITIVE_HINTS.search(_hint(ancestor)) or ancestor.name in ("article", "main"):
+                    scores[key] += 25
+            scores[key] += score * weight
+
+    body = soup.body or soup
+    if not scores:
+        return body
+
+    ranked = sorted(scores, key=scores.get, reverse=True)[:5]
+    best = max(ranked, key=lambda key: scores[key] * (1 - _link_density(nodes[key])))
+    root = nodes[best]
+
+    # Prefer the enclosing <article>/<main> so headings above the body text are kept.
+    landmark = root.find_parent(("article", "main"))
+    if landmark is not None:
+        return landmark
+    return root
+
+
+def _add_block(blocks: list[Block], text: str, link_len: int, level: int = 0) -> None:
+    if not text:
+        return
+    # Short, link-heavy blocks are tag clouds and "read more" rows.
+    if not level and len(text) < 80 and link_len / len(text) > 0.5:
+        return
+    blocks.append(Block(text, level))
+
+
+def _blocks_from(root: Tag) -> list[Block]:
+    """Blocks of `root` in document order.
+
+    Innermost block elements become one block each. Text that sits directly
+    in a container next to its block children (a lead sentence in a <div>
+    holding <p>s) becomes a block of its own at the position it appears.
+    """
+    blocks: list[Block] = []
+
+    def walk(container: Tag) -> None:
+        run: list[NavigableString | Tag] = []  # inline content between two block children
+
+        def flush() -> None:
+            text = _WHITESPACE.sub(" ", " ".join(
+                str(piece) if isinstance(piece, NavigableString) else piece.get_text(" ") for piece in run
+            )).strip()
+            _add_block(blocks, text, sum(_link_length(piece) for piece in run if isinstance(piece, Tag)))
+            run.clear()
+
+        for child in container.children:
+            if isinstance(child, Tag):
+                has_blocks = child.find(BLOCK_TAGS) is not None
+                if child.name not in BLOCK_TAGS and not has_blocks:
+                    run.append(child)
+                    continue
+                flush()
+                if has_blocks:
+                    walk(child)
+                elif child.name == "pre":
+                    # Code blocks keep their line breaks; everything else is whitespace-normalised.
+                    _add_block(blocks, child.get_text().strip(), _link_length(child))
+                else:
+                    level = int(child.name[1]) if child.name in HEADING_TAGS else 0
+                    _add_block(blocks, _text(child), _link_length(child), level)
+            elif type(child) is NavigableString:  # not comments, CDATA or doctypes
+                run.append(child)
+        flush()
+
+    walk(root)
+    return blocks
+
+
+def extract_blocks(markup: str | bytes | BeautifulSoup) -> list[Block]:
+    """Return the headings and paragraphs of the page's main content, in document order.
+
+    Note: a BeautifulSoup object passed in is modified in place.
+    """
+    soup = _parse(markup)
+    _strip_boilerplate(soup)
+    blocks = _blocks_from(_find_content_root(soup))
+    if sum(len(block.text) for block in blocks) < MIN_CONTENT_CHARS:
+        # Nothing article-like was found; fall back to the cleaned body.
+        blocks = _blocks_from(soup.body or soup)
+    return blocks
+
+
+def render_blocks(blocks: list[Block]) -> str:
+    """Join blocks into prompt text, marking headings with Markdown hashes."""
+    lines = [f"{'#' * block.level} {block.text}" if block.level else block.text for block in blocks]
+    return "\n\n".join(lines)
+
+
+def extract_main_content(markup: str | bytes | BeautifulSoup) -> str:
+    """Return the main content of an HTML page as plain text with Markdown headings."""
+    return render_blocks(extract_blocks(markup))
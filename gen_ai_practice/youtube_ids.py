@@ -0,0 +1,81 @@
+"""Recognise YouTube URLs, pull out the video id and normalise URLs, all offline."""
+
+from __future__ import annotations
+
+import re
+from urllib.parse import parse_qs, parse_qsl, urlencode, urlparse, urlunparse
+
+VIDEO_ID = re.compile(r"^[A-Za-z0-9_-]{11}$")
+YOUTUBE_HOSTS = {"youtube.com", "m.youtube.com", "music.youtube.com", "youtube-nocookie.com"}
+PATH_PREFIXES = ("/shorts/", "/embed/", "/live/", "/v/", "/e/")
+# Query parameters that only track where a link was shared from.
+TRACKING_PARAMS = {"si", "feature", "fbclid", "gclid", "igshid", "ref", "ref_src", "pp"}
+
+
+def _parse(url: str):
+    url = url.strip()
+    # Links pasted without a scheme ("youtu.be/...") would otherwise parse as a bare path.
+    return urlparse(url if "://" in url else f"https://{url}")
+
+
+def parse_video_id(url: str) -> str | None:
+    """Return the 11-character id of a YouTube video URL, or None for anything else."""
+    parsed = _parse(url)
+    host = (parsed.hostname or "").lower().removeprefix("www.")
+    candidate = None
+    if host == "youtu.be":
+        candidate = parsed.path.lstrip("/").split("/")[0]
+    elif host in YOUTUBE_HOSTS:
+        if parsed.path == "/watch":
+            candidate = parse_qs(parsed.query).get("v", [None])[0]
+        else:
+            for prefix in PATH_PREFIXES:
+                if parsed.path.startswith(prefix):
+                    candidate = parsed.path[len(prefix):].split("/")[0]
+                    break
+    if candidate and VIDEO_ID.match(candidate):
+        return candidate
+    return None
+
+
+def media_key(url: str) -> str | None:
+    """Store key for a URL known offline: "youtube:<id>", or None if unrecognised."""
+    video_id = parse_video_id(url)
+    return f"youtube:{video_id}" if video_id else None
+
+
+def media_key_from_info(info: dict) -> str:
+    """Store key from a yt-dlp info dict, for sites we cannot parse ourselves."""
+    extractor = (info.get("extractor_key") or info.get("extractor") or "generic").lower()
+    return f"{extractor}:{info['id']}"
+
+
+def normalize_url(url: str) -> str:
+    """Canonical form of `url`, so different links to the same video compare equal.
+
+    YouTube links become https://www.youtube.com/watch?v=<id>. Other URLs get a
+    lower-case scheme and host without "www.", no fragment, no tracking
+    parameters and sorted query parameters.
+    """
+    video_id = parse_video_id(url)
+    if video_id:
+        return f"https://www.youtube.com/watch?v={video_id}"
+    parsed = _parse(url)
+    host = (parsed.hostname or "").lower().removeprefix("www.")
+    if parsed.port:
+        host = f"{host}:{parsed.port}"
+    query = sorted(
+        (name, value)
+        for name, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if name not in TRACKING_PARAMS and not name.startswith("utm_")
+    )
+    path = parsed.path.rstrip("/") or "/"
+    return urlunparse((parsed.scheme.lower(), host, path, "", urlencode(query), ""))
+
+
+def unique_urls(urls: list[str]) -> list[str]:
+    """Drop URLs that normalise to one already seen, keeping the first spelling."""
+    seen = {}
+    for url in urls:
+        seen.setdefault(normalize_url(url), url)
+    return list(seen.values())
@@ -11,6 +11,8 @@ from langchain_google_genai import ChatGoogleGenerativeAI
 from pydantic import BaseModel, Field
 from pypdf import PdfReader
 
+from gen_ai_practice.prompt_registry import registry
+
 load_dotenv()
 
 logger = logging.getLogger(__name__)
@@ -45,25 +47,16 @@ def _load_diabetes_text(path: Path) -> str:
     return documents
 
 DIABETES_DOCUMENT = _load_diabetes_text(DIABETES_PDF_PATH)
-DIABETES_SYSTEM_PROMPT = (
-    "You are a concise medical research assistant. Answer only from the provided diabetes.pdf text. "
-    "Do not hallucinate, and if the document lacks an answer, say so clearly."
-)
-
-def _build_diabetes_prompt(question: str) -> str:
-    return (
-        "Document excerpt from diabetes.pdf:\n"
-        f"{DIABETES_DOCUMENT}\n\n"
-        f"Question:\n{question}\n\n"
-        "Answer using only the text above. If the document does not contain the answer, "
-        'respond with "I do not have enough information to answer that.".'
-    )
 
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 if GEMINI_API_KEY:
     llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash", api_key=GEMINI_API_KEY)
+    # Compiled once here; the diabetes text is bound into the prompt up front.
+    translate_chain = registry.compile("translate", llm)
+    diabetes_chain = registry.compile("diabetes-qa", llm, partial={"document": DIABETES_DOCUMENT})
 else:
     llm = None
+    translate_chain = diabetes_chain = None
     logger.warning(
         "GEMINI_API_KEY is not set; the API server will start but return a "
         "preview translation instead of calling Gemini."
@@ -78,26 +71,6 @@ STYLE_INSTRUCTIONS = {
 }
 
 
-def _build_prompt_messages(req: TranslateRequest, instruction: str) -> list[dict[str, str]]:
-    return [
-        {
-            "role": "system",
-            "content": (
-                "You are a helpful translation assistant. Produce the translation cleanly "
-                "and with the tone requested by the user."
-            ),
-        },
-        {
-            "role": "user",
-            "content": (
-                f"{instruction}\n\n"
-                f"Translate the following text from {req.inputLanguage} to {req.outputLanguage}:\n"
-                f"{req.text}"
-            ),
-        },
-    ]
-
-
 def _build_preview_translation(req: TranslateRequest, instruction: str) -> str:
     style_blurb = STYLE_INSTRUCTIONS.get(req.style, STYLE_INSTRUCTIONS["default"])
     return (
@@ -125,12 +98,17 @@ class DiabetesResponse(BaseModel):
     answer: str
 
 
+class ChainStatsResponse(BaseModel):
+    prompts: dict[str, str]
+    chains: dict[str, dict[str, int | float | str]]
+
+
 app = FastAPI(title="Text Translator API")
 
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
-    allow_methods=["POST"],
+    allow_methods=["GET", "POST"],
     allow_headers=["*"],
 )
 
@@ -141,10 +119,15 @@ def translate(req: TranslateRequest) -> TranslateResponse:
     if llm is None:
         return TranslateResponse(translation=_build_preview_translation(req, instruction))
 
-    messages = _build_prompt_messages(req, instruction)
-
     try:
-        ai_msg = llm.invoke(messages)
+        ai_msg = translate_chain.invoke(
+            {
+                "instruction": instruction,
+                "input_language": req.inputLanguage,
+                "output_language": req.outputLanguage,
+                "text": req.text,
+            }
+        )
         if not ai_msg.content:
             raise ValueError("Empty content returned from LLM.")
         translation = ai_msg.content.strip()
@@ -167,13 +150,8 @@ def answer_diabetes_question(question: str = Query(..., min_length=1)) -> Diabet
             detail="GEMINI_API_KEY is not configured, so the diabetes question cannot be answered.",
         )
 
-    messages = [
-        {"role": "system", "content": DIABETES_SYSTEM_PROMPT},
-        {"role": "user", "content": _build_diabetes_prompt(question)},
-    ]
-
     try:
-        ai_msg = llm.invoke(messages)
+        ai_msg = diabetes_chain.invoke({"question": question})
         if not ai_msg.content:
             raise ValueError("LLM returned an empty response.")
         answer = ai_msg.content.strip()
@@ -181,3 +159,9 @@ def answer_diabetes_question(question: str = Query(..., min_length=1)) -> Diabet
         raise HTTPException(status_code=502, detail=str(exc)) from exc
 
     return DiabetesResponse(question=question, answer=answer)
+
+
+@app.get("/chains", response_model=ChainStatsResponse)
+def chain_stats() -> ChainStatsResponse:
+    """Report prompt versions and per-chain invocation latency."""
+    return ChainStatsResponse(prompts=registry.versions(), chains=registry.stats())